@@ -0,0 +1,201 @@
+# ads_service.py
+# -----------------------------------------------------------
+# Servicio único de datos de Google Ads para SkyIntel.
+# Una caché, un pool de hilos y un esquema por tipo de dato,
+# compartidos por `google_ads_tab` y `callbacks_ads`.
+# -----------------------------------------------------------
+from __future__ import annotations
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+import google_ads_api as gads
+
+CACHE_TTL_SECONDS = 15 * 60
+MAX_WORKERS = 6
+CACHE_MAX_ENTRIES = 256  # claves (tipo, inicio, fin) que se mantienen en memoria
+
+# Columnas de cada DataFrame que entrega el servicio
+SCHEMAS: Dict[str, List[str]] = {
+    "metrics":   ["date", "campaign", "clicks", "impressions", "conversions", "ctr", "cpc", "cost"],
+    "daily":     ["date", "spend", "clicks", "impressions", "conversions"],
+    "campaigns": ["campaign", "spend", "clicks", "conversions", "cpc", "cpa", "roas"],
+    "geo":       ["city", "clicks", "conv", "cost"],
+    "devices":   ["device", "clicks", "conversions", "cost"],
+    "ages":      ["age_range", "clicks", "conv", "cost"],
+    "genders":   ["gender", "clicks", "conv", "cost"],
+    "adgroups":  ["ad_group", "clicks", "impr", "ctr", "avg_cpc", "conv"],
+    "keywords":  ["date", "keyword", "clicks", "impressions", "conversions", "cost"],
+}
+
+Key = Tuple[str, date, date]
+
+# ────────────────────────────────────────────────────────────
+# 1) Descargas (una consulta GAQL por tipo)
+# ────────────────────────────────────────────────────────────
+def _load_metrics(start: date, end: date) -> pd.DataFrame:
+    return gads.fetch_ads_metrics(gads.get_client(), gads._get_customer_id(),
+                                  start.isoformat(), end.isoformat())
+
+_LOADERS: Dict[str, Callable[[date, date], Any]] = {
+    "metrics":  _load_metrics,
+    "geo":      gads.fetch_geo_performance,
+    "devices":  gads.fetch_device_performance,
+    "ages":     gads.fetch_age_performance,
+    "genders":  gads.fetch_gender_performance,
+    "adgroups": gads.fetch_adgroup_performance,
+    "keywords": gads.fetch_keyword_performance,
+    "hour_dow": gads.fetch_hour_dow_performance,
+}
+
+# ────────────────────────────────────────────────────────────
+# 2) Derivados (se calculan a partir de descargas ya cacheadas)
+# ────────────────────────────────────────────────────────────
+def _overview_deps(start: date, end: date) -> List[Key]:
+    prev_start, prev_end = gads.previous_period(start, end)
+    return [("metrics", start, end), ("metrics", prev_start, prev_end)]
+
+_DERIVED: Dict[str, Tuple[Callable[[date, date], List[Key]], Callable[..., Any]]] = {
+    "daily":     (lambda s, e: [("metrics", s, e)], gads.summarize_daily),
+    "campaigns": (lambda s, e: [("metrics", s, e)], gads.summarize_campaigns),
+    "overview":  (_overview_deps, gads.summarize_overview),
+}
+
+KINDS = tuple(_LOADERS) + tuple(_DERIVED)
+
+# ────────────────────────────────────────────────────────────
+# 3) Caché + peticiones en vuelo
+# ────────────────────────────────────────────────────────────
+_cache: "OrderedDict[Key, Tuple[float, Any]]" = OrderedDict()
+_inflight: Dict[Key, Future] = {}
+_lock = threading.RLock()  # reentrante: add_done_callback puede ejecutarse dentro del lock
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ads-service")
+
+
+def _as_date(value: date | str) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _conform(kind: str, value: Any) -> Any:
+    """Garantiza el esquema del tipo aunque la consulta no devuelva filas."""
+    cols = SCHEMAS.get(kind)
+    if cols is None or not isinstance(value, pd.DataFrame):
+        return value
+    if value.empty:
+        return pd.DataFrame(columns=cols)
+    return value[[c for c in cols if c in value.columns]]
+
+
+def _cached(key: Key) -> Tuple[bool, Any]:
+    hit = _cache.get(key)
+    if hit and time.monotonic() - hit[0] < CACHE_TTL_SECONDS:
+        _cache.move_to_end(key)
+        return True, hit[1]
+    return False, None
+
+
+def _put(key: Key, value: Any) -> None:
+    """Guarda `value` y descarta lo caducado y lo menos usado (llamar con `_lock`)."""
+    now = time.monotonic()
+    _cache[key] = (now, value)
+    _cache.move_to_end(key)
+    for k in [k for k, (ts, _) in _cache.items() if now - ts >= CACHE_TTL_SECONDS]:
+        del _cache[k]
+    while len(_cache) > CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def _submit(key: Key) -> Future:
+    """Devuelve un Future para `key`, reutilizando el que ya esté en vuelo."""
+    with _lock:
+        found, value = _cached(key)
+        if found:
+            fut: Future = Future()
+            fut.set_result(value)
+            return fut
+        fut = _inflight.get(key)
+        if fut is None:
+            kind, start, end = key
+            fut = _pool.submit(_LOADERS[kind], start, end)
+            _inflight[key] = fut
+            fut.add_done_callback(lambda f, k=key: _store(k, f))
+        return fut
+
+
+def _store(key: Key, fut: Future) -> None:
+    with _lock:
+        _inflight.pop(key, None)
+        if fut.exception() is None:
+            _put(key, _conform(key[0], fut.result()))
+
+
+# ────────────────────────────────────────────────────────────
+# 4) API pública
+# ────────────────────────────────────────────────────────────
+def get_many(kinds: Iterable[str], start: date | str, end: date | str) -> Dict[str, Any]:
+    """
+    Devuelve {tipo: datos} para el rango. Las descargas necesarias se lanzan
+    en paralelo y una misma consulta nunca se ejecuta dos veces a la vez.
+    Los DataFrames devueltos son compartidos: no mutarlos in-place.
+    """
+    start, end = _as_date(start), _as_date(end)
+    kinds = list(kinds)
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        raise ValueError(f"Tipos de datos de Ads desconocidos: {', '.join(unknown)}")
+
+    # 1) lanzar todas las descargas (directas y dependencias de derivados)
+    needed: Dict[Key, None] = {}
+    for kind in kinds:
+        if kind in _DERIVED:
+            with _lock:
+                found, _ = _cached((kind, start, end))
+            if not found:
+                needed.update(dict.fromkeys(_DERIVED[kind][0](start, end)))
+        else:
+            needed[(kind, start, end)] = None
+    futures = {key: _submit(key) for key in needed}
+
+    # 2) resolver en el hilo del llamador (evita bloqueos del pool)
+    raw = {key: _conform(key[0], fut.result()) for key, fut in futures.items()}
+
+    out: Dict[str, Any] = {}
+    for kind in kinds:
+        if kind not in _DERIVED:
+            out[kind] = raw[(kind, start, end)]
+            continue
+        key = (kind, start, end)
+        with _lock:
+            found, value = _cached(key)
+        if not found:
+            deps, combine = _DERIVED[kind]
+            args = [raw[d] if d in raw else _conform(d[0], _submit(d).result())
+                    for d in deps(start, end)]
+            value = _conform(kind, combine(*args))
+            with _lock:
+                _put(key, value)
+        out[kind] = value
+    return out
+
+
+def get(kind: str, start: date | str, end: date | str) -> Any:
+    """Atajo de `get_many` para un único tipo."""
+    return get_many([kind], start, end)[kind]
+
+
+def customer_id() -> str:
+    """ID de cliente configurado (vacío si falta la configuración)."""
+    return gads._get_customer_id()
+
+
+def invalidate() -> None:
+    """Vacía la caché (p.ej. tras cambiar de cuenta)."""
+    with _lock:
+        _cache.clear()
+    logging.info("Caché de Google Ads vaciada.")
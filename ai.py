@@ -1,21 +1,182 @@
-import openai
+import json
 import logging
-from config import OPENAI_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+import ai_cache
+import ai_client
+from ai_client import AIUnavailable
+from config import AI_BATCH_MODE, AI_BATCH_WORKERS, OPENAI_MODEL
 
-openai.api_key = OPENAI_API_KEY
+SYSTEM_PROMPT = "Eres SkyIntel AI, un asistente experto en análisis de datos web, GA4 y redes sociales. Responde en español, claro, conciso y enfocado en insights accionables."
+BATCH_MODES = ("concurrent", "combined")
 
-def get_openai_response(prompt, context=""):
+
+def _messages(prompt, context="", history=None):
+    """`history`: turnos previos del chat ({role, content}, ver chat_store.window)."""
+    full_prompt = f"{context}\n\nPregunta/Tarea: {prompt}\n\nResponde en español:"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *(history or []),
+        {"role": "user", "content": full_prompt}
+    ]
+
+
+def response_key(prompt, context="", model=None, history=None):
+    """Clave de caché de la petición (ver ai_cache.normalize); los turnos previos forman parte de ella."""
+    if history:
+        context = "\n".join(f"{m['role']}: {m['content']}" for m in history) + f"\n{context}"
+    return ai_cache.cache_key(model or OPENAI_MODEL, SYSTEM_PROMPT, prompt, context)
+
+
+def ask_openai(prompt, context="", model=None):
+    """Respuesta de OpenAI, servida desde la caché persistente si existe; los errores se propagan al llamador."""
+    model = model or OPENAI_MODEL
+    key = response_key(prompt, context, model)
+    cached = ai_cache.get(key)
+    if cached is not None:
+        return cached
+    text, usage = _complete(_messages(prompt, context), model)
+    ai_cache.put(key, model, text, **usage)
+    return text
+
+
+def _complete(messages, model, **kwargs):
+    """(texto, {prompt_tokens, completion_tokens}) de una llamada sin caché (vía ai_client)."""
+    response = ai_client.complete(messages, model, **kwargs)
+    usage = getattr(response, "usage", None)
+    return response.choices[0].message.content.strip(), {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def stream_openai(prompt, context="", model=None, history=None):
+    """
+    Genera la respuesta por fragmentos a medida que llegan (API de streaming).
+    Un acierto de caché se entrega de una vez; la respuesta completa se
+    guarda en la caché al terminar. Los errores se propagan al llamador.
+    """
+    model = model or OPENAI_MODEL
+    key = response_key(prompt, context, model, history)
+    cached = ai_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    stream = ai_client.stream(_messages(prompt, context, history), model)
+    parts, usage = [], None
+    for chunk in stream:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    ai_cache.put(key, model, "".join(parts).strip(),
+                 prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                 completion_tokens=getattr(usage, "completion_tokens", 0))
+
+
+def failure_text(e):
+    """Texto para el usuario cuando no hay respuesta: provisional si el cliente falló rápido."""
+    if isinstance(e, AIUnavailable):
+        return f"El asistente de IA no está disponible ahora: {e}."
+    return f"Hubo un error al contactar al asistente de IA: {e}. ¿Está bien configurada la API Key?"
+
+
+def _log_failure(e):
+    if isinstance(e, AIUnavailable):
+        logging.warning(f"OpenAI no disponible: {e}")
+    else:
+        logging.error(f"Error llamando a OpenAI: {e}")
+
+
+def get_openai_response(prompt, context="", model=None):
     """Función para obtener respuesta de OpenAI."""
     try:
-        full_prompt = f"{context}\n\nPregunta/Tarea: {prompt}\n\nResponde en español:"
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Eres SkyIntel AI, un asistente experto en análisis de datos web, GA4 y redes sociales. Responde en español, claro, conciso y enfocado en insights accionables."},
-                {"role": "user", "content": full_prompt}
-            ]
-        )
-        return response.choices[0].message.content.strip()
+        return ask_openai(prompt, context, model)
     except Exception as e:
-        logging.error(f"Error llamando a OpenAI: {e}")
-        return f"Hubo un error al contactar al asistente de IA: {e}. ¿Está bien configurada la API Key?"
\ No newline at end of file
+        _log_failure(e)
+        return failure_text(e)
+
+
+# ---------- Varias tarjetas a la vez ----------
+
+
+def _batch_concurrent(requests, model):
+    """Una llamada por petición, en paralelo (como mucho AI_BATCH_WORKERS a la vez)."""
+    def one(req):
+        try:
+            return _complete(_messages(*req), model)
+        except Exception as e:
+            _log_failure(e)
+            return e, None
+    with ThreadPoolExecutor(max_workers=max(1, min(AI_BATCH_WORKERS, len(requests)))) as pool:
+        return list(pool.map(one, requests))
+
+
+def _batch_combined(requests, model):
+    """
+    Todas las peticiones en UNA llamada con salida JSON {"s1": ..., "s2": ...}.
+    El contexto del sistema se envía una sola vez; los tokens se reparten
+    a partes iguales entre las secciones para la caché.
+    """
+    sections = "\n\n".join(
+        f"### s{i}\nContexto:\n{context}\nTarea: {prompt}"
+        for i, (prompt, context) in enumerate(requests, 1))
+    keys = ", ".join(f'"s{i}"' for i in range(1, len(requests) + 1))
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{sections}\n\nResponde en español cada sección por separado. "
+                                    f"Devuelve sólo un objeto JSON con las claves {keys}; "
+                                    f"cada valor es el texto de esa sección."},
+    ]
+    text, usage = _complete(messages, model, response_format={"type": "json_object"})
+    answers = json.loads(text)
+    share = {k: v // len(requests) for k, v in usage.items()}
+    return [(str(answers[f"s{i}"]).strip(), share) if answers.get(f"s{i}") else (None, None)
+            for i in range(1, len(requests) + 1)]
+
+
+def get_openai_responses(requests, mode=None, model=None):
+    """
+    Respuestas para varias peticiones (prompt, contexto) de una misma página.
+    `mode` (AI_BATCH_MODE por defecto):
+      · "concurrent": una llamada por tarjeta, en paralelo → latencia ≈ la más lenta
+      · "combined":   una sola llamada con salida JSON por secciones → un único
+                      prompt de sistema y un único viaje de ida y vuelta
+    Cada respuesta pasa por la caché; sólo se piden las que faltan. Las
+    secciones que la llamada combinada no devuelva se piden por separado.
+    """
+    mode = mode or AI_BATCH_MODE
+    if mode not in BATCH_MODES:
+        raise ValueError(f"Modo de lote no soportado: {mode!r} (usa {' o '.join(BATCH_MODES)})")
+    model = model or OPENAI_MODEL
+    keys = [response_key(prompt, context, model) for prompt, context in requests]
+    texts = [ai_cache.get(key) for key in keys]
+    pending = [i for i, text in enumerate(texts) if text is None]
+
+    if pending and mode == "combined" and len(pending) > 1:
+        try:
+            results = _batch_combined([requests[i] for i in pending], model)
+        except AIUnavailable as e:
+            # fallo rápido: pedirlas por separado fallaría igual
+            _log_failure(e)
+            for i in pending:
+                texts[i] = failure_text(e)
+            return texts
+        except Exception as e:
+            logging.error(f"Error en la llamada combinada a OpenAI: {e}; se piden por separado.")
+            results = [(None, None)] * len(pending)
+        for i, (text, usage) in zip(pending, results):
+            if text is not None:
+                texts[i] = text
+                ai_cache.put(keys[i], model, text, **usage)
+        pending = [i for i in pending if texts[i] is None]
+
+    if pending:
+        for i, (text, usage) in zip(pending, _batch_concurrent([requests[i] for i in pending], model)):
+            if usage is None:
+                texts[i] = failure_text(text)
+            else:
+                texts[i] = text
+                ai_cache.put(keys[i], model, text, **usage)
+    return texts
\ No newline at end of file
@@ -0,0 +1,201 @@
+# ai_cache.py
+# -------------------------------------------------
+# Caché persistente (SQLite) de respuestas de OpenAI, compartida por
+# todos los usuarios, recargas y procesos (incluidos los callbacks de
+# fondo). La clave es un hash de (modelo, prompt de sistema, prompt,
+# contexto) *normalizados*: espacios colapsados (el relleno de
+# `DataFrame.to_string()` no cuenta) y números en forma canónica
+# ("1,234.50" == "1234.5"), de modo que dos resúmenes numéricamente
+# idénticos comparten respuesta.
+#   · TTL: las respuestas caducan a los AI_CACHE_TTL_SECONDS
+#   · LRU: como mucho AI_CACHE_MAX_ENTRIES filas; se expulsan las menos usadas
+#   · Métricas: aciertos, fallos y tokens ahorrados (ver `get_stats`)
+# -------------------------------------------------
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from config import AI_CACHE_MAX_ENTRIES, AI_CACHE_PATH, AI_CACHE_TTL_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key                TEXT PRIMARY KEY,   -- sha256 de la petición normalizada
+    model              TEXT NOT NULL,
+    response           TEXT NOT NULL,
+    prompt_tokens      INTEGER NOT NULL DEFAULT 0,
+    completion_tokens  INTEGER NOT NULL DEFAULT 0,
+    created_at         REAL NOT NULL,      -- epoch; define el TTL
+    last_used          REAL NOT NULL,      -- epoch; define el orden LRU
+    hits               INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name   TEXT PRIMARY KEY,               -- hits / misses / saved_prompt_tokens / saved_completion_tokens
+    value  INTEGER NOT NULL
+);
+"""
+
+MAX_DECIMALS = 10  # más allá es ruido de coma flotante (0.30000000000000004)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+# -------------------------------------------------
+# 1 · Conexión
+# -------------------------------------------------
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = sqlite3.connect(AI_CACHE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+    return conn
+
+
+def _bump(conn, **deltas: int) -> None:
+    conn.executemany(
+        """INSERT INTO counters (name, value) VALUES (?, ?)
+           ON CONFLICT (name) DO UPDATE SET value = value + excluded.value""",
+        [(name, delta) for name, delta in deltas.items() if delta],
+    )
+
+
+# -------------------------------------------------
+# 2 · Normalización y clave
+# -------------------------------------------------
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d{1,3}(?:,\d{3})+(?:\.\d+)?(?![\w])|(?<![\w.])-?\d+\.\d+(?![\w])")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+
+def _canonical_number(match: re.Match) -> str:
+    raw = match.group(0).replace(",", "")
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        return match.group(0)
+    if value.as_tuple().exponent < -MAX_DECIMALS:
+        value = round(value, MAX_DECIMALS)
+    text = format(value.normalize(), "f")
+    return "0" if text in ("-0", "0") else text
+
+
+def normalize(text: str | None) -> str:
+    """Texto con espacios colapsados, sin líneas vacías y con números canónicos."""
+    if not text:
+        return ""
+    text = _NUMBER_RE.sub(_canonical_number, text)
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(model: str, system_prompt: str, prompt: str, context: str = "") -> str:
+    payload = [model, normalize(system_prompt), normalize(prompt), normalize(context)]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------
+# 3 · Lectura / escritura
+# -------------------------------------------------
+def get(key: str, count_miss: bool = True) -> str | None:
+    """
+    Respuesta vigente de `key` o None. Un acierto refresca la posición LRU
+    y suma en las métricas; un fallo sólo cuenta con `count_miss` (quien
+    consulta antes de delegar la llamada en otro proceso no lo cuenta).
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT response, prompt_tokens, completion_tokens, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and now - row["created_at"] > AI_CACHE_TTL_SECONDS:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                if count_miss:
+                    _bump(conn, misses=1)
+                return None
+            conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            _bump(conn, hits=1, saved_prompt_tokens=row["prompt_tokens"],
+                  saved_completion_tokens=row["completion_tokens"])
+            return row["response"]
+    except sqlite3.Error as e:
+        logging.error(f"Error leyendo la caché de IA: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def put(key: str, model: str, response: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    """Guarda la respuesta, purga las caducadas y recorta a AI_CACHE_MAX_ENTRIES (LRU)."""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """INSERT INTO responses (key, model, response, prompt_tokens, completion_tokens, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       response = excluded.response, prompt_tokens = excluded.prompt_tokens,
+                       completion_tokens = excluded.completion_tokens,
+                       created_at = excluded.created_at, last_used = excluded.last_used""",
+                (key, model, response, prompt_tokens or 0, completion_tokens or 0, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - AI_CACHE_TTL_SECONDS,))
+            conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                       SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (AI_CACHE_MAX_ENTRIES,),
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error guardando en la caché de IA: {e}")
+    finally:
+        conn.close()
+
+
+def clear() -> None:
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+    finally:
+        conn.close()
+
+
+# -------------------------------------------------
+# 4 · Métricas
+# -------------------------------------------------
+def get_stats() -> dict:
+    """Aciertos, fallos, tasa de acierto, tokens ahorrados y tamaño de la caché."""
+    conn = _connect()
+    try:
+        counters = {r["name"]: r["value"] for r in conn.execute("SELECT name, value FROM counters")}
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    finally:
+        conn.close()
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    saved_prompt = counters.get("saved_prompt_tokens", 0)
+    saved_completion = counters.get("saved_completion_tokens", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "saved_prompt_tokens": saved_prompt,
+        "saved_completion_tokens": saved_completion,
+        "saved_tokens": saved_prompt + saved_completion,
+        "entries": entries,
+        "max_entries": AI_CACHE_MAX_ENTRIES,
+    }
@@ -0,0 +1,395 @@
+# ai_client.py
+# -------------------------------------------------
+# Cliente compartido de OpenAI con fallo rápido, como graph_client para
+# la Graph API:
+#   · un solo cliente (pool HTTP keep-alive) sin los reintentos ni el
+#     timeout de 10 min por defecto del SDK
+#   · plazo por llamada (AI_DEADLINE_SECONDS) que cubre intentos y esperas;
+#     cada intento usa como mucho AI_TIMEOUT_SECONDS
+#   · como mucho AI_MAX_CONCURRENCY llamadas a la vez
+#   · reintentos con backoff exponencial + jitter de timeouts, errores de
+#     conexión, 429 y 5xx
+#   · circuit breaker: tras AI_BREAKER_FAILURES fallos seguidos las
+#     llamadas fallan al instante durante AI_BREAKER_COOLDOWN_SECONDS;
+#     después pasa una sola de prueba (semiabierto) que lo cierra o lo
+#     vuelve a abrir
+# El estado del breaker, los huecos de concurrencia y las métricas viven
+# en SQLite (AI_CACHE_PATH, junto a la caché de respuestas): los insights
+# se resuelven en procesos de fondo de Dash (uno por trabajo) y todos
+# deben ver el mismo circuito, el mismo límite y las mismas métricas.
+# Cada hueco tiene un plazo, así que un trabajo cancelado (proceso
+# terminado) no lo deja ocupado.
+# Sin API key, con el circuito abierto o sin hueco en el plazo se lanza
+# AIUnavailable sin tocar la red; `ai` lo convierte en la respuesta en
+# caché o en un texto provisional.
+# -------------------------------------------------
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import openai
+
+from config import (
+    AI_BREAKER_COOLDOWN_SECONDS, AI_BREAKER_FAILURES, AI_CACHE_PATH, AI_DEADLINE_SECONDS,
+    AI_MAX_CONCURRENCY, AI_MAX_RETRIES, AI_TIMEOUT_SECONDS, OPENAI_API_KEY,
+)
+
+BACKOFF_BASE_SECONDS = 0.5
+SLOT_POLL_SECONDS = 0.05
+# un stream renueva su hueco cada media lectura máxima, con margen de dos lecturas
+SLOT_RENEW_SECONDS = AI_TIMEOUT_SECONDS / 2
+SLOT_STREAM_LEASE_SECONDS = 2 * AI_TIMEOUT_SECONDS
+RETRY_ERRORS = (openai.APITimeoutError, openai.APIConnectionError,
+                openai.RateLimitError, openai.InternalServerError)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+COUNTERS = ("requests", "errors", "retries", "timeouts", "short_circuited", "rejected",
+            "prompt_tokens", "completion_tokens")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS client_breaker (
+    id           INTEGER PRIMARY KEY CHECK (id = 1),
+    state        TEXT NOT NULL,      -- closed / open / half_open
+    failures     INTEGER NOT NULL,   -- fallos seguidos
+    opened_at    REAL NOT NULL,      -- epoch de la última apertura
+    probe_until  REAL NOT NULL       -- epoch hasta el que la llamada de prueba tiene el turno
+);
+INSERT OR IGNORE INTO client_breaker VALUES (1, 'closed', 0, 0, 0);
+CREATE TABLE IF NOT EXISTS client_slots (
+    token       TEXT PRIMARY KEY,    -- una llamada en curso
+    expires_at  REAL NOT NULL        -- epoch; pasado el plazo el hueco se libera
+);
+CREATE TABLE IF NOT EXISTS client_metrics (
+    name   TEXT PRIMARY KEY,
+    value  REAL NOT NULL
+);
+"""
+
+
+class AIUnavailable(RuntimeError):
+    """El asistente no puede responder ahora (sin API key, circuito abierto o saturado)."""
+
+
+_client = None
+_lock = threading.Lock()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _get_client() -> openai.OpenAI:
+    global _client
+    if not OPENAI_API_KEY:
+        raise AIUnavailable("OPENAI_API_KEY no configurada")
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = openai.OpenAI(
+                    api_key=OPENAI_API_KEY,
+                    timeout=AI_TIMEOUT_SECONDS,
+                    max_retries=0,  # los reintentos (y su plazo) los lleva este módulo
+                    http_client=openai.DefaultHttpxClient(),
+                )
+    return _client
+
+
+# -------------------------------------------------
+# 1 · Estado compartido entre procesos
+# -------------------------------------------------
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = sqlite3.connect(AI_CACHE_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+    return conn
+
+
+@contextmanager
+def _shared():
+    """Transacción de escritura (BEGIN IMMEDIATE: un proceso a la vez) sobre el estado."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _bump(conn, latency: float | None = None, **deltas: float) -> None:
+    conn.executemany(
+        """INSERT INTO client_metrics (name, value) VALUES (?, ?)
+           ON CONFLICT (name) DO UPDATE SET value = value + excluded.value""",
+        [(name, delta) for name, delta in deltas.items() if delta],
+    )
+    if latency is not None:
+        conn.execute(
+            """INSERT INTO client_metrics (name, value) VALUES ('latency_max', ?)
+               ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)""",
+            (latency,),
+        )
+
+
+def _count(latency: float | None = None, **deltas: float) -> None:
+    """Suma a las métricas; un fallo de SQLite no debe tumbar una llamada ya hecha."""
+    try:
+        with _shared() as conn:
+            _bump(conn, latency, **deltas)
+    except sqlite3.Error as e:
+        logging.error(f"OpenAI: no se pudieron guardar las métricas: {e}")
+
+
+# -------------------------------------------------
+# 2 · Circuit breaker y huecos de concurrencia
+# -------------------------------------------------
+def _admit(lease: float) -> bool:
+    """
+    Deja pasar la llamada o lanza AIUnavailable si el circuito está abierto.
+    Devuelve True si es la llamada de prueba del estado semiabierto (tiene
+    el turno durante `lease` segundos).
+    """
+    now = time.time()
+    with _shared() as conn:
+        row = conn.execute("SELECT state, opened_at, probe_until FROM client_breaker").fetchone()
+        state = row["state"]
+        if state == OPEN and now - row["opened_at"] >= AI_BREAKER_COOLDOWN_SECONDS:
+            state = HALF_OPEN
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and row["probe_until"] <= now:
+            # una sola llamada de prueba, entre todos los procesos
+            conn.execute("UPDATE client_breaker SET state = ?, probe_until = ?", (HALF_OPEN, now + lease))
+            return True
+        _bump(conn, short_circuited=1)
+        retry_in = max(0.0, AI_BREAKER_COOLDOWN_SECONDS - (now - row["opened_at"]))
+    raise AIUnavailable(f"asistente de IA en pausa tras {AI_BREAKER_FAILURES} fallos seguidos "
+                        f"(reintento en {retry_in:.0f}s)")
+
+
+def _record(success: bool, was_probe: bool = False) -> None:
+    try:
+        with _shared() as conn:
+            row = conn.execute("SELECT state, failures FROM client_breaker").fetchone()
+            if success:
+                if row["state"] != CLOSED:
+                    logging.info("OpenAI: circuito cerrado, el servicio responde de nuevo.")
+                conn.execute("UPDATE client_breaker SET state = ?, failures = 0, probe_until = 0", (CLOSED,))
+                return
+            failures = row["failures"] + 1
+            if was_probe or (row["state"] == CLOSED and failures >= AI_BREAKER_FAILURES):
+                if row["state"] != OPEN:
+                    logging.warning(f"OpenAI: circuito abierto tras {failures} fallos seguidos; "
+                                    f"se responde sin llamar durante {AI_BREAKER_COOLDOWN_SECONDS}s.")
+                conn.execute(
+                    "UPDATE client_breaker SET state = ?, failures = ?, opened_at = ?, probe_until = 0",
+                    (OPEN, failures, time.time()),
+                )
+            else:
+                conn.execute("UPDATE client_breaker SET failures = ?", (failures,))
+    except sqlite3.Error as e:
+        logging.error(f"OpenAI: no se pudo actualizar el circuit breaker: {e}")
+
+
+def _release_probe() -> None:
+    """Devuelve el turno de la llamada de prueba sin decidir el estado del circuito."""
+    try:
+        with _shared() as conn:
+            conn.execute("UPDATE client_breaker SET probe_until = 0")
+    except sqlite3.Error as e:
+        logging.error(f"OpenAI: no se pudo liberar la llamada de prueba: {e}")
+
+
+def _acquire_slot(end: float) -> str | None:
+    """Reserva uno de los AI_MAX_CONCURRENCY huecos antes de `end` (monotonic); None si no hay."""
+    token = uuid.uuid4().hex
+    while True:
+        remaining = end - time.monotonic()
+        now = time.time()
+        with _shared() as conn:
+            conn.execute("DELETE FROM client_slots WHERE expires_at < ?", (now,))
+            used = conn.execute("SELECT COUNT(*) FROM client_slots").fetchone()[0]
+            if used < AI_MAX_CONCURRENCY:
+                # el plazo del hueco cubre la llamada entera (su último intento incluido)
+                conn.execute("INSERT INTO client_slots (token, expires_at) VALUES (?, ?)",
+                             (token, now + max(remaining, 0.0) + AI_TIMEOUT_SECONDS))
+                return token
+        if remaining <= SLOT_POLL_SECONDS:
+            return None
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+def _renew_slot(token: str) -> None:
+    """Alarga el plazo del hueco mientras se lee un stream (cada lectura tiene AI_TIMEOUT_SECONDS)."""
+    try:
+        with _shared() as conn:
+            conn.execute("UPDATE client_slots SET expires_at = ? WHERE token = ?",
+                         (time.time() + SLOT_STREAM_LEASE_SECONDS, token))
+    except sqlite3.Error as e:
+        logging.error(f"OpenAI: no se pudo renovar el hueco de concurrencia: {e}")
+
+
+def _release_slot(token: str) -> None:
+    try:
+        with _shared() as conn:
+            conn.execute("DELETE FROM client_slots WHERE token = ?", (token,))
+    except sqlite3.Error as e:
+        logging.error(f"OpenAI: no se pudo liberar el hueco de concurrencia: {e}")
+
+
+# -------------------------------------------------
+# 3 · Llamadas
+# -------------------------------------------------
+def _backoff(attempt: int, error: Exception) -> float:
+    retry_after = None
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    jitter = random.uniform(0, BACKOFF_BASE_SECONDS)
+    return (retry_after if retry_after is not None else BACKOFF_BASE_SECONDS * 2 ** attempt) + jitter
+
+
+def _call(deadline: float | None, hold_slot: bool = False, **kwargs):
+    """
+    `chat.completions.create(**kwargs)` con hueco de concurrencia, plazo,
+    reintentos y breaker. Los errores no reintentables (400, 401…) se
+    lanzan tal cual. Con `hold_slot` devuelve `(respuesta, hueco)` y el
+    hueco queda ocupado hasta que el llamador lo libere (streams).
+    """
+    client = _get_client()
+    budget = deadline or AI_DEADLINE_SECONDS
+    end = time.monotonic() + budget
+    was_probe = _admit(budget + AI_TIMEOUT_SECONDS)
+    slot = _acquire_slot(end)
+    if slot is None:
+        # cola local, no fallo de OpenAI: sólo cuenta como rechazo, no para el breaker
+        _count(rejected=1)
+        if was_probe:
+            _release_probe()
+        raise AIUnavailable("asistente de IA saturado: sin hueco antes del plazo")
+    held = False
+    try:
+        for attempt in range(AI_MAX_RETRIES + 1):
+            remaining = end - time.monotonic()
+            t0 = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    timeout=min(AI_TIMEOUT_SECONDS, max(remaining, 0.1)), **kwargs)
+            except RETRY_ERRORS as e:
+                error = e
+            except Exception as e:
+                # 401/403 no se arreglan solos: cuentan para abrir el circuito;
+                # un 400/404 es problema de la petición, no del servicio
+                _record(isinstance(e, openai.APIStatusError) and not isinstance(
+                    e, (openai.AuthenticationError, openai.PermissionDeniedError)), was_probe)
+                _count(requests=1, errors=1)
+                raise
+            else:
+                error = None
+            elapsed = time.perf_counter() - t0
+            timeout = isinstance(error, openai.APITimeoutError)
+            if error is None:
+                _count(elapsed, requests=1, latency_total=elapsed)
+                _record(True, was_probe)
+                held = hold_slot
+                return (response, slot) if hold_slot else response
+
+            wait = _backoff(attempt, error)
+            if attempt == AI_MAX_RETRIES or time.monotonic() + wait >= end:
+                _count(elapsed, requests=1, latency_total=elapsed, timeouts=int(timeout), errors=1)
+                _record(False, was_probe)
+                raise error
+            _count(elapsed, requests=1, latency_total=elapsed, timeouts=int(timeout), retries=1)
+            logging.info(f"OpenAI: reintento {attempt + 1}/{AI_MAX_RETRIES} en {wait:.1f}s "
+                         f"({type(error).__name__})")
+            time.sleep(wait)
+    finally:
+        if not held:
+            _release_slot(slot)
+
+
+def _count_usage(usage) -> None:
+    if usage is None:
+        return
+    _count(prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+           completion_tokens=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def complete(messages: list[dict], model: str, deadline: float | None = None, **kwargs):
+    """Respuesta completa de chat.completions (ver `_call`)."""
+    response = _call(deadline, model=model, messages=messages, **kwargs)
+    _count_usage(getattr(response, "usage", None))
+    return response
+
+
+def stream(messages: list[dict], model: str, deadline: float | None = None):
+    """
+    Fragmentos de una respuesta en streaming. El plazo y los reintentos
+    cubren hasta la apertura del stream; después cada lectura tiene
+    AI_TIMEOUT_SECONDS. El hueco de concurrencia se mantiene (renovado)
+    hasta el último fragmento. Un corte a mitad cuenta como fallo para el
+    breaker.
+    """
+    chunks, slot = _call(deadline, hold_slot=True, model=model, messages=messages,
+                         stream=True, stream_options={"include_usage": True})
+    renewed = time.monotonic()
+    try:
+        _renew_slot(slot)
+        for chunk in chunks:
+            if time.monotonic() - renewed >= SLOT_RENEW_SECONDS:
+                _renew_slot(slot)
+                renewed = time.monotonic()
+            _count_usage(chunk.usage)
+            yield chunk
+    except openai.OpenAIError:
+        _record(False)
+        raise
+    finally:
+        _release_slot(slot)
+
+
+# -------------------------------------------------
+# 4 · Métricas
+# -------------------------------------------------
+def get_metrics() -> dict:
+    """
+    Estado del breaker, llamadas, errores, reintentos, rechazos, tokens y
+    latencia, sumando las llamadas de todos los procesos.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        values = {r["name"]: r["value"] for r in conn.execute("SELECT name, value FROM client_metrics")}
+        breaker = conn.execute("SELECT state, failures, opened_at, probe_until FROM client_breaker").fetchone()
+        in_flight = conn.execute("SELECT COUNT(*) FROM client_slots WHERE expires_at >= ?", (now,)).fetchone()[0]
+    finally:
+        conn.close()
+    metrics = {name: int(values.get(name, 0)) for name in COUNTERS}
+    state = breaker["state"]
+    if state == OPEN and now - breaker["opened_at"] >= AI_BREAKER_COOLDOWN_SECONDS:
+        state = HALF_OPEN  # la próxima llamada será la de prueba
+    latency_total = values.get("latency_total", 0.0)
+    return {
+        **metrics,
+        "in_flight": in_flight,
+        "latency_total": latency_total,
+        "latency_max": values.get("latency_max", 0.0),
+        "state": state,
+        "consecutive_failures": breaker["failures"],
+        "retry_in": max(0.0, AI_BREAKER_COOLDOWN_SECONDS - (now - breaker["opened_at"])) if state == OPEN else 0.0,
+        "latency_avg": latency_total / metrics["requests"] if metrics["requests"] else 0.0,
+    }
@@ -0,0 +1,182 @@
+# ai_context.py
+# -------------------------------------------------
+# Contextos compactos y acotados para los prompts de IA.
+# Las tablas resumen se serializan como CSV (sin el relleno de columnas
+# de `DataFrame.to_string()`, floats redondeados, enteros sin ".0") y el
+# contexto completo se ajusta a un presupuesto de tokens por llamada
+# (AI_CONTEXT_MAX_TOKENS), contados con el tokenizador local del modelo
+# (tiktoken; sin él, una estimación por caracteres).
+#
+#   ctx = ContextBuilder()
+#   ctx.add("Vuelos/mes", vuelos_mes, priority=0)        # 0 = lo más importante
+#   ctx.add("Top destinos", por_destino, priority=1, max_rows=10)
+#   insight_request(prompt, ctx.build())
+#
+# Si no cabe, primero se recortan filas de las tablas menos importantes,
+# luego se quitan secciones enteras (de menor a mayor prioridad) y, como
+# último recurso, se corta el texto.
+# -------------------------------------------------
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from config import AI_CONTEXT_MAX_TOKENS, OPENAI_MODEL
+
+DEFAULT_MAX_ROWS = 10
+MIN_TABLE_ROWS = 3
+DECIMALS = 2
+LARGE_NUMBER = 1000  # a partir de aquí los decimales no aportan al análisis
+CHARS_PER_TOKEN = 3  # estimación conservadora sin tiktoken (los números tokenizan mal)
+
+_encoding = None
+_encoding_ready = False
+
+
+# -------------------------------------------------
+# 1 · Tokens
+# -------------------------------------------------
+def _get_encoding():
+    """Codificación tiktoken del modelo configurado, o None si no está disponible."""
+    global _encoding, _encoding_ready
+    if not _encoding_ready:
+        _encoding_ready = True
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+            except KeyError:  # modelo que tiktoken no conoce
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # sin paquete o sin el fichero BPE (primera carga sin red)
+            logging.warning(f"Tokenizador local no disponible ({type(e).__name__}); "
+                            f"los tokens de contexto se estiman por caracteres.")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """`text` recortado a `max_tokens` (con "…" si se cortó)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        head = text[:max(0, max_tokens - 1) * CHARS_PER_TOKEN]
+    else:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:max(0, max_tokens - 1)])
+    return head.rstrip() + "…"
+
+
+# -------------------------------------------------
+# 2 · Tablas compactas
+# -------------------------------------------------
+def compact_table(data: pd.DataFrame | pd.Series, max_rows: int | None = None,
+                  decimals: int = DECIMALS) -> str:
+    """
+    CSV de `data` para un prompt: cabecera + filas, floats redondeados a
+    `decimals` (a unidades si la columna llega a miles), enteros sin ".0"
+    y el índice sólo si aporta (tiene nombre o no es numérico: no el de
+    posiciones que deja un `sort_values`). Con `max_rows` añade "(+N filas)".
+    """
+    df = data.to_frame(name=data.name or "valor") if isinstance(data, pd.Series) else data
+    hidden = 0
+    if max_rows is not None and len(df) > max_rows:
+        hidden = len(df) - max_rows
+        df = df.head(max_rows)
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            series = series.round(0 if series.abs().max() >= LARGE_NUMBER else decimals)
+            known = series.dropna()
+            # ±inf (p.ej. un ratio con denominador 0) no cabe en Int64: se deja como float
+            if np.isfinite(known).all() and known.eq(known.round()).all():
+                series = series.astype("Int64")
+            df[col] = series
+    with_index = any(df.index.names) or not pd.api.types.is_integer_dtype(df.index)
+    text = df.to_csv(index=with_index, lineterminator="\n").rstrip("\n")
+    if hidden:
+        text += f"\n(+{hidden} filas)"
+    return text
+
+
+# -------------------------------------------------
+# 3 · Constructor con presupuesto
+# -------------------------------------------------
+class _Section:
+    """Bloque del contexto: texto fijo o tabla que se puede acortar."""
+
+    def __init__(self, title: str | None, body, priority: int, max_rows: int | None):
+        self.title = title
+        self.priority = priority
+        self.frame = body if isinstance(body, (pd.DataFrame, pd.Series)) else None
+        self.text = None if self.frame is not None else str(body)
+        self.rows = None
+        if self.frame is not None:
+            self.rows = min(len(self.frame), max_rows or DEFAULT_MAX_ROWS)
+
+    def render(self) -> str:
+        if self.frame is not None:
+            body = compact_table(self.frame, self.rows)
+            return f"{self.title}:\n{body}" if self.title else body
+        return f"{self.title}: {self.text}" if self.title else self.text
+
+    def shrink(self) -> bool:
+        """Reduce las filas a la mitad (mínimo MIN_TABLE_ROWS); False si ya no se puede."""
+        if self.frame is None or self.rows <= MIN_TABLE_ROWS:
+            return False
+        self.rows = max(MIN_TABLE_ROWS, self.rows // 2)
+        return True
+
+
+class ContextBuilder:
+    """
+    Junta secciones (texto o tablas) y las ajusta a `budget` tokens
+    (AI_CONTEXT_MAX_TOKENS por defecto). Prioridad menor = más importante;
+    el orden de salida es el de inserción.
+    """
+
+    def __init__(self, budget: int | None = None):
+        self.budget = budget or AI_CONTEXT_MAX_TOKENS
+        self._sections: list[_Section] = []
+
+    def add(self, title: str | None, body, priority: int = 1, max_rows: int | None = None) -> "ContextBuilder":
+        """Añade texto, DataFrame o Series; las tablas vacías o el texto vacío se ignoran."""
+        if body is None or (isinstance(body, (pd.DataFrame, pd.Series)) and body.empty) or \
+                (isinstance(body, str) and not body.strip()):
+            return self
+        self._sections.append(_Section(title, body, priority, max_rows))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def build(self) -> str:
+        sections = list(self._sections)
+        if not sections:
+            return ""
+        rendered = {id(s): s.render() for s in sections}
+        costs = {id(s): count_tokens(rendered[id(s)]) for s in sections}
+
+        def total():
+            return sum(costs[id(s)] for s in sections) + len(sections) - 1  # saltos de línea
+
+        # menos importante primero; a igual prioridad, la última añadida
+        order = sorted(sections, key=lambda s: (s.priority, self._sections.index(s)), reverse=True)
+        for section in order:
+            while total() > self.budget and section.shrink():
+                rendered[id(section)] = section.render()
+                costs[id(section)] = count_tokens(rendered[id(section)])
+        for section in order:
+            if total() <= self.budget or len(sections) == 1:
+                break
+            sections.remove(section)
+        return truncate("\n".join(rendered[id(s)] for s in sections), self.budget)
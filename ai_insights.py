@@ -0,0 +1,125 @@
+# ai_insights.py
+# -------------------------------------------------
+# Insights de IA asíncronos: los callbacks de gráficos ya no esperan a
+# OpenAI. En lugar del texto, dejan en un dcc.Store (`*-ai-insight-data`)
+# una *petición* {prompt, context, model}; un callback de fondo de Dash
+# (DiskcacheManager) la resuelve y rellena la tarjeta visible cuando
+# llega la respuesta. Mientras tanto la tarjeta muestra "Generando…".
+#
+# · Caché: las respuestas viven en `ai_cache` (SQLite, compartida entre
+#   procesos). Si la respuesta ya existe, la petición se sustituye por
+#   el texto al construirla y no se lanza ningún trabajo.
+# · Cancelación: cada tarjeta se registra con los Inputs de sus filtros;
+#   si cambian mientras el trabajo corre, Dash lo cancela.
+# · Sin `dash[diskcache]` (psutil / multiprocess) las tarjetas se
+#   resuelven en un callback normal: sigue siendo una petición aparte,
+#   así que los gráficos tampoco esperan.
+# -------------------------------------------------
+import logging
+import os
+
+import diskcache
+from dash import Input, Output, html
+
+import ai_cache
+from ai import get_openai_responses, response_key
+from config import AI_CACHE_DIR, AI_JOB_EXPIRE_SECONDS, OPENAI_MODEL
+
+DEFAULT_NO_INSIGHT = "Análisis IA no disponible o datos insuficientes."
+PENDING_INSIGHT = html.Span([
+    html.Span(className="spinner-border spinner-border-sm me-2", role="status"),
+    "Generando análisis IA…",
+], className="text-muted")
+POLL_INTERVAL_MS = 500
+
+_manager = None
+_manager_ready = False
+
+
+# -------------------------------------------------
+# 1 · Peticiones (lo que guardan los dcc.Store)
+# -------------------------------------------------
+def insight_request(prompt: str, context: str = "", model: str | None = None) -> dict | str:
+    """
+    Valor para el Store `*-ai-insight-data`: el texto si ya está en caché,
+    si no la petición que resolverá el callback de fondo.
+    """
+    # un fallo aquí no cuenta: lo contará el trabajo de fondo al resolverla
+    text = ai_cache.get(response_key(prompt, context, model), count_miss=False)
+    if text is not None:
+        return text
+    return {"prompt": prompt, "context": context, "model": model or OPENAI_MODEL}
+
+
+def _is_request(value) -> bool:
+    return isinstance(value, dict) and "prompt" in value
+
+
+def resolve_insights(values: list) -> list:
+    """
+    Texto de cada valor: las peticiones pendientes se resuelven juntas con
+    `ai.get_openai_responses` (en paralelo o en una sola llamada, según
+    AI_BATCH_MODE); texto plano o None pasan tal cual.
+    """
+    texts = list(values)
+    pending = [i for i, value in enumerate(values) if _is_request(value)]
+    if pending:
+        answers = get_openai_responses(
+            [(values[i]["prompt"], values[i].get("context", "")) for i in pending],
+            model=values[pending[0]].get("model"))
+        for i, text in zip(pending, answers):
+            texts[i] = text
+    return texts
+
+
+# -------------------------------------------------
+# 2 · Callbacks de tarjeta
+# -------------------------------------------------
+def _background_manager():
+    """DiskcacheManager compartido, o None si faltan las dependencias de dash[diskcache]."""
+    global _manager, _manager_ready
+    if not _manager_ready:
+        _manager_ready = True
+        try:
+            from dash import DiskcacheManager
+            _manager = DiskcacheManager(diskcache.Cache(os.path.join(AI_CACHE_DIR, "jobs")),
+                                        expire=AI_JOB_EXPIRE_SECONDS)
+        except ImportError:
+            logging.warning("Callbacks de fondo no disponibles (instala dash[diskcache]); "
+                            "los insights IA se resolverán en callbacks normales.")
+    return _manager
+
+
+def _default_render(text):
+    return html.P(text if text and text.strip() else DEFAULT_NO_INSIGHT)
+
+
+def register_insight_group(app, cards: list[tuple[str, str]], cancel=None, render=None) -> None:
+    """
+    Rellena las tarjetas de una página juntas: cada (visible_id, data_id)
+    recibe el insight de su Store (petición o texto) y todas las peticiones
+    pendientes se resuelven en un solo lote.
+    `cancel`: Inputs de los filtros que invalidan los insights en curso.
+    `render`: texto → children de la tarjeta (por defecto un html.P).
+    """
+    render = render or _default_render
+    outputs = [Output(visible_id, 'children') for visible_id, _ in cards]
+    manager = _background_manager()
+    background = {}
+    if manager is not None:
+        background = dict(
+            background=True,
+            manager=manager,
+            interval=POLL_INTERVAL_MS,
+            running=[(output, PENDING_INSIGHT, None) for output in outputs],
+            cancel=list(cancel or []),
+        )
+
+    @app.callback(outputs, [Input(data_id, 'data') for _, data_id in cards], **background)
+    def fill_insight_cards(*values):
+        return [render(text) for text in resolve_insights(list(values))]
+
+
+def register_insight_card(app, visible_id: str, data_id: str, cancel=None, render=None) -> None:
+    """Una sola tarjeta: `visible_id` recibe el insight del Store `data_id`."""
+    register_insight_group(app, [(visible_id, data_id)], cancel=cancel, render=render)
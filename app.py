@@ -12,6 +12,8 @@ from utils import query_ga
 from layout_components import create_ops_sales_layout, create_web_social_layout
 from ops_sales import register_ops_sales_callbacks
 from web_social import register_web_social_callbacks
+from server_table import register_server_table_callbacks
+from chat_stream import CHAT_SESSION_ID, register_chat_session_callbacks
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 app.title = "SkyIntel Dashboard"
@@ -57,12 +59,16 @@ app.layout = dbc.Container([
         dcc.Tab(label='Operaciones y Ventas', value='ops_sales', children=create_ops_sales_layout()),
         dcc.Tab(label='Análisis Web y Redes Sociales', value='web_social', children=create_web_social_layout(min_date_allowed, max_date_allowed, start_date_val, end_date_val)),
     ]),
+    # id de sesión del navegador para el historial de chat en el servidor
+    dcc.Store(id=CHAT_SESSION_ID, storage_type='session'),
 ], fluid=True, style={'background': '#FFFFFF'})
 
 
 # --- Registro de Callbacks ---
 register_ops_sales_callbacks(app)
 register_web_social_callbacks(app)
+register_server_table_callbacks(app)
+register_chat_session_callbacks(app)
 
 
 # --- Ejecución de la App ---
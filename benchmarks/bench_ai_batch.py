@@ -0,0 +1,75 @@
+# benchmarks/bench_ai_batch.py
+# -------------------------------------------------
+# Latencia y tokens de los tres insights de Operaciones y Ventas
+# (Comparativo, Destinos, Operadores) resueltos:
+#   · en serie (como antes: una llamada tras otra)
+#   · "concurrent": una llamada por tarjeta, en paralelo
+#   · "combined":   una sola llamada con salida JSON por secciones
+# Usa datos sintéticos y una caché de IA temporal vacía en cada ronda,
+# así que hace llamadas reales: necesita OPENAI_API_KEY.
+#
+#   python benchmarks/bench_ai_batch.py          # 3 rondas
+#   python benchmarks/bench_ai_batch.py 5        # rondas
+# -------------------------------------------------
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["AI_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_ai_cache.sqlite3")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import ai  # noqa: E402
+import ai_cache  # noqa: E402
+import ai_client  # noqa: E402
+import ops_cube  # noqa: E402
+import ops_sales  # noqa: E402
+from bench_ops_cube import dataset  # noqa: E402
+
+ROWS_PER_YEAR = 20_000
+ROUNDS = 3
+
+
+def sequential(requests):
+    return [ai.get_openai_response(prompt, context) for prompt, context in requests]
+
+
+def batched(mode):
+    return lambda requests: ai.get_openai_responses(requests, mode=mode)
+
+
+def _run(fn, requests):
+    ai_cache.clear()
+    before = ai_client.get_metrics()
+    t0 = time.perf_counter()
+    fn(requests)
+    elapsed = time.perf_counter() - t0
+    after = ai_client.get_metrics()
+    return elapsed, {k: after[k] - before[k] for k in ("requests", "prompt_tokens", "completion_tokens")}
+
+
+def main(argv):
+    if not os.getenv("OPENAI_API_KEY"):
+        sys.exit("Define OPENAI_API_KEY para ejecutar este benchmark.")
+    rounds = int(argv[0]) if argv else ROUNDS
+
+    cube = ops_cube.build_cube(dataset(ROWS_PER_YEAR))
+    requests = [(r["prompt"], r["context"]) for r in ops_sales.build_insights(cube)]
+    print(f"{len(requests)} insights · modelo {ai.OPENAI_MODEL} · {rounds} rondas")
+
+    for label, fn in (("en serie", sequential), ("concurrent", batched("concurrent")),
+                      ("combined", batched("combined"))):
+        times, usage = [], None
+        for _ in range(rounds):
+            elapsed, usage = _run(fn, requests)
+            times.append(elapsed)
+        times.sort()
+        print(f"  {label:<11} mediana {times[len(times) // 2]:5.2f} s   "
+              f"llamadas {usage['requests']}   tokens {usage['prompt_tokens']:>5} entrada "
+              f"+ {usage['completion_tokens']:>4} salida")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+# benchmarks/bench_ai_context.py
+# -------------------------------------------------
+# Tokens de contexto de los insights de Operaciones y Ventas: los
+# volcados `head().to_string()` anteriores frente a `ai_context`
+# (CSV compacto + presupuesto). Los tokens de entrada dominan el costo
+# y buena parte de la latencia de cada insight. No llama a OpenAI.
+#
+#   python benchmarks/bench_ai_context.py            # 3 años × 20k filas
+#   python benchmarks/bench_ai_context.py 100000     # filas por año
+# -------------------------------------------------
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("AI_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "bench_ai_cache.sqlite3"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import ai_context  # noqa: E402
+import ops_cube  # noqa: E402
+import ops_sales  # noqa: E402
+from bench_ops_cube import dataset  # noqa: E402
+
+ROWS_PER_YEAR = 20_000
+NAMES = ["Comparativo", "Destinos", "Operadores"]
+
+
+# ---------- Implementación anterior (referencia) ----------
+def legacy_tables(cube):
+    """Tablas `head()` que volcaban los contextos anteriores, por insight."""
+    mensual = ops_cube.rollup(ops_sales._with_months(cube), ['Año', 'MonthName'], observed=False)
+    por_destino = ops_cube.rollup(cube, ['Año', 'Destino'])
+    top_vuelos = por_destino[['Año', 'Destino', 'Vuelos']].rename(columns={'Vuelos': 'Cantidad'})\
+        .sort_values('Cantidad', ascending=False)
+    top_ganancia = por_destino[['Año', 'Destino', 'Ganancia']].sort_values('Ganancia', ascending=False)
+    vuelos_operador = ops_cube.rollup(cube, ['Año', 'Operador'], ['Vuelos'])\
+        .sort_values(['Año', 'Vuelos'], ascending=[True, False])
+    ganancia_aeronave = ops_cube.rollup(cube, ['Año', 'Aeronave'], ['Ganancia'])\
+        .sort_values(['Año', 'Ganancia'], ascending=[True, False])
+    return [
+        [("Vuelos/mes", mensual[['Año', 'MonthName', 'Vuelos']].head()),
+         ("Ingresos/mes", mensual[['Año', 'MonthName', 'Monto total a cobrar']].head()),
+         ("Ganancia/mes", mensual[['Año', 'MonthName', 'Ganancia']].head())],
+        [(None, top_vuelos.head()), (None, top_ganancia.head())],
+        [(None, vuelos_operador.head()), (None, ganancia_aeronave.head())],
+    ]
+
+
+def legacy_context(tables):
+    return "\n".join(f"{title}:\n{df.to_string()}" if title else df.to_string()
+                     for title, df in tables)
+
+
+def compact_context(tables):
+    return "\n".join(f"{title}:\n{ai_context.compact_table(df)}" if title else ai_context.compact_table(df)
+                     for title, df in tables)
+
+
+def _row(label, t_a, t_b):
+    print(f"  {label:<12} {t_a:5} → {t_b:5} tokens ({t_b / t_a - 1:+.0%})")
+    return t_a, t_b
+
+
+def _compare(label, a, b):
+    return _row(label, ai_context.count_tokens(a), ai_context.count_tokens(b))
+
+
+def main(argv):
+    n = int(argv[0]) if argv else ROWS_PER_YEAR
+    cube = ops_cube.build_cube(dataset(n))
+    tables = legacy_tables(cube)
+    new = [r["context"] if isinstance(r, dict) else r for r in ops_sales.build_insights(cube)]
+    tokenizer = "tiktoken" if ai_context._get_encoding() is not None else "estimación por caracteres"
+    print(f"Tokenizador: {tokenizer}; presupuesto {ai_context.AI_CONTEXT_MAX_TOKENS} tokens por contexto")
+
+    print("Mismas tablas, to_string() → CSV compacto:")
+    totals = [_compare(name, legacy_context(t), compact_context(t)) for name, t in zip(NAMES, tables)]
+    _row("total", sum(a for a, _ in totals), sum(b for _, b in totals))
+
+    print("Contexto anterior → build_insights (12 meses × años en Comparativo):")
+    totals = [_compare(name, legacy_context(t), b) for name, t, b in zip(NAMES, tables, new)]
+    _row("total", sum(a for a, _ in totals), sum(b for _, b in totals))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+# benchmarks/bench_ops_cube.py
+# -------------------------------------------------
+# Costo de datos de una interacción de filtro en Operaciones y Ventas:
+# filtrar las filas + los groupby de los gráficos (antes) frente a cortar
+# el cubo + roll-ups (`ops_cube`). No incluye la construcción de figuras.
+#
+#   python benchmarks/bench_ops_cube.py            # 3 años × 300k filas
+#   python benchmarks/bench_ops_cube.py 100000     # filas por año
+# -------------------------------------------------
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import ops_cube  # noqa: E402
+from bench_ops_ingest import synthetic_frame  # noqa: E402
+
+ROWS_PER_YEAR = 300_000
+YEARS = (2022, 2023, 2024)
+REPEAT = 5
+FILTERS = [
+    ("sin filtros", None, None, None),
+    ("1 destino, 2 operadores", ["David"], ["AeroB", "HeliC"], None),
+    ("2 meses", None, None, ["marzo", "abril"]),
+]
+ROLLUPS = [["Año", "month"], ["Año", "week"], "month", ["Año", "Destino"], ["Año", "Operador"],
+           ["Año", "Aeronave"], "Operador", "Aeronave", "Tipo de aeronave", "Año"]
+
+
+def dataset(rows_per_year: int) -> pd.DataFrame:
+    frames = []
+    for i, year in enumerate(YEARS):
+        df = synthetic_frame(rows_per_year, seed=i)
+        df["Fecha y hora del vuelo"] += pd.DateOffset(years=year - 2024)
+        df["Ganancia"] = pd.to_numeric(df["Ganancia"], errors="coerce").fillna(0)
+        df["Año"] = str(year)
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    for c in ("Destino", "Operador", "Aeronave", "Tipo de aeronave"):
+        df[c] = df[c].astype("category")
+    return df
+
+
+def legacy(df, destinos, operadores, meses):
+    mask = pd.Series(True, index=df.index)
+    for col, values in (("Destino", destinos), ("Operador", operadores), ("Mes", meses)):
+        if values:
+            mask &= df[col].astype(str).isin(values)
+    rows = df[mask].copy()
+    rows["month"] = rows["Fecha y hora del vuelo"].dt.to_period("M")
+    rows["week"] = rows["Fecha y hora del vuelo"].dt.to_period("W")
+    for by in ROLLUPS:
+        rows.groupby(by, observed=True)[ops_cube.SUM_MEASURES].agg(["sum", "size"])
+
+
+def with_cube(cube, destinos, operadores, meses):
+    mask = np.ones(len(cube), dtype=bool)
+    for col, values in (("Destino", destinos), ("Operador", operadores), ("Mes", meses)):
+        if values:
+            mask &= ops_cube._isin(cube[col], values)
+    sliced = cube[mask]
+    for by in ROLLUPS:
+        ops_cube.rollup(sliced, by)
+
+
+def _best(fn, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main(argv):
+    n = int(argv[0]) if argv else ROWS_PER_YEAR
+    df = dataset(n)
+    t0 = time.perf_counter()
+    cube = ops_cube.build_cube(df)
+    print(f"{len(df):,} filas → cubo de {len(cube):,} celdas en {time.perf_counter() - t0:.2f} s")
+    for label, *filters in FILTERS:
+        t_old = _best(legacy, df, *filters)
+        t_new = _best(with_cube, cube, *filters)
+        print(f"  {label:<24} filas {t_old:7.0f} ms   cubo {t_new:6.0f} ms   ({t_old / t_new:.0f}×)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
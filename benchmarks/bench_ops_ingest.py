@@ -0,0 +1,122 @@
+# benchmarks/bench_ops_ingest.py
+# -------------------------------------------------
+# Compara la ingesta tipada de CSV de operaciones (`ops_ingest.read_ops_csv`,
+# motor pyarrow + esquema) con la lectura anterior (decodificar todo el
+# archivo probando codificaciones, `read_csv` con el motor C e inferencia,
+# y `clean_df` con `to_datetime` sin formato).
+#
+#   python benchmarks/bench_ops_ingest.py              # 1M filas sintéticas
+#   python benchmarks/bench_ops_ingest.py 200000       # otro tamaño
+#   python benchmarks/bench_ops_ingest.py vuelos.csv   # export real
+#
+# Se generan dos variantes: UTF-8 con fechas ISO y cp1252 con fechas
+# dd/mm/aaaa (el export típico de Excel en español).
+# -------------------------------------------------
+import io
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ops_ingest import COLUMNAS_ESPERADAS, read_ops_csv  # noqa: E402
+
+N_ROWS = 1_000_000
+REPEAT = 3
+BAD_EVERY = 50_000  # una celda numérica inválida cada N filas
+
+
+# ---------- Implementación anterior (referencia) ----------
+def legacy_read(raw: bytes) -> pd.DataFrame:
+    for enc in ("utf-8", "latin1", "cp1252"):
+        try:
+            df = pd.read_csv(io.StringIO(raw.decode(enc)))
+            break
+        except Exception:
+            continue
+    df["Fecha y hora del vuelo"] = pd.to_datetime(df["Fecha y hora del vuelo"], errors="coerce")
+    df["Mes"] = df["Mes"].astype(str)
+    df["hora"] = pd.to_numeric(df["hora"], errors="coerce")
+    df["Ganancia"] = pd.to_numeric(df["Ganancia"], errors="coerce").fillna(0)
+    df["Monto total a cobrar"] = pd.to_numeric(df["Monto total a cobrar"], errors="coerce").fillna(0)
+    df["Número de pasajeros"] = pd.to_numeric(df["Número de pasajeros"], errors="coerce").fillna(0)
+    return df
+
+
+# ---------- Archivo sintético ----------
+def synthetic_frame(n: int, seed: int = 7) -> pd.DataFrame:
+    r = np.random.default_rng(seed)
+    ts = pd.Timestamp("2024-01-01") + pd.to_timedelta(r.integers(0, 365 * 24 * 60, n), unit="m")
+    meses = np.array(["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+                      "agosto", "septiembre", "octubre", "noviembre", "diciembre"])
+    dias = np.array(["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"])
+    df = pd.DataFrame({
+        "Fase actual": r.choice(["Completado", "Cancelado", "Programado"], n),
+        "Tipo de aeronave": r.choice(["Helicóptero", "Avión"], n),
+        "Fecha y hora del vuelo": ts,
+        "Número de pasajeros": r.integers(1, 8, n),
+        "Monto total a cobrar": r.uniform(200, 3000, n).round(2),
+        "Cliente": r.choice([f"Cliente {i}" for i in range(2_000)], n),
+        "Aeronave": r.choice([f"HP-{i:03d}" for i in range(40)], n),
+        "Operador": r.choice(["AeroÁ", "AeroB", "HeliC", "SkyD", "Montaña Air"], n),
+        "Costo del vuelo (acordado con el operador)": r.uniform(100, 2000, n).round(2),
+        "Horas de vuelo": r.uniform(0.3, 3, n).round(1),
+        "Mes": meses[ts.month - 1],
+        "Ganancia": r.uniform(-100, 1000, n).round(2).astype(object),
+        "Destino": r.choice(["Bocas del Toro", "San Blas", "David", "Pedasí", "Contadora", "Coronado"], n),
+        "dia": ts.day,
+        "nombre_dia": dias[ts.dayofweek],
+        "hora": ts.hour,
+    })
+    df.loc[::BAD_EVERY, "Ganancia"] = "N/D"
+    return df[COLUMNAS_ESPERADAS]
+
+
+def to_csv_bytes(df: pd.DataFrame, encoding: str, date_format: str) -> bytes:
+    return df.to_csv(index=False, date_format=date_format).encode(encoding)
+
+
+def _bench(label, fn, raw):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(raw)
+        best = min(best, time.perf_counter() - t0)
+    df = out[0] if isinstance(out, tuple) else out
+    mem = df.memory_usage(deep=True).sum() / 1e6
+    print(f"  {label:<10} {best:7.2f} s   {mem:8.1f} MB en memoria")
+    return best, out
+
+
+def main(argv):
+    if argv and not argv[0].isdigit():
+        cases = [(Path(argv[0]).name, Path(argv[0]).read_bytes())]
+    else:
+        n = int(argv[0]) if argv else N_ROWS
+        print(f"Generando {n:,} filas sintéticas…")
+        df = synthetic_frame(n)
+        cases = [
+            ("utf-8 / ISO", to_csv_bytes(df, "utf-8", "%Y-%m-%d %H:%M:%S")),
+            ("cp1252 / dd/mm/aaaa", to_csv_bytes(df, "cp1252", "%d/%m/%Y %H:%M")),
+        ]
+
+    for name, raw in cases:
+        print(f"{name}  ({len(raw) / 1e6:.0f} MB)")
+        t_old, _ = _bench("anterior", legacy_read, raw)
+        t_new, (_, report, err) = _bench("actual", lambda b: read_ops_csv(b, name), raw)
+        if err:
+            print(f"  error: {err}")
+            continue
+        print(f"  speedup    {t_old / t_new:7.1f}×")
+        print(f"  codificación={report.encoding}  formato fecha={report.date_format}  "
+              f"errores={report.coercion_errors or 'ninguno'}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)  # el aviso de errores por columna se resume al final
+    warnings.simplefilter("ignore", pd.errors.DtypeWarning)
+    main(sys.argv[1:])
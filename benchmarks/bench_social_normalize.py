@@ -0,0 +1,112 @@
+# benchmarks/bench_social_normalize.py
+# -------------------------------------------------
+# Compara la normalización de posts de una sola pasada
+# (`process_*_posts`) con la versión anterior basada en varios
+# `DataFrame.apply`.
+#
+#   python benchmarks/bench_social_normalize.py                 # payload sintético
+#   python benchmarks/bench_social_normalize.py fb.json ig.json # payloads grabados
+#
+# Los JSON grabados son la lista `data` de /posts y /media con `insights`.
+# -------------------------------------------------
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from data_processing import process_facebook_posts, process_instagram_posts  # noqa: E402
+
+N_POSTS = 5_000
+REPEAT = 5
+
+
+# ---------- Implementación anterior (referencia) ----------
+def _legacy_extract_metric(ins_dict, names):
+    if not isinstance(ins_dict, dict):
+        return 0
+    for item in ins_dict.get("data", []):
+        if item.get("name") in names:
+            return item["values"][0]["value"]
+    return 0
+
+
+def legacy_process_facebook_posts(posts):
+    df = pd.DataFrame(posts)
+    df["likes"] = df["likes"].apply(lambda x: x["summary"]["total_count"])
+    df["comments"] = df["comments"].apply(lambda x: x["summary"]["total_count"])
+    df["shares"] = df["shares"].apply(lambda x: x.get("count", 0) if isinstance(x, dict) else 0)
+    df["impressions"] = df["insights"].apply(lambda x: _legacy_extract_metric(x, ["post_impressions"]))
+    df["created_time"] = pd.to_datetime(df["created_time"]).dt.tz_localize(None)
+    return df[["id", "message", "created_time", "likes", "comments", "shares", "impressions"]]
+
+
+def legacy_process_instagram_posts(posts):
+    df = pd.DataFrame(posts)
+    df["impressions"] = df["insights"].apply(lambda x: _legacy_extract_metric(x, ["impressions", "plays", "reach"]))
+    df["reach"] = df["insights"].apply(lambda x: _legacy_extract_metric(x, ["reach"]))
+    df["engagement"] = df["insights"].apply(lambda x: _legacy_extract_metric(x, ["total_interactions", "engagement"]))
+    df["video_views"] = df["insights"].apply(lambda x: _legacy_extract_metric(x, ["video_views", "plays"]))
+    df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.tz_localize(None)
+    return df
+
+
+# ---------- Payload sintético con la forma de la Graph API ----------
+def _metric(name, value):
+    return {"name": name, "period": "lifetime", "values": [{"value": value}], "id": f"x/insights/{name}/lifetime"}
+
+
+def synthetic_payloads(n=N_POSTS):
+    rnd = random.Random(42)
+    fb, ig = [], []
+    for i in range(n):
+        ts = pd.Timestamp("2023-01-01") + pd.Timedelta(hours=i * 3)
+        stamp = ts.strftime("%Y-%m-%dT%H:%M:%S+0000")
+        fb.append({
+            "id": f"1234_{i}", "message": f"Post {i} #skyride", "created_time": stamp,
+            "likes": {"data": [], "summary": {"total_count": rnd.randint(0, 500)}},
+            "comments": {"data": [], "summary": {"total_count": rnd.randint(0, 50)}},
+            "shares": {"count": rnd.randint(0, 20)} if i % 3 else None,
+            "insights": {"data": [_metric("post_impressions", rnd.randint(100, 9000))]},
+        })
+        reel = i % 4 == 0
+        names = ["plays", "reach", "total_interactions"] if reel else ["impressions", "reach", "total_interactions"]
+        ig.append({
+            "id": f"1789_{i}", "caption": f"Caption {i}", "media_type": "VIDEO" if reel else "IMAGE",
+            "media_url": "https://cdn.example/x.jpg", "permalink": "https://instagram.com/p/x",
+            "thumbnail_url": None, "timestamp": stamp, "username": "skyride",
+            "like_count": rnd.randint(0, 800), "comments_count": rnd.randint(0, 60),
+            "insights": {"data": [_metric(m, rnd.randint(100, 9000)) for m in names]},
+        })
+    return fb, ig
+
+
+def _bench(label, fn, payload):
+    t = min(timeit.repeat(lambda: fn(payload), number=1, repeat=REPEAT))
+    print(f"  {label:<10} {t * 1000:8.1f} ms")
+    return t
+
+
+def main(argv):
+    if len(argv) == 2:
+        fb, ig = (json.loads(Path(p).read_text(encoding="utf-8")) for p in argv)
+        print(f"Payload grabado: {len(fb)} posts FB, {len(ig)} media IG")
+    else:
+        fb, ig = synthetic_payloads()
+        print(f"Payload sintético: {len(fb)} posts FB, {len(ig)} media IG")
+
+    for name, legacy, current, payload in (
+        ("Facebook", legacy_process_facebook_posts, process_facebook_posts, fb),
+        ("Instagram", legacy_process_instagram_posts, process_instagram_posts, ig),
+    ):
+        print(name)
+        t_old = _bench("anterior", legacy, payload)
+        t_new = _bench("actual", current, payload)
+        print(f"  speedup    {t_old / t_new:8.1f}×")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
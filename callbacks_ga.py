@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 from statsmodels.tsa.seasonal import seasonal_decompose
 from sklearn.preprocessing import MinMaxScaler
@@ -10,9 +10,12 @@ import logging
 
 # Dependencias de tu proyecto
 from utils import query_ga
-from ai import get_openai_response
+from chat_stream import register_chat_callbacks
+from ai_context import ContextBuilder
+from ai_insights import insight_request, register_insight_card
 from layout_components import create_ai_insight_card, create_ai_chat_interface, add_trendline
 from data_processing import get_funnel_data
+from server_table import server_table
 
 # Definiciones de funnels y eventos (se mantienen aquí por especificidad a GA)
 funnel_base_steps = [{"label": "Visita (page_view)", "type": "event", "dimension": "eventName", "value": "page_view"}]
@@ -45,7 +48,7 @@ def register_callbacks(app):
 
         if subtab_ga == 'overview_ga':
             df_acq = query_ga(metrics=['sessions', 'activeUsers', 'conversions'], dimensions=['date'], start_date=sd_str, end_date=ed_str)
-            if df_acq.empty: return html.Div([html.P("No hay datos para la Visión General de GA."), create_ai_insight_card('overview-ga-ai-insight-visible'), html.Div(default_no_data_ai_text, id='overview-ga-ai-insight-data', style={'display':'none'})])
+            if df_acq.empty: return html.Div([html.P("No hay datos para la Visión General de GA."), create_ai_insight_card('overview-ga-ai-insight-visible'), dcc.Store(id='overview-ga-ai-insight-data', data=default_no_data_ai_text)])
             df_acq.rename(columns={'date': 'Fecha', 'activeUsers': 'Usuarios'}, inplace=True)
             df_acq['Tasa Conversion'] = (df_acq['conversions'].fillna(0) / df_acq['sessions'].replace(0, np.nan).fillna(1) * 100).fillna(0)
             df_acq = df_acq.sort_values('Fecha')
@@ -64,14 +67,14 @@ def register_callbacks(app):
 
             context_overview_ga = f"Resumen Visión General GA: Sesiones totales: {df_acq['sessions'].sum():,}. Usuarios totales: {df_acq['Usuarios'].sum():,}. Conversiones totales: {df_acq['conversions'].sum():,}. Tasa de conversión promedio: {df_acq['Tasa Conversion'].mean():.2f}%."
             prompt_overview_ga = "Analiza las tendencias de sesiones, usuarios, conversiones y tasa de conversión. Proporciona un diagnóstico y una acción poderosa."
-            ai_insight_text = get_openai_response(prompt_overview_ga, context_overview_ga)
+            ai_insight_text = insight_request(prompt_overview_ga, context_overview_ga)
 
             return html.Div([
                 dbc.Row([dbc.Col(dcc.Graph(figure=fig_ses), md=6), dbc.Col(dcc.Graph(figure=fig_usu), md=6)]),
                 dbc.Row([dbc.Col(dcc.Graph(figure=fig_con), md=6), dbc.Col(dcc.Graph(figure=fig_tasa), md=6)], className="mt-3"),
                 dbc.Row([dbc.Col(dcc.Graph(figure=fig_sup), md=12)], className="mt-3"),
                 create_ai_insight_card('overview-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Visión General GA)"),
-                html.Div(ai_insight_text, id='overview-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='overview-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('overview_ga')
             ])
 
@@ -83,34 +86,34 @@ def register_callbacks(app):
             df_city = query_ga(metrics=['activeUsers', 'conversions'], dimensions=['city'], start_date=sd_str, end_date=ed_str)
 
             demographics_graphs_content = []
-            demographics_context_parts = []
+            demographics_context = ContextBuilder()
 
             if not df_g.empty:
                 df_g.rename(columns={'userGender': 'Sexo', 'activeUsers': 'Usuarios'}, inplace=True)
                 df_g_f = df_g[~df_g['Sexo'].isin(['unknown', 'Others', None, '', '(not set)'])].copy()
                 if not df_g_f.empty:
                     demographics_graphs_content.append(dbc.Col(dcc.Graph(figure=px.pie(df_g_f, names='Sexo', values='Usuarios', title='Usuarios por Género')), md=6))
-                    demographics_context_parts.append(f"Usuarios por Género: {df_g_f.to_string()}")
+                    demographics_context.add("Usuarios por Género", df_g_f, priority=0)
             if not df_a.empty:
                 df_a.rename(columns={'userAgeBracket': 'Edad', 'activeUsers': 'Usuarios'}, inplace=True)
                 df_a_f = df_a[~df_a['Edad'].isin(['unknown', 'Others', None, '', '(not set)'])].copy()
                 if not df_a_f.empty:
                     demographics_graphs_content.append(dbc.Col(dcc.Graph(figure=px.bar(df_a_f.sort_values('Edad'), x='Edad', y='Usuarios', title='Usuarios por Edad')), md=6))
-                    demographics_context_parts.append(f"Usuarios por Edad: {df_a_f.to_string()}")
+                    demographics_context.add("Usuarios por Edad", df_a_f, priority=0)
             if not df_c.empty:
                 df_c.rename(columns={'country': 'País', 'activeUsers': 'Usuarios'}, inplace=True)
                 df_c_f = df_c[~df_c['País'].isin(['unknown', 'Others', None, '', '(not set)'])].copy()
                 if not df_c_f.empty:
                     top_countries = (df_c_f.groupby('País', as_index=False)['Usuarios'].sum().sort_values('Usuarios', ascending=False).head(10))
                     demographics_graphs_content.append(dbc.Col(dcc.Graph(figure=px.bar(top_countries, x='País', y='Usuarios', title='Top 10 Países por Usuarios')),md=6))
-                    demographics_context_parts.append(f"Usuarios por País (Top 10): {top_countries.to_string(index=False)}")
+                    demographics_context.add("Usuarios por País (Top 10)", top_countries, priority=1)
             if not df_city.empty:
                 df_city.rename(columns={'city': 'Ciudad', 'activeUsers': 'Usuarios'}, inplace=True)
                 df_city_f = df_city[~df_city['Ciudad'].isin(['unknown', 'Others', None, '', '(not set)'])].copy()
                 if not df_city_f.empty:
                     top_cities = (df_city_f.groupby('Ciudad', as_index=False)['Usuarios'].sum().sort_values('Usuarios', ascending=False).head(10))
                     demographics_graphs_content.append(dbc.Col(dcc.Graph(figure=px.bar(top_cities, x='Ciudad', y='Usuarios', title='Top 10 Ciudades por Usuarios')),md=6))
-                    demographics_context_parts.append(f"Usuarios por Ciudad (Top 10): {top_cities.to_string(index=False)}")
+                    demographics_context.add("Usuarios por Ciudad (Top 10)", top_cities, priority=2)
 
             # Geo-Opportunities part
             df_geo = query_ga(metrics=['sessions', 'conversions'], dimensions=['country', 'city'], start_date=sd_str, end_date=ed_str)
@@ -131,12 +134,13 @@ def register_callbacks(app):
                     if not country_opportunities.empty:
                          fig_geo_country = px.choropleth(country_opportunities, locations="country", locationmode="country names", color="sessions", hover_name="country", color_continuous_scale=px.colors.sequential.OrRd, title="Países con Sesiones Significativas y Cero Conversiones")
 
-                    top_cities_opportunity_table_content = dash_table.DataTable(
-                        data=df_geo_opportunity.head(15).to_dict('records'),
+                    top_cities_opportunity_table_content = server_table(
+                        df_geo_opportunity[['country', 'city', 'sessions']],
                         columns=[{'name': 'País', 'id': 'country'}, {'name': 'Ciudad', 'id': 'city'}, {'name': 'Sesiones (0 conv.)', 'id': 'sessions'}],
-                        style_table={'overflowX': 'auto', 'marginTop': '20px', 'marginBottom': '20px'}, page_size=10, sort_action='native', filter_action='native')
+                        style_table={'overflowX': 'auto', 'marginTop': '20px', 'marginBottom': '20px'}, page_size=10)
 
-                    demographics_context_parts.append(f"Geo-Oportunidades: Países (sesiones, 0 conv): {country_opportunities.head(3).to_string() if not country_opportunities.empty else 'N/A'}. Ciudades (sesiones, 0 conv): {df_geo_opportunity.head(3).to_string()}.")
+                    demographics_context.add("Geo-Oportunidades, países (sesiones, 0 conv)", country_opportunities, priority=1, max_rows=5)
+                    demographics_context.add("Geo-Oportunidades, ciudades (sesiones, 0 conv)", df_geo_opportunity[['country', 'city', 'sessions']], priority=1, max_rows=5)
 
                 geo_explanation_md = """
                 **¿Qué es este Mapa/Tabla de Geo-Oportunidades?** Identifica países y ciudades que generan un volumen considerable de tráfico (sesiones)
@@ -151,10 +155,10 @@ def register_callbacks(app):
                 ])
 
             # Combined AI Insight
-            if demographics_context_parts:
-                context_demog_geo = "\n".join(demographics_context_parts)
+            if demographics_context:
+                context_demog_geo = demographics_context.build()
                 prompt_demog_geo = "Analiza los datos demográficos (género, edad) Y las geo-oportunidades (tráfico sin conversión por país/ciudad). ¿Qué segmentos destacan o cuáles podrían ser desatendidos o mal enfocados? Proporciona un diagnóstico combinado y una acción poderosa."
-                ai_insight_text = get_openai_response(prompt_demog_geo, context_demog_geo)
+                ai_insight_text = insight_request(prompt_demog_geo, context_demog_geo)
 
             return html.Div([
                 html.H4("Análisis Demográfico y Segmentación 🌍📍", className="text-center mt-4"),
@@ -162,7 +166,7 @@ def register_callbacks(app):
                 html.Hr(className="my-4"),
                 html.Div(geo_opportunities_content),
                 create_ai_insight_card('demography-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Demografía & Geo)"),
-                html.Div(ai_insight_text, id='demography-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='demography-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('demography_ga')
             ])
 
@@ -243,6 +247,7 @@ def register_callbacks(app):
             fig_sankey = go.Figure().update_layout(title_text="Análisis de Rutas (Fuente -> Evento) - No hay datos")
             sankey_explanation = "No hay datos suficientes para el diagrama de Sankey."
             sankey_ai_context_part = "Datos de Sankey no disponibles."
+            sankey_top_sources = None
             df_sankey_data = pd.DataFrame() # Initialize
             source_nodes = [] # Initialize
 
@@ -262,7 +267,8 @@ def register_callbacks(app):
                         )])
                         fig_sankey.update_layout(title_text="Análisis de Rutas de Usuario (Fuente/Medio -> Evento Clave)", font_size=12, height=700)
                         sankey_explanation = "**Interpretación del Sankey:** Muestra flujos de usuarios desde fuentes/medios hacia eventos clave. Líneas gruesas = rutas comunes. Ayuda a ver qué canales impulsan acciones. **Limitación:** Modelo simplificado; no es un pathing secuencial estricto."
-                        sankey_ai_context_part = f"Diagrama de Sankey muestra flujos de '{df_sankey_data['sessionSourceMedium'].nunique()}' fuentes/medios a '{df_sankey_data['eventName'].nunique()}' eventos clave. Principales fuentes: {df_sankey_data.groupby('sessionSourceMedium')['sessions'].sum().nlargest(3).to_string()}."
+                        sankey_ai_context_part = f"Diagrama de Sankey muestra flujos de '{df_sankey_data['sessionSourceMedium'].nunique()}' fuentes/medios a '{df_sankey_data['eventName'].nunique()}' eventos clave."
+                        sankey_top_sources = df_sankey_data.groupby('sessionSourceMedium')['sessions'].sum().nlargest(3)
 
             sankey_content.extend([
                 dbc.Card(dbc.CardBody(dcc.Markdown(sankey_explanation)), color="info", outline=True, className="mb-3 mt-3"),
@@ -271,9 +277,13 @@ def register_callbacks(app):
 
             # Combined AI Insight
             if total_visits_funnel > 0 or (not df_source_event.empty and not df_sankey_data.empty and source_nodes):
-                context_funnels_sankey = f"Datos de Funnels: WhatsApp ({counts_w}), Formulario ({counts_f}), Llamadas ({counts_l}). Conversión Global: Visitas={total_visits_funnel}, Conversiones={total_conv_funnel}. {sankey_ai_context_part}"
+                context_funnels_sankey = ContextBuilder()\
+                    .add("Datos de Funnels", f"WhatsApp ({counts_w}), Formulario ({counts_f}), Llamadas ({counts_l}). Conversión Global: Visitas={total_visits_funnel}, Conversiones={total_conv_funnel}.", priority=0)\
+                    .add(None, sankey_ai_context_part, priority=1)\
+                    .add("Principales fuentes (sesiones)", sankey_top_sources, priority=1)\
+                    .build()
                 prompt_funnels_sankey = "Analiza el rendimiento de los funnels de conversión Y las rutas de usuario del diagrama de Sankey. Identifica el principal cuello de botella en los funnels y las rutas de usuario más importantes (o ineficientes) del Sankey. Proporciona un diagnóstico combinado y una acción poderosa para mejorar la conversión general y la eficiencia de las rutas."
-                ai_insight_text = get_openai_response(prompt_funnels_sankey, context_funnels_sankey)
+                ai_insight_text = insight_request(prompt_funnels_sankey, context_funnels_sankey)
             else:
                 ai_insight_text = "No hay datos suficientes para analizar los funnels o las rutas Sankey."
 
@@ -282,7 +292,7 @@ def register_callbacks(app):
                 html.Hr(className="my-4"),
                 html.Div(sankey_content),
                 create_ai_insight_card('funnels-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Funnels & Rutas)"),
-                html.Div(ai_insight_text, id='funnels-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='funnels-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('funnels_ga')
             ])
 
@@ -297,7 +307,7 @@ def register_callbacks(app):
                 dbc.Button("Simular Escenario", id="what-if-simulate-button", color="primary", className="mt-3 mb-3"),
                 html.Div(id='what-if-results-display'),
                 create_ai_insight_card('what-if-ga-ai-insight-visible', title="💡 Interpretación y Sugerencias del Escenario"),
-                html.Div(what_if_ai_text, id='what-if-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='what-if-ga-ai-insight-data', data=what_if_ai_text),
                 create_ai_chat_interface('what_if_ga')
             ])
 
@@ -326,7 +336,7 @@ def register_callbacks(app):
                         fig_temporal.update_layout(title='Descomposición Temporal y Anomalías (Sesiones Diarias)', hovermode='x unified')
                         context_temporal = f"Análisis de descomposición temporal. Tendencia promedio: {decomposition.trend.dropna().mean():.2f}. Estacionalidad: Max {decomposition.seasonal.max():.2f}, Min {decomposition.seasonal.min():.2f}. Anomalías detectadas: {len(anomalies)}."
                         prompt_temporal = "Diagnostica los patrones de tendencia, estacionalidad y anomalías. Sugiere una acción poderosa basada en estos hallazgos."
-                        ai_insight_text = get_openai_response(prompt_temporal, context_temporal)
+                        ai_insight_text = insight_request(prompt_temporal, context_temporal)
                     except Exception as e:
                         logging.error(f"Error en análisis temporal: {e}")
                         ai_insight_text = f"Error al procesar datos para análisis temporal: {e}"
@@ -334,7 +344,7 @@ def register_callbacks(app):
             return html.Div([
                 dcc.Graph(id='temporal-graph', figure=fig_temporal),
                 create_ai_insight_card('temporal-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Temporal)"),
-                html.Div(ai_insight_text, id='temporal-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='temporal-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('temporal_ga')
             ])
 
@@ -345,7 +355,7 @@ def register_callbacks(app):
             fig_matrix = go.Figure().update_layout(title="Matriz de Correlación (Datos insuficientes)")
             fig_box_dev_conv = go.Figure().update_layout(title="Conversiones por Dispositivo (Datos insuficientes)")
             fig_box_age_conv = go.Figure().update_layout(title="Conversiones por Edad (Datos insuficientes)")
-            corr_matrix_text_for_ai = "No disponible"
+            corr_matrix_for_ai = "No disponible"
 
             if not df_sp.empty:
                 df_sp.rename(columns={'deviceCategory': 'Dispositivo', 'sessions': 'Sesiones', 'activeUsers': 'Usuarios', 'averageSessionDuration': 'Duración Media (s)', 'bounceRate': 'Tasa Rebote (%)'}, inplace=True)
@@ -357,7 +367,7 @@ def register_callbacks(app):
                     if not df_sp_filt_dev.empty:
                         try:
                             fig_matrix = px.scatter_matrix(df_sp_filt_dev, dimensions=metrics_to_plot, color="Dispositivo", title="Matriz de Correlación por Dispositivo"); fig_matrix.update_layout(height=800)
-                            corr_matrix_text_for_ai = df_sp_filt_dev[metrics_to_plot].corr(numeric_only=True).to_string()
+                            corr_matrix_for_ai = df_sp_filt_dev[metrics_to_plot].corr(numeric_only=True)
                         except Exception as e:
                             logging.error(f"Error generando scatter matrix o corr: {e}")
                         if 'conversions' in df_sp_filt_dev.columns: fig_box_dev_conv = px.box(df_sp_filt_dev, x="Dispositivo", y="conversions", title="Conversiones por Dispositivo", points="all")
@@ -367,15 +377,18 @@ def register_callbacks(app):
                 df_age_f = df_age_conv[~df_age_conv['Edad'].isin(['unknown', 'Others', None, '', '(not set)'])].copy()
                 if not df_age_f.empty and 'conversions' in df_age_f.columns: fig_box_age_conv = px.box(df_age_f, x="Edad", y="conversions", title="Conversiones por Edad", points="all")
 
-            context_corr = f"Matriz de Correlación:\n{corr_matrix_text_for_ai}\nConsidera también boxplots de conversiones por dispositivo y edad."
+            context_corr = ContextBuilder()\
+                .add("Matriz de Correlación", corr_matrix_for_ai, priority=0)\
+                .add(None, "Considera también boxplots de conversiones por dispositivo y edad.", priority=1)\
+                .build()
             prompt_corr = "Identifica correlaciones fuertes o diferencias significativas en conversiones por grupo. Diagnostica y sugiere una acción poderosa."
-            ai_insight_text = get_openai_response(prompt_corr, context_corr)
+            ai_insight_text = insight_request(prompt_corr, context_corr)
 
             return html.Div([
                 dcc.Graph(id='corr-graph', figure=fig_matrix),
                 dbc.Row([dbc.Col(dcc.Graph(figure=fig_box_dev_conv), md=6), dbc.Col(dcc.Graph(figure=fig_box_age_conv), md=6)], className="mt-3"),
                 create_ai_insight_card('correlations-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Correlaciones)"),
-                html.Div(ai_insight_text, id='correlations-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='correlations-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('correlations_ga')
             ])
 
@@ -402,7 +415,7 @@ def register_callbacks(app):
                             cohort_explanation_md = "**Interpretación Cohortes:** Agrupa usuarios por fecha de 1ra visita y rastrea su retención. Ayuda a entender cuán bien retienes usuarios y el impacto de cambios. Filas=Cohortes, Columnas=Días desde 1ra visita, Color/Número=% Retención."
                             context_cohort = f"Análisis de Cohortes: Retención promedio Día 1: {retention_matrix_display.iloc[:, 1].mean() if len(retention_matrix_display.columns) > 1 else 'N/A':.1f}%. Retención Día 7: {retention_matrix_display.iloc[:, 7].mean() if len(retention_matrix_display.columns) > 7 else 'N/A':.1f}%."
                             prompt_cohort = "Analiza la tendencia de retención. ¿Alguna cohorte destaca? ¿Patrones generales? Diagnostica y sugiere una acción poderosa."
-                            ai_insight_text = get_openai_response(prompt_cohort, context_cohort)
+                            ai_insight_text = insight_request(prompt_cohort, context_cohort)
                 except Exception as e:
                     logging.error(f"Error en Cohort: {e}", exc_info=True)
                     ai_insight_text = f"Error al procesar datos de cohortes: {e}"
@@ -411,7 +424,7 @@ def register_callbacks(app):
                 dbc.Card(dbc.CardBody(dcc.Markdown(cohort_explanation_md)), color="info", outline=True, className="mb-3"),
                 dcc.Graph(id='cohort-graph', figure=fig_cohort),
                 create_ai_insight_card('cohort-ga-ai-insight-visible', title="💡 Diagnóstico y Acción (Cohortes)"),
-                html.Div(ai_insight_text, id='cohort-ga-ai-insight-data', style={'display': 'none'}),
+                dcc.Store(id='cohort-ga-ai-insight-data', data=ai_insight_text),
                 create_ai_chat_interface('cohort_ga')
             ])
 
@@ -430,27 +443,30 @@ def register_callbacks(app):
         'temporal-ga-ai-insight-data', 'correlations-ga-ai-insight-data', 'cohort-ga-ai-insight-data'
     ]
 
+    def render_ga_ai_card(ai_text):
+        default_no_data_msg = "Análisis IA no disponible o datos insuficientes."
+        specific_no_data_msgs = [
+            "No hay suficientes datos para un análisis detallado.", "No hay datos de Sankey para analizar.",
+            "No hay datos suficientes para analizar los funnels.", "Se necesitan al menos 14 días de datos para el análisis temporal.",
+            "Error al procesar datos para análisis temporal", "Matriz de retención vacía después del procesamiento.",
+            "No se pudo construir la tabla pivote para cohortes.", "No hay suficientes datos para el análisis de cohortes.",
+            "Ajusta los sliders para simular escenarios y ver el análisis."
+        ]
+        if not ai_text: return html.P(default_no_data_msg)
+        ai_text_strip = ai_text.strip()
+        if not ai_text_strip or any(msg in ai_text_strip for msg in specific_no_data_msgs):
+            return html.P(default_no_data_msg)
+        return html.P(ai_text)
+
+    # Se rellenan en segundo plano; cambiar de sub-pestaña cancela el insight en curso
+    ga_cancel_inputs = [Input('google-subtabs', 'value')]
     for visible_id, data_id in zip(ga_ai_insight_visible_ids, ga_ai_insight_data_ids):
-        @app.callback(Output(visible_id, 'children'), Input(data_id, 'children'))
-        def update_ga_ai_card_generic(ai_text):
-            default_no_data_msg = "Análisis IA no disponible o datos insuficientes."
-            specific_no_data_msgs = [
-                "No hay suficientes datos para un análisis detallado.", "No hay datos de Sankey para analizar.",
-                "No hay datos suficientes para analizar los funnels.", "Se necesitan al menos 14 días de datos para el análisis temporal.",
-                "Error al procesar datos para análisis temporal", "Matriz de retención vacía después del procesamiento.",
-                "No se pudo construir la tabla pivote para cohortes.", "No hay suficientes datos para el análisis de cohortes.",
-                "Ajusta los sliders para simular escenarios y ver el análisis."
-            ]
-            if not ai_text: return html.P(default_no_data_msg)
-            ai_text_strip = ai_text.strip()
-            if not ai_text_strip or any(msg in ai_text_strip for msg in specific_no_data_msgs):
-                return html.P(default_no_data_msg)
-            return html.P(ai_text)
+        register_insight_card(app, visible_id, data_id, cancel=ga_cancel_inputs, render=render_ga_ai_card)
 
     # Callback para el simulador "What If"
     @app.callback(
         [Output('what-if-results-display', 'children'),
-         Output('what-if-ga-ai-insight-data', 'children')],
+         Output('what-if-ga-ai-insight-data', 'data')],
         [Input('what-if-simulate-button', 'n_clicks')],
         [State('date-picker', 'start_date'), State('date-picker', 'end_date'),
          State('what-if-sessions-slider', 'value'), State('what-if-cr-slider', 'value')],
@@ -495,32 +511,15 @@ def register_callbacks(app):
 
         context_what_if = f"Simulación: Línea Base (Sesiones={baseline_sessions:,.0f}, CR={baseline_cr:.2f}%, Conv={baseline_conversions:,.0f}). Simul_Input (ΔSesiones={sessions_increase_pct}%, ΔCR={cr_change_pct}%). Proyectado (Sesiones={new_sessions:,.0f}, CR={new_cr_abs:.2f}%, Conv={predicted_conversions:,.0f})."
         prompt_what_if = "Interpreta este escenario 'What If'. Diagnostica su realismo, el impacto principal (beneficios/riesgos) y sugiere una acción poderosa para intentar alcanzar el escenario proyectado."
-        ai_interpretation = get_openai_response(prompt_what_if, context_what_if)
+        ai_interpretation = insight_request(prompt_what_if, context_what_if)
 
         return results_display, ai_interpretation
 
-    # Registrar callbacks de chat
+    # Registrar callbacks de chat (respuesta en streaming, ver chat_stream)
+    def ga_chat_context(current_tab_value, tab_id):
+        return f"Estás en la pestaña '{tab_id}' (sub-pestaña actual de GA: {current_tab_value}). El usuario tiene una pregunta."
+
     ga_subtabs_with_chat = ['overview_ga', 'demography_ga', 'funnels_ga', 'what_if_ga', 'temporal_ga', 'correlations_ga', 'cohort_ga']
     for tab_id in ga_subtabs_with_chat:
-        @app.callback(
-            Output(f'{tab_id}-chat-history', 'children'),
-            Input(f'{tab_id}-chat-submit', 'n_clicks'),
-            State(f'{tab_id}-chat-input', 'value'),
-            State(f'{tab_id}-chat-history', 'children'),
-            State('google-subtabs', 'value'),
-            prevent_initial_call=True,
-            # Se usa `memoize` para que el callback se asocie con el `tab_id` correcto en cada iteración
-            memoize=True
-        )
-        def update_chat(n_clicks, user_input, history, current_tab_value, tab_id=tab_id):
-            if not n_clicks or not user_input: return history
-            if history is None: history = []
-            elif not isinstance(history, list): history = [history]
-
-            context = f"Estás en la pestaña '{tab_id}' (sub-pestaña actual de GA: {current_tab_value}). El usuario tiene una pregunta."
-            ai_response = get_openai_response(user_input, context)
-
-            new_history_entry_user = html.P([html.B("Tú: ", style={'color': '#007bff'}), user_input], style={'margin': '5px 0'})
-            new_history_entry_ai = html.P([html.B("SkyIntel AI: ", style={'color': '#28a745'}), ai_response], style={'background': '#f0f0f0', 'padding': '8px', 'borderRadius': '5px', 'margin': '5px 0'})
-
-            return history + [new_history_entry_user, new_history_entry_ai]
\ No newline at end of file
+        register_chat_callbacks(app, tab_id, [State('google-subtabs', 'value')],
+                                lambda current_tab_value, tab_id=tab_id: ga_chat_context(current_tab_value, tab_id))
\ No newline at end of file
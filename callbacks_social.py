@@ -9,23 +9,29 @@ import dash_bootstrap_components as dbc
 
 # --- Dependencias de tu proyecto -----------------
 from config import FACEBOOK_ID, INSTAGRAM_ID
-from ai import get_openai_response
+from chat_stream import register_chat_callbacks
+from ai_context import ContextBuilder
+from ai_insights import insight_request, register_insight_card
 from layout_components import (
     create_ai_insight_card,
     create_ai_chat_interface,
     add_trendline,
-    generate_wordcloud,
-)
-from data_processing import (
-    get_facebook_posts,
-    get_instagram_posts,
-    process_facebook_posts,
-    process_instagram_posts,
 )
+from data_processing import process_facebook_posts, process_instagram_posts
+import social_store
+import wordmap
+import top_posts
+import thumbnails
+import timebuckets
+from source_fetch import gather_sources
+
+TOP_POSTS_TABLE_SIZE = 50  # filas del ranking (paginadas de 10 en 10 en la tabla)
 
 # -------------------------------------------------
 def register_callbacks(app):
     """Registra todos los callbacks de la sección Redes Sociales."""
+    wordmap.register_wordcloud_route(app)
+    thumbnails.register_thumbnail_route(app)
 
     # ------------------------------------------------------------------
     #  SUB-TABS: GENERAL, ENGAGEMENT, WORDMAP, TOP POSTS
@@ -44,35 +50,39 @@ def register_callbacks(app):
         sd = pd.to_datetime(start_date).tz_localize(None)
         ed = pd.to_datetime(end_date).tz_localize(None)
 
-        # ---------------- Carga de datos -------------------
-        fb_posts_raw = get_facebook_posts(FACEBOOK_ID)
-        ig_posts_raw = get_instagram_posts(INSTAGRAM_ID)
-
-        df_fb = process_facebook_posts(fb_posts_raw)
-        df_ig = process_instagram_posts(ig_posts_raw)
+        # ---------------- Carga de datos (FB e IG en paralelo) ---
+        results = gather_sources({
+            "facebook": lambda: process_facebook_posts(social_store.get_posts("facebook", FACEBOOK_ID, since=sd, until=ed)),
+            "instagram": lambda: process_instagram_posts(social_store.get_posts("instagram", INSTAGRAM_ID, since=sd, until=ed)),
+        })
+        # una fuente caída o lenta se muestra vacía con aviso; la otra se pinta igual
+        df_fb = results["facebook"].value if results["facebook"].ok else process_facebook_posts([])
+        df_ig = results["instagram"].value if results["instagram"].ok else process_instagram_posts([])
+        source_alerts = [
+            dbc.Alert(f"⚠️ {label} no disponible ({results[key].error}).", color="warning", className="py-2 small")
+            for key, label in (("facebook", "Facebook"), ("instagram", "Instagram"))
+            if not results[key].ok
+        ]
 
         # ---------------- Filtro por rango -----------------
+        # (la paginación trae el historial completo del rango: sin fallback a "todo")
         if not df_fb.empty:
             df_fb_f = df_fb[(df_fb["created_time"] >= sd) & (df_fb["created_time"] <= ed)]
-            if df_fb_f.empty:  # Si no hay posts en rango, usa todo
-                df_fb_f = df_fb.copy()
         else:
             df_fb_f = df_fb
 
         if not df_ig.empty:
             df_ig_f = df_ig[(df_ig["timestamp"] >= sd) & (df_ig["timestamp"] <= ed)]
-            if df_ig_f.empty:
-                df_ig_f = df_ig.copy()
         else:
             df_ig_f = df_ig
 
         # ---------------- Mensaje sin datos ----------------
         default_no_ai = "No hay suficientes datos para un análisis IA."
         no_data_msg = html.Div(
-            [
+            source_alerts + [
                 html.P("No hay datos de redes sociales para el período seleccionado."),
                 create_ai_insight_card(f"{subtab_sm}-ai-insight-visible"),
-                html.Div(default_no_ai, id=f"{subtab_sm}-ai-insight-data", style={"display": "none"}),
+                dcc.Store(id=f"{subtab_sm}-ai-insight-data", data=default_no_ai),
             ]
         )
 
@@ -102,13 +112,7 @@ def register_callbacks(app):
                 title="Tendencia Impresiones Instagram (sin datos suficientes)"
             )
             if not df_ig_f.empty:
-                df_tr = (
-                    df_ig_f.sort_values("timestamp")
-                    .set_index("timestamp")["impressions"]
-                    .resample("D")
-                    .sum()
-                    .reset_index()
-                )
+                df_tr = timebuckets.bucketize(df_ig_f, "timestamp", timebuckets.DAILY, "impressions")
                 if len(df_tr) > 1:
                     fig_ig_trend = px.line(
                         df_tr,
@@ -126,7 +130,7 @@ def register_callbacks(app):
                 "¿Qué plataforma destaca y en qué métrica? "
                 "Diagnostica el rendimiento y sugiere una acción poderosa."
             )
-            ai_insight_text = get_openai_response(prompt_gen, context_gen)
+            ai_insight_text = insight_request(prompt_gen, context_gen)
 
             # ---------- Layout ----------
             cards = [
@@ -156,17 +160,13 @@ def register_callbacks(app):
             ]
 
             return html.Div(
-                [
+                source_alerts + [
                     dbc.Row([dbc.Col(c, md=6) for c in cards]),
                     dbc.Row(dbc.Col(dcc.Graph(figure=fig_ig_trend), width=12), className="mt-4"),
                     create_ai_insight_card(
                         "general-sm-ai-insight-visible", title="💡 Diagnóstico y Acción (SM General)"
                     ),
-                    html.Div(
-                        ai_insight_text,
-                        id="general-sm-ai-insight-data",
-                        style={"display": "none"},
-                    ),
+                    dcc.Store(id="general-sm-ai-insight-data", data=ai_insight_text),
                     create_ai_chat_interface("general_sm"),
                 ],
                 className="p-3",
@@ -225,22 +225,22 @@ def register_callbacks(app):
             if not eng_by_type.empty:
                 fig_rate.update_yaxes(ticksuffix="%")
 
-            context_eng = f"Engagement IG por formato:\n{eng_by_type.head().to_string()}"
+            context_eng = ContextBuilder().add("Engagement IG por formato", eng_by_type, priority=0).build()
             prompt_eng = (
                 "Analiza el engagement total y la tasa de engagement por formato en Instagram. "
                 "¿Qué formato es más efectivo? Diagnostica y sugiere una acción poderosa."
             )
             ai_insight_text = (
-                get_openai_response(prompt_eng, context_eng) if not eng_by_type.empty else default_no_ai
+                insight_request(prompt_eng, context_eng) if not eng_by_type.empty else default_no_ai
             )
 
             return html.Div(
-                [
+                source_alerts + [
                     dbc.Row([dbc.Col(dcc.Graph(figure=fig_sum), md=6), dbc.Col(dcc.Graph(figure=fig_rate), md=6)]),
                     create_ai_insight_card(
                         "engagement-sm-ai-insight-visible", title="💡 Diagnóstico y Acción (Engagement IG)"
                     ),
-                    html.Div(ai_insight_text, id="engagement-sm-ai-insight-data", style={"display": "none"}),
+                    dcc.Store(id="engagement-sm-ai-insight-data", data=ai_insight_text),
                     create_ai_chat_interface("engagement_sm"),
                 ],
                 className="p-3",
@@ -253,22 +253,27 @@ def register_callbacks(app):
             if df_fb_f.empty and df_ig_f.empty:
                 return no_data_msg
 
-            text_fb = " ".join(df_fb_f["message"].dropna().astype(str)) if "message" in df_fb_f else ""
-            text_ig = " ".join(df_ig_f["caption"].dropna().astype(str)) if "caption" in df_ig_f else ""
-            combined_text = (text_fb + " " + text_ig).strip()
+            # conteos por post cacheados: sólo se tokenizan los textos nuevos
+            items = []
+            if "message" in df_fb_f:
+                items += zip(df_fb_f["id"], df_fb_f["message"])
+            if "caption" in df_ig_f:
+                items += zip(df_ig_f["id"], df_ig_f["caption"])
+            freqs = wordmap.term_frequencies(items)
+            wordcloud_src = wordmap.wordcloud_url(freqs)
 
-            wordcloud_src = generate_wordcloud(combined_text)
+            top_terms = ", ".join(f"{t} ({n})" for t, n in freqs.most_common(15))
             ai_insight_text = (
-                get_openai_response(
+                insight_request(
                     "Observando un wordmap de las publicaciones, ¿qué temas general destacan y qué acción tomar?",
-                    "Wordmap generado con textos de FB e IG.",
+                    f"Wordmap generado con textos de FB e IG. Términos más frecuentes: {top_terms}.",
                 )
                 if wordcloud_src
                 else default_no_ai
             )
 
             return html.Div(
-                [
+                source_alerts + [
                     html.Img(
                         src=wordcloud_src,
                         style={"width": "100%", "maxWidth": "800px", "display": "block", "margin": "auto"},
@@ -278,7 +283,7 @@ def register_callbacks(app):
                     create_ai_insight_card(
                         "wordmap-sm-ai-insight-visible", title="💡 Diagnóstico y Acción (Wordmap)"
                     ),
-                    html.Div(ai_insight_text, id="wordmap-sm-ai-insight-data", style={"display": "none"}),
+                    dcc.Store(id="wordmap-sm-ai-insight-data", data=ai_insight_text),
                     create_ai_chat_interface("wordmap_sm"),
                 ],
                 className="p-3",
@@ -291,83 +296,30 @@ def register_callbacks(app):
             if df_fb_f.empty and df_ig_f.empty:
                 return no_data_msg
 
-            # Homogeneizar columnas
-            fb_cols = ["id", "message", "created_time", "likes", "comments", "impressions"]
-            if "likes_count" in df_fb_f.columns:  # legacy
-                df_fb_tmp = df_fb_f.rename(columns={"likes_count": "likes", "comments_count": "comments"})
-            else:
-                df_fb_tmp = df_fb_f.copy()
-            df_fb_std = (
-                df_fb_tmp[fb_cols]
-                .rename(columns={"message": "content", "created_time": "time"})
-                if not df_fb_tmp.empty
-                else pd.DataFrame(columns=["id", "content", "time", "likes", "comments", "impressions"])
-            )
-            df_fb_std["platform"] = "Facebook"
-
-            ig_cols = [
-                "id",
-                "caption",
-                "timestamp",
-                "like_count",
-                "comments_count",
-                "impressions",
-                "permalink",
-                "media_type",
-            ]
-            df_ig_std = (
-                df_ig_f[ig_cols]
-                .rename(
-                    columns={
-                        "caption": "content",
-                        "timestamp": "time",
-                        "like_count": "likes",
-                        "comments_count": "comments",
-                    }
-                )
-                if not df_ig_f.empty
-                else pd.DataFrame(columns=["id", "content", "time", "likes", "comments", "impressions", "permalink", "media_type"])
-            )
-            df_ig_std["platform"] = "Instagram"
-
-            df_combined = pd.concat([df_fb_std, df_ig_std], ignore_index=True)
-            if df_combined.empty:
+            df_scored = top_posts.score_posts(top_posts.standardize(df_fb_f, df_ig_f))
+            if df_scored.empty:
                 return no_data_msg
 
-            df_combined["total_impact"] = (
-                df_combined["likes"].fillna(0) + df_combined["comments"].fillna(0) + df_combined["impressions"].fillna(0)
-            )
-            top_posts = df_combined.sort_values("total_impact", ascending=False).head(10)
-
-            table_rows = []
-            for _, r in top_posts.iterrows():
-                txt = r["content"] or ""
-                txt_short = (txt[:75] + "...") if len(txt) > 75 else txt
-                if r["platform"] == "Instagram" and pd.notna(r.get("permalink")):
-                    txt_short = f"[{txt_short}]({r['permalink']})"
-                table_rows.append(
-                    {
-                        "Plataforma": r["platform"],
-                        "Contenido": txt_short,
-                        "Fecha": pd.to_datetime(r["time"]).strftime("%Y-%m-%d") if pd.notna(r["time"]) else "N/A",
-                        "Likes": f"{int(r['likes']):,}",
-                        "Comentarios": f"{int(r['comments']):,}",
-                        "Impresiones": f"{int(r['impressions']):,}",
-                        "Impacto": f"{int(r['total_impact']):,}",
-                    }
-                )
+            # ranking completo paginado en la tabla; contexto IA con el top de cada plataforma
+            top = top_posts.rank_posts(df_scored, n=TOP_POSTS_TABLE_SIZE)
+            table_rows = top_posts.format_rows(top, thumb_url=thumbnails.thumbnail_url)
+            thumbnails.prefetch(top.loc[top["platform"] == "Instagram", "id"])
+            top_by_platform = top_posts.rank_posts(df_scored, n=3, per_platform=True)
 
-            ai_text_tp = get_openai_response(
+            ai_text_tp = insight_request(
                 "Analiza las características comunes de los posts con mayor impacto y da una acción concreta.",
-                top_posts[["platform", "total_impact"]].head(3).to_string(),
+                ContextBuilder()
+                .add(None, top_by_platform[["platform", "media_type", "total_impact", "content"]]
+                     .assign(content=lambda d: d["content"].fillna("").str.slice(0, 120)), priority=0)
+                .build(),
             )
 
             return html.Div(
-                [
+                source_alerts + [
                     dash_table.DataTable(
                         data=table_rows,
                         columns=[
-                            {"name": c, "id": c, "presentation": "markdown" if c == "Contenido" else "input"}
+                            {"name": c, "id": c, "presentation": "markdown" if c in ("Contenido", "Miniatura") else "input"}
                             for c in table_rows[0].keys()
                         ],
                         style_table={"overflowX": "auto"},
@@ -377,6 +329,7 @@ def register_callbacks(app):
                             "whiteSpace": "normal",
                             "height": "auto",
                         },
+                        css=[{"selector": ".dash-cell img", "rule": "max-width: 96px; border-radius: 4px;"}],
                         sort_action="native",
                         filter_action="native",
                         page_size=10,
@@ -384,7 +337,7 @@ def register_callbacks(app):
                     create_ai_insight_card(
                         "top-posts-sm-ai-insight-visible", title="💡 Diagnóstico y Acción (Top Posts)"
                     ),
-                    html.Div(ai_text_tp, id="top-posts-sm-ai-insight-data", style={"display": "none"}),
+                    dcc.Store(id="top-posts-sm-ai-insight-data", data=ai_text_tp),
                     create_ai_chat_interface("top_posts_sm"),
                 ],
                 className="p-3",
@@ -411,52 +364,28 @@ def register_callbacks(app):
         "top-posts-sm-ai-insight-data",
     ]
 
+    def render_ai_card(ai_txt):
+        default_msg = "Análisis IA no disponible o datos insuficientes."
+        if not ai_txt or not ai_txt.strip():
+            return html.P(default_msg)
+        generic_insuff = [
+            "No hay suficientes datos",
+            "No hay datos de engagement",
+            "No hay texto en las publicaciones",
+        ]
+        return html.P(default_msg) if any(msg in ai_txt for msg in generic_insuff) else html.P(ai_txt)
+
+    # Se rellenan en segundo plano; cambiar de sub-pestaña cancela el insight en curso
     for vis, dat in zip(vis_ids, data_ids):
-
-        @app.callback(Output(vis, "children"), Input(dat, "children"))
-        def update_ai_card(ai_txt):
-            default_msg = "Análisis IA no disponible o datos insuficientes."
-            if not ai_txt or not ai_txt.strip():
-                return html.P(default_msg)
-            generic_insuff = [
-                "No hay suficientes datos",
-                "No hay datos de engagement",
-                "No hay texto en las publicaciones",
-            ]
-            return html.P(default_msg) if any(msg in ai_txt for msg in generic_insuff) else html.P(ai_txt)
+        register_insight_card(app, vis, dat, cancel=[Input("social-subtabs", "value")], render=render_ai_card)
 
     # ------------------------------------------------------------------
-    #  CALLBACKS · AI CHAT por sub-tab
+    #  CALLBACKS · AI CHAT por sub-tab (respuesta en streaming, ver chat_stream)
     # ------------------------------------------------------------------
     for tab in ["general_sm", "engagement_sm", "wordmap_sm", "top_posts_sm"]:
-
-        @app.callback(
-            Output(f"{tab}-chat-history", "children"),
-            Input(f"{tab}-chat-submit", "n_clicks"),
-            State(f"{tab}-chat-input", "value"),
-            State(f"{tab}-chat-history", "children"),
-            State("social-subtabs", "value"),
-            prevent_initial_call=True,
+        register_chat_callbacks(
+            app,
+            tab,
+            [State("social-subtabs", "value")],
+            lambda current_tab: f"Sub-pestaña SM actual: '{current_tab}'.",
         )
-        def update_chat(n_clicks, user_input, history, current_tab, tab=tab):
-            if not n_clicks or not user_input:
-                return history
-
-            if history is None:
-                history = []
-            elif not isinstance(history, list):
-                history = [history]
-
-            context = f"Sub-pestaña SM actual: '{current_tab}'."
-            ai_resp = get_openai_response(user_input, context)
-
-            history.extend(
-                [
-                    html.P([html.B("Tú: ", style={"color": "#007bff"}), user_input]),
-                    html.P(
-                        [html.B("SkyIntel AI: ", style={"color": "#28a745"}), ai_resp],
-                        style={"background": "#f0f0f0", "padding": "8px", "borderRadius": "5px"},
-                    ),
-                ]
-            )
-            return history
@@ -0,0 +1,154 @@
+# chat_store.py
+# -------------------------------------------------
+# Historial de los chats de SkyIntel AI en el servidor (SQLite), por
+# sesión del navegador y pestaña. Cada mensaje es un registro compacto
+# (rol + texto); el navegador sólo recibe los mensajes nuevos (Patch) y,
+# al volver a una pestaña, los últimos guardados.
+# Para el modelo se arma una ventana deslizante: los últimos turnos que
+# caben en CHAT_WINDOW_TOKENS y, si quedan turnos fuera, un resumen breve
+# (las preguntas anteriores del usuario) sin llamadas extra a OpenAI.
+#   · retención: los mensajes con más de CHAT_TTL_SECONDS se borran
+#   · tope: CHAT_MAX_MESSAGES mensajes por conversación
+# -------------------------------------------------
+import logging
+import sqlite3
+import threading
+import time
+
+from ai_context import count_tokens, truncate
+from config import (
+    CHAT_MAX_MESSAGES, CHAT_STORE_PATH, CHAT_SUMMARY_TOKENS, CHAT_TTL_SECONDS,
+    CHAT_WINDOW_MESSAGES, CHAT_WINDOW_TOKENS,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    session     TEXT NOT NULL,      -- id de sesión del navegador (dcc.Store de sesión)
+    tab         TEXT NOT NULL,      -- prefijo del chat (overview_ga, general_sm…)
+    role        TEXT NOT NULL,      -- user / assistant
+    content     TEXT NOT NULL,
+    created_at  REAL NOT NULL       -- epoch
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (session, tab, id);
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages (created_at);
+"""
+
+ROLES = ("user", "assistant")
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+# -------------------------------------------------
+# 1 · Conexión
+# -------------------------------------------------
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = sqlite3.connect(CHAT_STORE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+    return conn
+
+
+# -------------------------------------------------
+# 2 · Lectura / escritura
+# -------------------------------------------------
+def append(session: str, tab: str, role: str, content: str) -> None:
+    """Guarda un mensaje; purga los caducados y recorta la conversación a CHAT_MAX_MESSAGES."""
+    if role not in ROLES:
+        raise ValueError(f"Rol no soportado: {role!r} (usa {' o '.join(ROLES)})")
+    content = (content or "").strip()
+    if not session or not content:
+        return
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO messages (session, tab, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session, tab, role, content, now),
+            )
+            conn.execute("DELETE FROM messages WHERE created_at < ?", (now - CHAT_TTL_SECONDS,))
+            conn.execute(
+                """DELETE FROM messages WHERE session = ? AND tab = ? AND id NOT IN (
+                       SELECT id FROM messages WHERE session = ? AND tab = ?
+                       ORDER BY id DESC LIMIT ?)""",
+                (session, tab, session, tab, CHAT_MAX_MESSAGES),
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error guardando el mensaje de chat: {e}")
+    finally:
+        conn.close()
+
+
+def messages(session: str | None, tab: str, limit: int | None = None) -> list[dict]:
+    """Últimos `limit` mensajes de la conversación ({role, content}), del más viejo al más nuevo."""
+    if not session:
+        return []
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            """SELECT role, content FROM messages WHERE session = ? AND tab = ?
+               ORDER BY id DESC LIMIT ?""",
+            (session, tab, -1 if limit is None else limit),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error leyendo el historial de chat: {e}")
+        return []
+    finally:
+        conn.close()
+    return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+
+def clear(session: str, tab: str | None = None) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            if tab is None:
+                conn.execute("DELETE FROM messages WHERE session = ?", (session,))
+            else:
+                conn.execute("DELETE FROM messages WHERE session = ? AND tab = ?", (session, tab))
+    finally:
+        conn.close()
+
+
+# -------------------------------------------------
+# 3 · Ventana para el modelo
+# -------------------------------------------------
+def _summary(older: list[dict]) -> dict | None:
+    questions = [m["content"] for m in older if m["role"] == "user"]
+    if not questions:
+        return None
+    text = "Resumen de la conversación anterior. El usuario ya preguntó: " + \
+           " | ".join(q.replace("\n", " ") for q in questions)
+    return {"role": "system", "content": truncate(text, CHAT_SUMMARY_TOKENS)}
+
+
+def window(session: str | None, tab: str, budget: int | None = None) -> list[dict]:
+    """
+    Turnos previos para el modelo (formato de mensajes de chat.completions):
+    los más recientes que caben en `budget` tokens (CHAT_WINDOW_TOKENS) y
+    CHAT_WINDOW_MESSAGES mensajes; lo anterior, resumido en un mensaje de sistema.
+    """
+    history = messages(session, tab, limit=CHAT_MAX_MESSAGES)
+    budget = budget or CHAT_WINDOW_TOKENS
+    recent, used = [], 0
+    for message in reversed(history):
+        cost = count_tokens(message["content"]) + 4  # rol y separadores
+        if len(recent) == CHAT_WINDOW_MESSAGES or used + cost > budget:
+            break
+        recent.append(message)
+        used += cost
+    recent.reverse()
+    # la ventana empieza con una pregunta, no con una respuesta suelta
+    while recent and recent[0]["role"] != "user":
+        recent.pop(0)
+    older = history[:len(history) - len(recent)]
+    summary = _summary(older)
+    return ([summary] if summary else []) + recent
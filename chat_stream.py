@@ -0,0 +1,222 @@
+# chat_stream.py
+# -------------------------------------------------
+# Chat de SkyIntel AI con entrega de tokens en streaming.
+# Al enviar, el mensaje del usuario se añade al historial (Patch) y la
+# respuesta se pide a OpenAI en un hilo con la API de streaming; los
+# fragmentos se acumulan en un búfer del servidor identificado por un
+# id que guarda el navegador (`*-chat-stream`). Un dcc.Interval ligero
+# (`*-chat-poll`) lee el búfer y pinta la respuesta parcial en
+# `*-chat-live`; al terminar, la respuesta pasa al historial y el
+# intervalo se apaga. El primer token aparece en cuanto OpenAI lo envía.
+# Los búferes viven en memoria del proceso (LRU), como las tablas de
+# server_table: el polling debe llegar al mismo proceso que lo creó.
+# La conversación se guarda en chat_store por sesión del navegador
+# (`chat-session-id`) y pestaña: el modelo recibe su ventana de turnos
+# previos y, al volver a la pestaña, el historial se repinta desde ahí.
+# -------------------------------------------------
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dash import Input, Output, Patch, State, html, no_update
+from dash.exceptions import PreventUpdate
+
+import chat_store
+from ai import failure_text, stream_openai
+from config import CHAT_RESTORE_MESSAGES
+
+CHAT_SESSION_ID = "chat-session-id"  # dcc.Store de sesión en app.layout
+STREAM_SLOTS = 256       # conversaciones en curso / recientes en memoria
+STREAM_WORKERS = 8       # respuestas generándose a la vez
+POLL_INTERVAL_MS = 150
+
+_streams: "OrderedDict[str, _Stream]" = OrderedDict()
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="chat-stream")
+
+
+class _Stream:
+    """Fragmentos recibidos de una respuesta, su estado y su conversación."""
+
+    def __init__(self, session: str | None = None, tab: str | None = None):
+        self.parts: list[str] = []
+        self.done = False
+        self.cancelled = False
+        self.failed = False
+        self.saved = False
+        self.session = session
+        self.tab = tab
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _save(stream: _Stream, partial: bool = False) -> None:
+    """Guarda la respuesta en chat_store una sola vez (los errores no se guardan)."""
+    with _lock:
+        if stream.saved or stream.failed or not stream.session:
+            return
+        stream.saved = True
+    text = stream.text().strip()
+    if text:
+        chat_store.append(stream.session, stream.tab, "assistant", text + (" …" if partial else ""))
+
+
+def _run(stream: _Stream, prompt: str, context: str, history: list[dict] | None) -> None:
+    try:
+        for delta in stream_openai(prompt, context, history=history):
+            if stream.cancelled:
+                break
+            stream.parts.append(delta)
+        else:
+            _save(stream)
+    except Exception as e:
+        logging.error(f"Error llamando a OpenAI (streaming): {e}")
+        stream.failed = True
+        stream.parts.append(failure_text(e))
+    finally:
+        stream.done = True
+
+
+# -------------------------------------------------
+# 1 · Búferes
+# -------------------------------------------------
+def start(prompt: str, context: str = "", history: list[dict] | None = None,
+          session: str | None = None, tab: str | None = None) -> str:
+    """
+    Lanza la respuesta en segundo plano y devuelve el id de su búfer.
+    Con `session`/`tab` la respuesta se guarda en chat_store al terminar.
+    """
+    stream_id = uuid.uuid4().hex
+    stream = _Stream(session, tab)
+    with _lock:
+        _streams[stream_id] = stream
+        while len(_streams) > STREAM_SLOTS:
+            _, old = _streams.popitem(last=False)
+            old.cancelled = True
+    _executor.submit(_run, stream, prompt, context, history)
+    return stream_id
+
+
+def read(stream_id: str | None) -> tuple[str | None, bool]:
+    """(texto recibido hasta ahora, terminado). Id desconocido → (None, True)."""
+    with _lock:
+        stream = _streams.get(stream_id) if stream_id else None
+    if stream is None:
+        return None, True
+    return stream.text(), stream.done
+
+
+def finish(stream_id: str | None) -> _Stream | None:
+    """Saca el búfer de memoria (cancelándolo si seguía abierto) y lo devuelve."""
+    with _lock:
+        stream = _streams.pop(stream_id, None) if stream_id else None
+    if stream is not None:
+        stream.cancelled = True
+    return stream
+
+
+# -------------------------------------------------
+# 2 · Mensajes
+# -------------------------------------------------
+def user_message(text: str) -> html.P:
+    return html.P([html.B("Tú: ", style={'color': '#007bff'}), text], style={'margin': '5px 0'})
+
+
+def ai_message(text: str, streaming: bool = False) -> html.P:
+    body = [html.B("SkyIntel AI: ", style={'color': '#28a745'}), text]
+    if streaming:
+        body.append(html.Span("▍", className="text-muted"))
+    return html.P(body, style={'background': '#f0f0f0', 'padding': '8px',
+                               'borderRadius': '5px', 'margin': '5px 0'})
+
+
+def render_message(message: dict) -> html.P:
+    """Registro de chat_store ({role, content}) → componente del historial."""
+    if message["role"] == "user":
+        return user_message(message["content"])
+    return ai_message(message["content"])
+
+
+# -------------------------------------------------
+# 3 · Callbacks
+# -------------------------------------------------
+def register_chat_session_callbacks(app) -> None:
+    """Asigna un id de sesión al navegador (una vez; dura lo que la pestaña)."""
+
+    @app.callback(
+        Output(CHAT_SESSION_ID, 'data'),
+        Input(CHAT_SESSION_ID, 'modified_timestamp'),
+        State(CHAT_SESSION_ID, 'data'),
+    )
+    def ensure_chat_session(_, session):
+        if session:
+            raise PreventUpdate
+        return uuid.uuid4().hex
+
+
+def register_chat_callbacks(app, tab_id: str, context_states: list[State], build_context) -> None:
+    """
+    Envío, polling y restauración del chat `tab_id` (ver
+    layout_components.create_ai_chat_interface).
+    `build_context(*valores de context_states)` arma el contexto del modelo.
+    """
+    history = Output(f'{tab_id}-chat-history', 'children', allow_duplicate=True)
+    live = Output(f'{tab_id}-chat-live', 'children', allow_duplicate=True)
+    poll_disabled = Output(f'{tab_id}-chat-poll', 'disabled', allow_duplicate=True)
+
+    @app.callback(
+        history, live, Output(f'{tab_id}-chat-stream', 'data'), poll_disabled,
+        Input(f'{tab_id}-chat-submit', 'n_clicks'),
+        State(f'{tab_id}-chat-input', 'value'),
+        State(f'{tab_id}-chat-stream', 'data'),
+        State(CHAT_SESSION_ID, 'data'),
+        *context_states,
+        prevent_initial_call=True,
+    )
+    def submit_chat(n_clicks, user_input, previous_stream, session, *context_values):
+        if not n_clicks or not user_input:
+            raise PreventUpdate
+        patch = Patch()
+        # una respuesta aún en curso se cierra con lo recibido hasta ahora
+        previous = finish(previous_stream)
+        if previous is not None and previous.text().strip():
+            _save(previous, partial=not previous.done)
+            patch.append(ai_message(previous.text().strip() + ("" if previous.done else " …")))
+        patch.append(user_message(user_input))
+        history_window = chat_store.window(session, tab_id)
+        chat_store.append(session, tab_id, "user", user_input)
+        stream_id = start(user_input, build_context(*context_values), history_window, session, tab_id)
+        return patch, ai_message("", streaming=True), stream_id, False
+
+    @app.callback(
+        history, live, poll_disabled,
+        Input(f'{tab_id}-chat-poll', 'n_intervals'),
+        State(f'{tab_id}-chat-stream', 'data'),
+        prevent_initial_call=True,
+    )
+    def poll_chat(_, stream_id):
+        text, done = read(stream_id)
+        if text is None:
+            return no_update, None, True
+        if not done:
+            return no_update, ai_message(text, streaming=True), no_update
+        finish(stream_id)
+        patch = Patch()
+        patch.append(ai_message(text.strip()))
+        return patch, None, True
+
+    @app.callback(
+        history,
+        Input(f'{tab_id}-chat-history', 'id'),
+        State(CHAT_SESSION_ID, 'data'),
+        prevent_initial_call='initial_duplicate',
+    )
+    def restore_chat(_, session):
+        # al (re)pintarse la pestaña: últimos mensajes guardados de esta conversación
+        saved = chat_store.messages(session, tab_id, limit=CHAT_RESTORE_MESSAGES)
+        if not saved:
+            raise PreventUpdate
+        return [render_message(m) for m in saved]
@@ -9,4 +9,61 @@ FACEBOOK_ID = os.getenv("FACEBOOK_ID")
 INSTAGRAM_ID = os.getenv("INSTAGRAM_ID")
 GA_PROPERTY_ID = os.getenv("GA_PROPERTY_ID")
 GA_KEY_PATH = os.getenv("GA_KEY_PATH")
-LOGO_PATH = os.getenv("LOGO_PATH")
\ No newline at end of file
+LOGO_PATH = os.getenv("LOGO_PATH")
+
+# Almacén local de publicaciones (SQLite) y su sincronización incremental
+SOCIAL_STORE_PATH = os.path.abspath(os.getenv("SOCIAL_STORE_PATH", "social_store.sqlite3"))
+SOCIAL_INSIGHTS_MATURITY_DAYS = int(os.getenv("SOCIAL_INSIGHTS_MATURITY_DAYS", "28"))
+SOCIAL_SYNC_INTERVAL_SECONDS = int(os.getenv("SOCIAL_SYNC_INTERVAL_SECONDS", "300"))
+
+# Timeout por fuente (GA4 / Facebook / Instagram) al componer una vista
+SOURCE_TIMEOUT_SECONDS = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "20"))
+
+# Caché en disco de los PNG del wordmap (por hash de la tabla de frecuencias)
+# absoluta: Flask resuelve las rutas relativas de send_file contra app.root_path
+WORDCLOUD_CACHE_DIR = os.path.abspath(os.getenv("WORDCLOUD_CACHE_DIR", "wordcloud_cache"))
+
+# Caché en disco de miniaturas WebP de Instagram (por ID de media)
+THUMBNAIL_CACHE_DIR = os.path.abspath(os.getenv("THUMBNAIL_CACHE_DIR", "thumbnail_cache"))  # ver WORDCLOUD_CACHE_DIR
+
+# Datasets de operaciones ya procesados (Parquet por hash de los CSV subidos)
+OPS_DATASET_DIR = os.path.abspath(os.getenv("OPS_DATASET_DIR", "ops_datasets"))
+
+# Modelo de OpenAI para insights y chat
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# Insights IA en callbacks de fondo: cola de trabajos en disco (diskcache)
+AI_CACHE_DIR = os.path.abspath(os.getenv("AI_CACHE_DIR", "ai_cache"))
+AI_JOB_EXPIRE_SECONDS = int(os.getenv("AI_JOB_EXPIRE_SECONDS", "3600"))
+
+# Caché persistente (SQLite) de respuestas de OpenAI: TTL y tamaño máximo (LRU)
+AI_CACHE_PATH = os.path.abspath(os.getenv("AI_CACHE_PATH", "ai_cache.sqlite3"))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000"))
+
+# Varias tarjetas IA de una misma página: "concurrent" (una llamada por
+# tarjeta, en paralelo) o "combined" (una sola llamada con salida JSON)
+AI_BATCH_MODE = os.getenv("AI_BATCH_MODE", "concurrent")
+AI_BATCH_WORKERS = int(os.getenv("AI_BATCH_WORKERS", "4"))
+
+# Presupuesto de tokens del contexto de cada insight IA (ver ai_context)
+AI_CONTEXT_MAX_TOKENS = int(os.getenv("AI_CONTEXT_MAX_TOKENS", "600"))
+
+# Cliente de OpenAI (ver ai_client): plazo por llamada, timeout por intento,
+# concurrencia, reintentos y circuit breaker
+AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", "45"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+AI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("AI_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Historial de chat en el servidor (ver chat_store): retención, tope por
+# conversación y ventana de turnos previos que se envía al modelo
+CHAT_STORE_PATH = os.path.abspath(os.getenv("CHAT_STORE_PATH", "chat_store.sqlite3"))
+CHAT_TTL_SECONDS = int(os.getenv("CHAT_TTL_SECONDS", str(7 * 24 * 3600)))
+CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", "200"))
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "12"))
+CHAT_WINDOW_TOKENS = int(os.getenv("CHAT_WINDOW_TOKENS", "1500"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))
+CHAT_RESTORE_MESSAGES = int(os.getenv("CHAT_RESTORE_MESSAGES", "50"))
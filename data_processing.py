@@ -1,31 +1,21 @@
 # data_processing.py
 # -------------------------------------------------
-import base64
-import io
+import json
 import logging
-import re
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
+import httpx
 import pandas as pd
-import requests
 
 # --- Dependencias de tu proyecto ----------------
+import graph_client
 from config import FB_ACCESS_TOKEN
 from utils import query_ga  # tu wrapper de Google Analytics
 
 # -------------------------------------------------
 # 1 · Helpers genéricos
 # -------------------------------------------------
-def _extract_metric(ins_dict: dict, names: list[str]) -> int:
-    """Devuelve el valor del primer insight cuyo name esté en `names`."""
-    if not isinstance(ins_dict, dict):
-        return 0
-    for item in ins_dict.get("data", []):
-        if item.get("name") in names:
-            return item["values"][0]["value"]
-    return 0
-
-
 def safe_sorted_unique(series: pd.Series) -> list[str]:
     """Lista de valores únicos, limpios y ordenados alfabéticamente."""
     return sorted(
@@ -36,252 +26,268 @@ def safe_sorted_unique(series: pd.Series) -> list[str]:
 # -------------------------------------------------
 # 2 · Limpieza y unificación de CSV de operaciones
 # -------------------------------------------------
-COLUMNAS_ESPERADAS = [
-    "Fase actual",
-    "Tipo de aeronave",
-    "Fecha y hora del vuelo",
-    "Número de pasajeros",
-    "Monto total a cobrar",
-    "Cliente",
-    "Aeronave",
-    "Operador",
-    "Costo del vuelo (acordado con el operador)",
-    "Horas de vuelo",
-    "Mes",
-    "Ganancia",
-    "Destino",
-    "dia",
-    "nombre_dia",
-    "hora",
-]
-
-
-def clean_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Limpia y formatea columnas clave de operaciones."""
-    df["Fecha y hora del vuelo"] = pd.to_datetime(df["Fecha y hora del vuelo"], errors="coerce")
-    df["Mes"] = df["Mes"].astype(str)
-    df["hora"] = pd.to_numeric(df["hora"], errors="coerce")
-    df["Ganancia"] = pd.to_numeric(df["Ganancia"], errors="coerce").fillna(0)
-    df["Monto total a cobrar"] = pd.to_numeric(df["Monto total a cobrar"], errors="coerce").fillna(0)
-    df["Número de pasajeros"] = pd.to_numeric(df["Número de pasajeros"], errors="coerce").fillna(0)
-    return df
-
+# La lectura tipada de los CSV (esquema, codificación, conteo de errores)
+# vive en ops_ingest.py; aquí quedan sólo los helpers genéricos.
 
-def _try_read_csv(decoded: bytes):
-    """Intenta leer CSV en varias codificaciones comunes."""
-    for enc in ("utf-8", "latin1", "cp1252"):
-        try:
-            return pd.read_csv(io.StringIO(decoded.decode(enc))), None
-        except Exception as e:
-            last_error = str(e)
-    return None, (
-        "No se pudo leer el archivo CSV. Intenta guardarlo como UTF-8 o Latin1. "
-        f"Error original: {last_error}"
-    )
 
+# -------------------------------------------------
+# 3 · Conexión a Facebook / Instagram Graph API
+# -------------------------------------------------
+GRAPH_PAGE_LIMIT = 100  # máximo aceptado por /posts y /media
+GRAPH_BATCH_SIZE = 50   # máximo de sub-peticiones por llamada batch
+GRAPH_BATCH_WORKERS = 4
 
-def unify_data(contents: list[str], filenames: list[str]):
-    """Unifica múltiples CSV subidos por el usuario en un único DataFrame."""
-    if not contents or not filenames:
-        empty = pd.DataFrame(columns=COLUMNAS_ESPERADAS + ["Archivo", "Año"])
-        return empty, "No files uploaded or empty content."
+# Métricas de insights por tipo de media (un metric inválido invalida la llamada)
+IG_INSIGHT_METRICS = {
+    "REELS": "plays,reach,total_interactions",
+    "VIDEO": "impressions,reach,total_interactions,video_views",
+}
+IG_INSIGHT_METRICS_DEFAULT = "impressions,reach,total_interactions"
 
-    all_dfs = []
-    for content, fname in zip(contents, filenames):
-        _, content_string = content.split(",")
-        decoded = base64.b64decode(content_string)
-        df, err = _try_read_csv(decoded)
-        if err:
-            return None, err
 
-        missing = [c for c in COLUMNAS_ESPERADAS if c not in df.columns]
-        if missing:
-            return None, f"El archivo '{fname}' carece de columnas requeridas: {', '.join(missing)}"
+class GraphAPIError(RuntimeError):
+    """Fallo de la Graph API cuando el llamador necesita distinguirlo de 'sin datos'."""
 
-        df["Archivo"] = fname
-        match = re.search(r"(\d{4})", fname)
-        df["Año"] = match.group(0) if match else fname.split(".")[0]
-        all_dfs.append(df)
 
-    if not all_dfs:
-        empty = pd.DataFrame(columns=COLUMNAS_ESPERADAS + ["Archivo", "Año"])
-        return empty, "No valid data processed from files."
+def _fb_request(endpoint: str, params: dict | None = None, strict: bool = False) -> dict:
+    """Realiza GET a Graph API con manejo de errores.
 
-    return pd.concat(all_dfs, ignore_index=True), None
+    `endpoint` puede ser relativo (`{id}/posts`) o la URL absoluta de
+    `paging.next`, que ya trae todos los parámetros y el token.
+    Con `strict=True` los errores se lanzan como GraphAPIError en vez de
+    devolver `{}`.
+    """
+    if not endpoint.startswith("http"):
+        params = {**(params or {}), "access_token": FB_ACCESS_TOKEN}
+    try:
+        return graph_client.get_json(endpoint, params)
+    except httpx.HTTPStatusError as e:
+        # sin la URL completa: lleva el access_token
+        msg = f"Graph API error en '{endpoint.split('?')[0]}': HTTP {e.response.status_code} {e.response.text[:300]}"
+    except (httpx.HTTPError, ValueError) as e:
+        msg = f"Graph API error en '{endpoint.split('?')[0]}': {type(e).__name__}: {e}"
+    logging.error(msg)
+    if strict:
+        raise GraphAPIError(msg)
+    return {}
+
+
+def _fb_batch(relative_urls: list[str]) -> list[dict | None]:
+    """
+    Ejecuta GETs relativos (`{id}/insights?metric=...`) agrupados en llamadas
+    batch de hasta 50. Devuelve el cuerpo JSON de cada sub-petición en el
+    mismo orden, o None si esa sub-petición falló.
+    """
+    chunks = [relative_urls[i:i + GRAPH_BATCH_SIZE] for i in range(0, len(relative_urls), GRAPH_BATCH_SIZE)]
+
+    def run(chunk: list[str]) -> list[dict | None]:
+        data = {
+            "access_token": FB_ACCESS_TOKEN,
+            "include_headers": "false",
+            "batch": json.dumps([{"method": "GET", "relative_url": u} for u in chunk]),
+        }
+        try:
+            replies = graph_client.post_json("", data)
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"Graph API batch error ({len(chunk)} sub-peticiones): {type(e).__name__}")
+            return [None] * len(chunk)
+        out = [json.loads(r["body"]) if r and r.get("code") == 200 else None
+               for r in (replies or [None] * len(chunk))]
+        failed = sum(body is None for body in out)
+        if failed:
+            logging.warning(f"Graph API batch: {failed}/{len(chunk)} sub-peticiones fallaron")
+        return out
+
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(GRAPH_BATCH_WORKERS, len(chunks)),
+                            thread_name_prefix="graph-batch") as pool:
+        return [body for part in pool.map(run, chunks) for body in part]
+
+
+def _parse_graph_time(value: str) -> datetime:
+    """'2024-05-01T13:00:00+0000' → datetime UTC naive (como en los DataFrames)."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _fb_paginate(endpoint: str, params: dict, time_field: str,
+                 since: datetime | None = None, until: datetime | None = None,
+                 strict: bool = False) -> list[dict]:
+    """
+    Recorre todas las páginas de un edge ordenado de más nuevo a más viejo.
+    Se deja de paginar en cuanto aparecen elementos anteriores a `since`,
+    antes de pedir la página siguiente.
+    """
+    params = {**params, "limit": GRAPH_PAGE_LIMIT}
+    if since is not None:
+        params["since"] = int(pd.Timestamp(since).timestamp())
+    if until is not None:
+        params["until"] = int((pd.Timestamp(until) + timedelta(days=1)).timestamp())
+    since = pd.Timestamp(since).to_pydatetime() if since is not None else None
+
+    items: list[dict] = []
+    page = _fb_request(endpoint, params, strict)
+    while page:
+        data = page.get("data", [])
+        items.extend(data)
+        if since is not None and data:
+            oldest = min((_parse_graph_time(d[time_field]) for d in data if d.get(time_field)),
+                         default=None)
+            if oldest is not None and oldest < since:
+                break
+        next_url = page.get("paging", {}).get("next")
+        page = _fb_request(next_url, None, strict) if next_url else None
+    return items
+
+
+# ---------- Normalización de posts ----------
+def _normalize_posts(posts: list[dict], fields: list[str], summary_paths: dict[str, tuple],
+                     metric_aliases: dict[str, tuple]) -> dict[str, list]:
+    """
+    Aplana en una sola pasada los posts de la Graph API a columnas:
+    campos planos, contadores anidados (`summary_paths`) y métricas de
+    insights (`metric_aliases`: columna → nombres aceptados, por prioridad).
+    """
+    # campos planos: una comprensión por columna (sin lógica por fila)
+    cols: dict[str, list] = {f: [p.get(f) for p in posts] for f in fields}
+    summary_out = [(path, cols.setdefault(c, []).append) for c, path in summary_paths.items()]
+    metric_out = [(names, cols.setdefault(c, []).append) for c, names in metric_aliases.items()]
+
+    for post in posts:
+        for path, append in summary_out:
+            value = post
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            append(value or 0)
+        insights = post.get("insights")
+        values = (
+            {item.get("name"): item["values"][0].get("value", 0)
+             for item in reversed(insights.get("data") or ()) if item.get("values")}
+            if isinstance(insights, dict) else {}
+        )
+        for names, append in metric_out:
+            for name in names:
+                if name in values:
+                    append(values[name])
+                    break
+            else:
+                append(0)
+    return cols
 
 
-# -------------------------------------------------
-# 3 · Conexión a Facebook / Instagram Graph API
-# -------------------------------------------------
-def _fb_request(endpoint: str, params: dict | None = None) -> dict:
-    """Realiza GET a Graph API con manejo de errores."""
-    base_url = "https://graph.facebook.com/v22.0/"
-    params = params or {}
-    params["access_token"] = FB_ACCESS_TOKEN
-    try:
-        resp = requests.get(f"{base_url}{endpoint}", params=params, timeout=30)
-        resp.raise_for_status()
-        return resp.json()
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Graph API error en '{endpoint}': {e}")
-        return {}
+def _to_naive_utc(series: pd.Series) -> pd.Series:
+    """'2024-05-01T13:00:00+0000' → datetime64 sin zona (UTC)."""
+    s = series.astype("string")
+    if s.str.endswith("+0000").all():
+        # la Graph API siempre responde en UTC: basta con descartar el sufijo
+        return pd.to_datetime(s.str.slice(0, 19), format="%Y-%m-%dT%H:%M:%S", errors="coerce")
+    return pd.to_datetime(s, format="%Y-%m-%dT%H:%M:%S%z", utc=True, errors="coerce").dt.tz_localize(None)
 
 
 # ---------- Facebook ----------
-def get_facebook_posts(page_id: str) -> list[dict]:
+def get_facebook_posts(page_id: str, since: datetime | None = None,
+                       until: datetime | None = None, with_insights: bool = True,
+                       strict: bool = False) -> list[dict]:
+    """Todos los posts de la página (desde `since` si se indica)."""
     endpoint = f"{page_id}/posts"
     params = {
         "fields": (
             "id,message,created_time,"
-            "likes.summary(true),comments.summary(true),shares,"
-            "insights.metric(post_impressions).period(lifetime)"
+            "likes.summary(true),comments.summary(true),shares"
         )
     }
-    return _fb_request(endpoint, params).get("data", [])
+    posts = _fb_paginate(endpoint, params, "created_time", since, until, strict)
+    return fetch_facebook_insights(posts) if with_insights else posts
 
 
-def process_facebook_posts(posts: list[dict]) -> pd.DataFrame:
-    if not posts:
-        cols = ["id", "message", "created_time", "likes", "comments", "shares", "impressions"]
-        return pd.DataFrame(columns=cols)
+def fetch_facebook_insights(posts: list[dict]) -> list[dict]:
+    """Añade `insights` ({"data": [...]}, None si falló) a cada post vía llamadas batch."""
+    urls = [f"{p['id']}/insights?metric=post_impressions&period=lifetime" for p in posts]
+    for post, body in zip(posts, _fb_batch(urls)):
+        post["insights"] = body
+    return posts
 
-    df = pd.DataFrame(posts)
 
-    df["likes"] = (
-        df["likes"].apply(lambda x: x["summary"]["total_count"]) if "likes" in df else 0
-    )
-    df["comments"] = (
-        df["comments"].apply(lambda x: x["summary"]["total_count"]) if "comments" in df else 0
-    )
-    df["shares"] = (
-        df["shares"].apply(lambda x: x.get("count", 0) if isinstance(x, dict) else 0)
-        if "shares" in df
-        else 0
-    )
-    df["impressions"] = df["insights"].apply(
-        lambda x: _extract_metric(x, ["post_impressions"])
-    )
+FB_POST_COLUMNS = ["id", "message", "created_time", "likes", "comments", "shares", "impressions"]
+FB_SUMMARY_PATHS = {
+    "likes": ("likes", "summary", "total_count"),
+    "comments": ("comments", "summary", "total_count"),
+    "shares": ("shares", "count"),
+}
+FB_METRIC_ALIASES = {"impressions": ("post_impressions",)}
+
+
+def process_facebook_posts(posts: list[dict]) -> pd.DataFrame:
+    if not posts:
+        return pd.DataFrame(columns=FB_POST_COLUMNS)
 
-    df["created_time"] = pd.to_datetime(df["created_time"]).dt.tz_localize(None)
-    return df[["id", "message", "created_time", "likes", "comments", "shares", "impressions"]]
+    cols = _normalize_posts(posts, ["id", "message", "created_time"], FB_SUMMARY_PATHS, FB_METRIC_ALIASES)
+    df = pd.DataFrame(cols)
+    df["created_time"] = _to_naive_utc(df["created_time"])
+    return df[FB_POST_COLUMNS]
 
 
 # ---------- Instagram ----------
-def get_instagram_posts(ig_user_id: str) -> list[dict]:
+def get_instagram_posts(ig_user_id: str, since: datetime | None = None,
+                        until: datetime | None = None, with_insights: bool = True,
+                        strict: bool = False) -> list[dict]:
+    """Todo el media de la cuenta IG (desde `since` si se indica)."""
     endpoint = f"{ig_user_id}/media"
     params = {
         "fields": (
-            "id,caption,media_type,media_url,permalink,thumbnail_url,timestamp,"
-            "username,like_count,comments_count,"
-            "insights.metric(impressions,reach,total_interactions,video_views,plays)"
+            "id,caption,media_type,media_product_type,media_url,permalink,"
+            "thumbnail_url,timestamp,username,like_count,comments_count"
         )
     }
-    return _fb_request(endpoint, params).get("data", [])
+    posts = _fb_paginate(endpoint, params, "timestamp", since, until, strict)
+    return fetch_instagram_insights(posts) if with_insights else posts
+
+
+def fetch_instagram_insights(posts: list[dict]) -> list[dict]:
+    """Añade `insights` a cada media vía batch (None si falló), con las métricas válidas para su tipo."""
+    urls = []
+    for p in posts:
+        kind = p.get("media_product_type") if p.get("media_product_type") == "REELS" else p.get("media_type")
+        urls.append(f"{p['id']}/insights?metric={IG_INSIGHT_METRICS.get(kind, IG_INSIGHT_METRICS_DEFAULT)}")
+    for post, body in zip(posts, _fb_batch(urls)):
+        post["insights"] = body
+    return posts
+
+
+IG_POST_COLUMNS = [
+    "id",
+    "caption",
+    "media_type",
+    "media_url",
+    "permalink",
+    "thumbnail_url",
+    "timestamp",
+    "username",
+    "like_count",
+    "comments_count",
+    "impressions",
+    "reach",
+    "engagement",
+    "video_views",
+]
+IG_SUMMARY_PATHS = {"like_count": ("like_count",), "comments_count": ("comments_count",)}
+IG_METRIC_ALIASES = {
+    "impressions": ("impressions", "plays", "reach"),
+    "reach": ("reach",),
+    "engagement": ("total_interactions", "engagement"),
+    "video_views": ("video_views", "plays"),
+}
 
 
 def process_instagram_posts(posts: list[dict]) -> pd.DataFrame:
     if not posts:
-        cols = [
-            "id",
-            "caption",
-            "media_type",
-            "media_url",
-            "permalink",
-            "thumbnail_url",
-            "timestamp",
-            "username",
-            "like_count",
-            "comments_count",
-            "impressions",
-            "reach",
-            "engagement",
-            "video_views",
-        ]
-        return pd.DataFrame(columns=cols)
-
-    df = pd.DataFrame(posts)
-
-    df["impressions"] = df["insights"].apply(
-        lambda x: _extract_metric(x, ["impressions", "plays", "reach"])
-    )
-    df["reach"] = df["insights"].apply(lambda x: _extract_metric(x, ["reach"]))
-    df["engagement"] = df["insights"].apply(
-        lambda x: _extract_metric(x, ["total_interactions", "engagement"])
-    )
-    df["video_views"] = df["insights"].apply(
-        lambda x: _extract_metric(x, ["video_views", "plays"])
-    )
-
-    df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.tz_localize(None)
-    for col in ("like_count", "comments_count"):
-        if col not in df.columns:
-            df[col] = 0
-
-    return df[
-        [
-            "id",
-            "caption",
-            "media_type",
-            "media_url",
-            "permalink",
-            "thumbnail_url",
-            "timestamp",
-            "username",
-            "like_count",
-            "comments_count",
-            "impressions",
-            "reach",
-            "engagement",
-            "video_views",
-        ]
-    ]
-
-# ---------- Instagram DAILY followers / content ----------
-def get_instagram_daily_followers(ig_user_id: str, since: str, until: str):
-    """
-    Devuelve DataFrame con columnas:
-    date, followers, posts, reels, stories, videos, photos
-    """
-    # 1) followers diarios
-    metric = "follower_count"
-    params = {
-        "metric": metric,
-        "period": "day",
-        "since": since,
-        "until": until,
-    }
-    followers = _fb_request(f"{ig_user_id}/insights", params).get("data", [])
-    records = []
-    for item in followers:
-        for v in item.get("values", []):
-            records.append({"date": v["end_time"][:10], "followers": v["value"]})
-
-    df = pd.DataFrame(records)
-
-    # 2) publicaciones diarias por tipo
-    posts = get_instagram_posts(ig_user_id)
-    df_posts = pd.DataFrame(posts)
-    if not df_posts.empty and "timestamp" in df_posts.columns:
-        df_posts["date"] = df_posts["timestamp"].str[:10]
-        df_posts["cnt"] = 1
-        pivot = (
-            df_posts.pivot_table(
-                index="date", columns="media_type", values="cnt", aggfunc="sum"
-            )
-            .fillna(0)
-            .rename(
-                columns={
-                    "REEL": "reels",
-                    "VIDEO": "videos",
-                    "CAROUSEL_ALBUM": "photos",
-                    "IMAGE": "photos",
-                }
-            )
-        )
-        pivot["posts"] = pivot.sum(axis=1)
-        df = df.merge(pivot, on="date", how="left")
+        return pd.DataFrame(columns=IG_POST_COLUMNS)
 
-    return df.sort_values("date")
+    fields = ["id", "caption", "media_type", "media_url", "permalink", "thumbnail_url", "timestamp", "username"]
+    cols = _normalize_posts(posts, fields, IG_SUMMARY_PATHS, IG_METRIC_ALIASES)
+    df = pd.DataFrame(cols)
+    df["timestamp"] = _to_naive_utc(df["timestamp"])
+    return df[IG_POST_COLUMNS]
 
 
 def get_instagram_demography(ig_user_id: str):
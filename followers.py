@@ -0,0 +1,141 @@
+# followers.py
+# -------------------------------------------------
+# Crecimiento de seguidores de Instagram.
+#   · `follower_count` diario se guarda en el almacén local: sólo se piden
+#     a la Graph API los días que faltan (y los últimos, aún provisionales),
+#     en ventanas de 30 días (máximo de la API) descargadas en paralelo
+#   · las publicaciones por día salen del mismo almacén que usan las
+#     pestañas sociales: no se vuelve a descargar el listado de media
+# -------------------------------------------------
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+import social_store
+from data_processing import GRAPH_BATCH_WORKERS, GraphAPIError, _fb_request
+
+FOLLOWER_METRIC = "follower_count"
+WINDOW_DAYS = 30            # rango máximo por llamada de /insights
+PROVISIONAL_DAYS = 2        # días recientes que Meta aún puede corregir
+RETRY_EMPTY_SECONDS = 6 * 3600  # días sin dato: se reintentan cada 6 h
+
+DAILY_COLUMNS = ["date", "followers", "posts", "reels", "stories", "videos", "photos"]
+
+
+# -------------------------------------------------
+# 1 · follower_count incremental
+# -------------------------------------------------
+def _missing_windows(days: list[date], stored: dict) -> list[tuple[date, date]]:
+    """Agrupa los días a descargar en ventanas contiguas de hasta WINDOW_DAYS."""
+    today = date.today()
+    now = time.time()
+    todo = []
+    for d in days:
+        hit = stored.get(d.isoformat())
+        if hit is None or (today - d).days < PROVISIONAL_DAYS:
+            todo.append(d)
+        elif hit[0] is None and now - hit[1] > RETRY_EMPTY_SECONDS:
+            todo.append(d)
+
+    windows: list[tuple[date, date]] = []
+    for d in todo:
+        if windows and (d - windows[-1][1]).days == 1 and (d - windows[-1][0]).days < WINDOW_DAYS:
+            windows[-1] = (windows[-1][0], d)
+        else:
+            windows.append((d, d))
+    return windows
+
+
+def _fetch_window(ig_user_id: str, start: date, end: date) -> dict[str, float | None]:
+    params = {
+        "metric": FOLLOWER_METRIC,
+        "period": "day",
+        "since": start.isoformat(),
+        "until": (end + timedelta(days=1)).isoformat(),
+    }
+    data = _fb_request(f"{ig_user_id}/insights", params, strict=True).get("data", [])
+    # los días sin valor se guardan como NULL para no volver a pedirlos en cada render
+    values: dict[str, float | None] = {
+        (start + timedelta(days=i)).isoformat(): None for i in range((end - start).days + 1)
+    }
+    for item in data:
+        for v in item.get("values", []):
+            day = v["end_time"][:10]
+            if day in values:
+                values[day] = v.get("value")
+    return values
+
+
+def get_daily_followers(ig_user_id: str, since: str, until: str) -> pd.DataFrame:
+    """Serie diaria `date, followers` del rango; sólo descarga lo que no esté guardado."""
+    start = date.fromisoformat(str(since)[:10])
+    end = min(date.fromisoformat(str(until)[:10]), date.today())
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    stored = social_store.load_daily_metric("instagram", ig_user_id, FOLLOWER_METRIC,
+                                            start.isoformat(), end.isoformat())
+    windows = _missing_windows(days, stored)
+
+    if windows:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(GRAPH_BATCH_WORKERS, len(windows)),
+                                thread_name_prefix="ig-followers") as pool:
+            futures = [pool.submit(_fetch_window, ig_user_id, a, b) for a, b in windows]
+        fetched: dict[str, float | None] = {}
+        for (a, b), fut in zip(windows, futures):
+            try:
+                fetched.update(fut.result())
+            except GraphAPIError as e:
+                logging.error(f"follower_count {a}..{b} no disponible, se usan datos guardados: {e}")
+        if fetched:
+            social_store.save_daily_metric("instagram", ig_user_id, FOLLOWER_METRIC, fetched)
+            stored.update({d: (v, time.time()) for d, v in fetched.items()})
+        logging.info(f"followers: {len(windows)} ventanas ({len(fetched)} días) en {time.perf_counter() - t0:.1f}s")
+
+    records = [{"date": d, "followers": v} for d, (v, _) in sorted(stored.items()) if v is not None]
+    return pd.DataFrame(records, columns=["date", "followers"])
+
+
+# -------------------------------------------------
+# 2 · Publicaciones por día (desde el almacén compartido)
+# -------------------------------------------------
+def _media_kind(post: dict) -> str:
+    if post.get("media_product_type") == "REELS":
+        return "reels"
+    if post.get("media_product_type") == "STORY":
+        return "stories"
+    return {"VIDEO": "videos", "IMAGE": "photos", "CAROUSEL_ALBUM": "photos"}.get(post.get("media_type"), "photos")
+
+
+def get_daily_posts(ig_user_id: str, since: str, until: str) -> pd.DataFrame:
+    """Publicaciones por día y tipo: `date, posts, reels, stories, videos, photos`."""
+    posts = social_store.get_posts("instagram", ig_user_id,
+                                   since=pd.to_datetime(since), until=pd.to_datetime(until))
+    kinds = ["reels", "stories", "videos", "photos"]
+    if not posts:
+        return pd.DataFrame(columns=["date", "posts", *kinds])
+    df = pd.DataFrame({
+        "date": [p["timestamp"][:10] for p in posts],
+        "kind": [_media_kind(p) for p in posts],
+    })
+    pivot = pd.crosstab(df["date"], df["kind"]).reindex(columns=kinds, fill_value=0)
+    pivot["posts"] = pivot.sum(axis=1)
+    return pivot.reset_index()[["date", "posts", *kinds]]
+
+
+# -------------------------------------------------
+# 3 · Serie combinada
+# -------------------------------------------------
+def get_instagram_daily_followers(ig_user_id: str, since: str, until: str) -> pd.DataFrame:
+    """
+    Devuelve DataFrame con columnas:
+    date, followers, posts, reels, stories, videos, photos
+    """
+    df = get_daily_followers(ig_user_id, since, until).merge(
+        get_daily_posts(ig_user_id, since, until), on="date", how="left"
+    )
+    counts = ["posts", "reels", "stories", "videos", "photos"]
+    df[counts] = df[counts].fillna(0).astype(int)
+    return df[DAILY_COLUMNS].sort_values("date").reset_index(drop=True)
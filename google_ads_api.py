@@ -7,11 +7,14 @@ import os
 from pathlib import Path
 from datetime import date, timedelta
 from typing import Dict, List
+import numpy as np
 import pandas as pd
 from google.ads.googleads.client import GoogleAdsClient
 from google.auth.exceptions import RefreshError
 from functools import lru_cache
 
+import timebuckets
+
 @lru_cache(maxsize=1)
 def get_client() -> GoogleAdsClient:
     """Singleton de GoogleAdsClient para toda la sesión."""
@@ -143,6 +146,20 @@ WHERE segments.date BETWEEN '{start}' AND '{end}'
   AND ad_group.status IN ('ENABLED','PAUSED')
 """
 
+# Agregación hora × día de la semana: sin segments.date en el SELECT,
+# Google Ads devuelve como máximo 7×24 filas por campaña sea cual sea el rango.
+GAQL_HOUR_DOW = """
+SELECT
+  segments.day_of_week,
+  segments.hour,
+  metrics.clicks,
+  metrics.conversions,
+  metrics.cost_micros
+FROM campaign
+WHERE segments.date BETWEEN '{start}' AND '{end}'
+  AND campaign.status = 'ENABLED'
+"""
+
 # ────────────────────────────────────────────────────────────
 # 4) Helper genérico
 # ────────────────────────────────────────────────────────────
@@ -185,7 +202,7 @@ def fetch_ads_metrics(client, customer_id, start, end) -> pd.DataFrame:
         "cpc":  r.metrics.average_cpc / 1_000_000,
         "cost": r.metrics.cost_micros / 1_000_000,
     } for r in raw]
-    return pd.DataFrame(rows)
+    return pd.DataFrame(rows, columns=["date","campaign","clicks","impressions","conversions","ctr","cpc","cost"])
 
 # ---------- GEO ----------
 # Cache global para nombres de ciudades
@@ -363,7 +380,7 @@ def fetch_device_performance(start_date: date, end_date: date) -> pd.DataFrame:
         "conversions":   r.metrics.conversions,
         "cost":          r.metrics.cost_micros / 1_000_000,
     } for r in raw]
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(rows, columns=["device", "clicks", "conversions", "cost"])
     return df.groupby("device", as_index=False).sum()
 
 # ---------- AGE ----------
@@ -383,7 +400,7 @@ def fetch_age_performance(start_date: date, end_date: date) -> pd.DataFrame:
         "conv":      r.metrics.conversions,
         "cost":      r.metrics.cost_micros / 1_000_000,
     } for r in raw]
-    return pd.DataFrame(rows).groupby("age_range", as_index=False).sum()
+    return pd.DataFrame(rows, columns=["age_range", "clicks", "conv", "cost"]).groupby("age_range", as_index=False).sum()
 
 # ---------- GENDER ----------
 _gender_map = {"MALE": "Hombre", "FEMALE": "Mujer", "UNDETERMINED": "N/D", "UNKNOWN": "Desconocido"}
@@ -398,26 +415,29 @@ def fetch_gender_performance(start_date: date, end_date: date) -> pd.DataFrame:
         "conv":   r.metrics.conversions,
         "cost":   r.metrics.cost_micros / 1_000_000,
     } for r in raw]
-    return pd.DataFrame(rows).groupby("gender", as_index=False).sum()
+    return pd.DataFrame(rows, columns=["gender", "clicks", "conv", "cost"]).groupby("gender", as_index=False).sum()
 
 # ---------- Daily ----------
+def summarize_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega el frame de `fetch_ads_metrics` por día."""
+    if df.empty:
+        return pd.DataFrame(columns=["date", "spend", "clicks", "impressions", "conversions"])
+    # días sin filas (sin impresiones) aparecen en 0 en lugar de saltarse en el gráfico
+    daily = timebuckets.bucketize(
+        df.assign(date=pd.to_datetime(df["date"])), "date", timebuckets.DAILY,
+        ["cost", "clicks", "impressions", "conversions"],
+    ).rename(columns={"cost": "spend"})
+    daily["date"] = daily["date"].dt.strftime("%Y-%m-%d")
+    return daily[["date", "spend", "clicks", "impressions", "conversions"]]
+
 def fetch_daily_performance(start_date: date, end_date: date) -> pd.DataFrame:
     client = get_client()
     cid = _get_customer_id()
-    df = fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat())
-    if df.empty:
-        return pd.DataFrame(columns=["date", "spend", "clicks", "conversions"])
-    return (
-        df.groupby("date", as_index=False)
-          .agg(spend=("cost","sum"), clicks=("clicks","sum"), conversions=("conversions","sum"))
-          .sort_values("date")
-    )
+    return summarize_daily(fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat()))
 
 # ---------- Campaign ----------
-def fetch_campaign_performance(start_date: date, end_date: date) -> pd.DataFrame:
-    client = get_client()
-    cid = _get_customer_id()
-    df = fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat())
+def summarize_campaigns(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega el frame de `fetch_ads_metrics` por campaña."""
     if df.empty:
         return pd.DataFrame(columns=["campaign","spend","clicks","conversions","cpc","cpa","roas"])
     agg = (df.groupby("campaign", as_index=False)
@@ -428,6 +448,11 @@ def fetch_campaign_performance(start_date: date, end_date: date) -> pd.DataFrame
     agg["roas"]= agg.conversions / agg.spend.replace({0: None})
     return agg
 
+def fetch_campaign_performance(start_date: date, end_date: date) -> pd.DataFrame:
+    client = get_client()
+    cid = _get_customer_id()
+    return summarize_campaigns(fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat()))
+
 # ---------- Keywords ----------
 def fetch_keyword_performance(start_date: date, end_date: date) -> pd.DataFrame:
     client = get_client()
@@ -446,15 +471,13 @@ def fetch_keyword_performance(start_date: date, end_date: date) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 # ---------- Overview ----------
-def fetch_overview(start_date: date, end_date: date) -> Dict[str, float]:
-    client = get_client()
-    cid = _get_customer_id()
-
-    df_now  = fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat())
+def previous_period(start_date: date, end_date: date) -> tuple[date, date]:
+    """Rango inmediatamente anterior y de igual duración."""
     period_days = (end_date - start_date).days + 1
-    prev_start, prev_end = start_date - timedelta(days=period_days), start_date - timedelta(days=1)
-    df_prev = fetch_ads_metrics(client, cid, prev_start.isoformat(), prev_end.isoformat())
+    return start_date - timedelta(days=period_days), start_date - timedelta(days=1)
 
+def summarize_overview(df_now: pd.DataFrame, df_prev: pd.DataFrame) -> Dict[str, float]:
+    """KPIs del periodo actual y su variación % frente al previo."""
     def tot(df, col): return df[col].sum() if not df.empty else 0.0
     curr = {k: tot(df_now,k)  for k in ["clicks","impressions","conversions","cost"]}
     prev = {k: tot(df_prev,k) for k in ["clicks","impressions","conversions","cost"]}
@@ -477,6 +500,14 @@ def fetch_overview(start_date: date, end_date: date) -> Dict[str, float]:
         "roas": round(roas,2),                   "delta_roas":   pct(roas, prev_roas),
     }
 
+def fetch_overview(start_date: date, end_date: date) -> Dict[str, float]:
+    client = get_client()
+    cid = _get_customer_id()
+    prev_start, prev_end = previous_period(start_date, end_date)
+    df_now  = fetch_ads_metrics(client, cid, start_date.isoformat(), end_date.isoformat())
+    df_prev = fetch_ads_metrics(client, cid, prev_start.isoformat(), prev_end.isoformat())
+    return summarize_overview(df_now, df_prev)
+
 # ---------- AdGroup ----------
 def fetch_adgroup_performance(start_date: date, end_date: date) -> pd.DataFrame:
     client = get_client()
@@ -490,7 +521,45 @@ def fetch_adgroup_performance(start_date: date, end_date: date) -> pd.DataFrame:
         "avg_cpc":      r.metrics.average_cpc,
         "conv":         r.metrics.conversions,
     } for r in raw]
-    return pd.DataFrame(rows).sort_values("clicks", ascending=False)
+    return pd.DataFrame(rows, columns=["ad_group", "clicks", "impr", "ctr", "avg_cpc", "conv"]).sort_values("clicks", ascending=False)
+
+# ---------- Hora × Día de la semana ----------
+DOW_LABELS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+_dow_index = {
+    "MONDAY": 0, "TUESDAY": 1, "WEDNESDAY": 2, "THURSDAY": 3,
+    "FRIDAY": 4, "SATURDAY": 5, "SUNDAY": 6,
+}
+
+def fetch_hour_dow_performance(start_date: date, end_date: date) -> Dict[str, np.ndarray]:
+    """
+    Matrices 7×24 (día de la semana × hora) de spend, clicks y conversiones.
+    La agregación se hace en GAQL; aquí sólo se acumulan las filas por campaña,
+    así que el tamaño del resultado no depende de la longitud del rango.
+    """
+    client = get_client()
+    cid = _get_customer_id()
+    raw = _run_gaql(client, cid, GAQL_HOUR_DOW.format(start=start_date.isoformat(), end=end_date.isoformat()))
+
+    grids = {k: np.zeros((7, 24), dtype=float) for k in ("spend", "clicks", "conversions")}
+    if not raw:
+        return grids
+
+    dows, hours, spend, clicks, conv = [], [], [], [], []
+    for r in raw:
+        d = _dow_index.get(r.segments.day_of_week.name)
+        if d is None:
+            continue
+        dows.append(d)
+        hours.append(r.segments.hour)
+        spend.append(r.metrics.cost_micros / 1_000_000)
+        clicks.append(r.metrics.clicks)
+        conv.append(r.metrics.conversions)
+
+    idx = (np.asarray(dows, dtype=int), np.asarray(hours, dtype=int))
+    np.add.at(grids["spend"], idx, spend)
+    np.add.at(grids["clicks"], idx, clicks)
+    np.add.at(grids["conversions"], idx, conv)
+    return grids
 
 # -----------------------------------------------------------
 # END OF MODULE
@@ -1,15 +1,15 @@
 # google_ads_tab.py  – versión multi-subtab (corregido)
 
 from __future__ import annotations
-from concurrent.futures import ThreadPoolExecutor
-from functools import partial
 import datetime as _dt
 import dash, dash_bootstrap_components as dbc
 import pandas as pd, plotly.express as px, plotly.graph_objects as go
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State
 from dash.dash_table import FormatTemplate               # solo templates
 import google_ads_api as gads
+import ads_service
 from layout_components import create_ai_insight_card
+from server_table import server_table
 
 
 # ─────────── Helpers ───────────
@@ -61,6 +61,7 @@ def get_google_ads_tab(app: dash.Dash) -> dbc.Container:
                     dcc.Tab(label="Desempeño General 🚀", value="overview"),
                     dcc.Tab(label="Segmentación & Geo 🌍", value="geo"),
                     dcc.Tab(label="Keywords & Campañas 🔑", value="kw"),
+                    dcc.Tab(label="Horarios ⏰", value="schedule"),
                 ],
                 className="mb-3",
             ),
@@ -83,21 +84,12 @@ def get_google_ads_tab(app: dash.Dash) -> dbc.Container:
 def _fetch_ads_data(_, start_date, end_date):
     start, end = map(_dt.date.fromisoformat, (start_date, end_date))
 
-    # Empaquetamos cada función con sus args
-    jobs = {
-        "overview":  partial(gads.fetch_overview,  start, end),
-        "daily":     partial(gads.fetch_daily_performance, start, end),
-        "campaigns": partial(gads.fetch_campaign_performance, start, end),
-        "geo":       partial(gads.fetch_geo_performance, start, end),
-        "devices":   partial(gads.fetch_device_performance, start, end),
-        "ages":      partial(gads.fetch_age_performance, start, end),
-        "genders":   partial(gads.fetch_gender_performance, start, end),
-        "adgroups":  partial(gads.fetch_adgroup_performance, start, end),
-        "keywords":  partial(gads.fetch_keyword_performance, start, end),
-    }
-
-    with ThreadPoolExecutor(max_workers=6) as pool:
-        results = {k: pool.submit(f).result() for k, f in jobs.items()}
+    # Todo pasa por el servicio común (caché + descargas en paralelo)
+    results = ads_service.get_many(
+        ["overview", "daily", "campaigns", "geo", "devices", "ages",
+         "genders", "adgroups", "keywords", "hour_dow"],
+        start, end,
+    )
 
     # Serializa sólo los grandes
     data = {
@@ -110,6 +102,8 @@ def _fetch_ads_data(_, start_date, end_date):
         "genders":   results["genders"].to_dict("records"),
         "adgroups":  results["adgroups"].to_dict("records"),
         "keywords":  results["keywords"].to_dict("records"),
+        # matrices 7×24 fijas → payload constante
+        "hour_dow":  {k: v.tolist() for k, v in results["hour_dow"].items()},
     }
     return data, _dt.datetime.now().strftime("Actualizado %Y-%m-%d %H:%M:%S")
 
@@ -151,10 +145,10 @@ def _render_subtab(tab, data):
         )).update_layout(title_text="Embudo – Ad Delivery")
 
         camp_df = pd.DataFrame(data["campaigns"]).sort_values("spend", ascending=False)
-        table = dash_table.DataTable(
-            data=camp_df.to_dict("records"),
+        table = server_table(
+            camp_df,
             columns=[{"name": c.capitalize(), "id": c} for c in camp_df.columns],
-            page_size=15, sort_action="native",
+            page_size=15,
             style_table={"overflowX":"auto"},
             style_header={"fontWeight":"bold"},
         )
@@ -216,8 +210,8 @@ def _render_subtab(tab, data):
             table_ag = dbc.Alert("Sin datos de grupos de anuncio.")
             pie_ag   = dbc.Alert("Sin datos.")
         else:
-            table_ag = dash_table.DataTable(
-                data   = ag_df.to_dict("records"),
+            table_ag = server_table(
+                ag_df,
                 columns=[
                     {"name": "Ad Group",      "id": "ad_group"},
                     {"name": "Clicks",        "id": "clicks",   "type":"numeric"},
@@ -228,7 +222,7 @@ def _render_subtab(tab, data):
                      "type":"numeric", "format": FormatTemplate.money(2)},
                     {"name": "Conv.",         "id": "conv",     "type":"numeric"},
                 ],
-                page_size=10, sort_action="native",
+                page_size=10,
                 style_table={"maxHeight":"300px","overflowY":"auto"},
                 style_header={"fontWeight":"bold"},
             )
@@ -239,6 +233,29 @@ def _render_subtab(tab, data):
                 table_ag,
                 dcc.Graph(figure=pie_ag, className="mt-4")]
 
+    # 2.4 Horarios (hora × día de la semana)
+    if tab == "schedule":
+        grids = data.get("hour_dow") or {}
+        if not grids or not any(any(row) for row in grids.get("spend", [])):
+            return dbc.Alert("Sin datos por hora para el rango seleccionado.")
+
+        def _heatmap(key, title, scale):
+            return go.Figure(go.Heatmap(
+                z=grids[key], x=list(range(24)), y=gads.DOW_LABELS,
+                colorscale=scale, hoverongaps=False,
+            )).update_layout(title=title, xaxis_title="Hora",
+                             yaxis_autorange="reversed")
+
+        fig_spend = _heatmap("spend", "Inversión (US$) por Hora × Día", "Blues")
+        fig_conv  = _heatmap("conversions", "Conversiones por Hora × Día", "Greens")
+
+        return dbc.Container([
+            dbc.Row([
+                dbc.Col(dcc.Graph(figure=fig_spend), md=6),
+                dbc.Col(dcc.Graph(figure=fig_conv),  md=6),
+            ], className="gy-4"),
+        ], fluid=True)
+
 
 # 3) Agregar tarjeta-IA sin borrar la vista
 @dash.callback(
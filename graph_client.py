@@ -0,0 +1,193 @@
+# graph_client.py
+# -------------------------------------------------
+# Cliente HTTP compartido para toda la Graph API (Facebook / Instagram):
+# pool de conexiones keep-alive, HTTP/2 si `h2` está instalado, gzip,
+# reintentos con backoff y respeto de las cabeceras de uso de Meta.
+# Las esperas por cuota corren en los hilos de petición de Dash, así que
+# se limitan a USAGE_MAX_WAIT_SECONDS: si Meta pide más, se lanza
+# GraphRateLimited al instante en vez de dormir.
+# -------------------------------------------------
+import importlib.util
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+GRAPH_BASE_URL = "https://graph.facebook.com/v22.0/"
+
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+USAGE_THROTTLE_PCT = 90        # % de cuota a partir del cual se frena
+USAGE_PAUSE_SECONDS = 60       # pausa si Meta no indica tiempo de recuperación
+USAGE_MAX_WAIT_SECONDS = 5     # espera máxima dentro de una petición
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_CODES = {4, 17, 32, 613, 80001, 80002, 80004}
+
+
+class GraphRateLimited(httpx.HTTPError):
+    """Cuota de la Graph API agotada; reintentar pasados `retry_in` segundos."""
+
+    def __init__(self, message: str, retry_in: float):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+_client = httpx.Client(
+    base_url=GRAPH_BASE_URL,
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=httpx.Timeout(30.0, connect=10.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    headers={"Accept-Encoding": "gzip, deflate"},
+)
+
+_lock = threading.Lock()
+_pause_until = 0.0
+_metrics = defaultdict(lambda: {"requests": 0, "errors": 0, "retries": 0,
+                                "bytes": 0, "latency_total": 0.0, "latency_max": 0.0})
+
+
+# -------------------------------------------------
+# 1 · Cabeceras de uso (X-App-Usage / X-Business-Use-Case-Usage)
+# -------------------------------------------------
+def _usage_wait(headers: httpx.Headers) -> float:
+    """Segundos a esperar según las cabeceras de cuota (0 si hay margen)."""
+    peak, regain_min = 0, 0
+    for name in ("x-app-usage", "x-page-usage"):
+        if name in headers:
+            try:
+                peak = max([peak, *json.loads(headers[name]).values()])
+            except (ValueError, TypeError):
+                pass
+    if "x-business-use-case-usage" in headers:
+        try:
+            for entries in json.loads(headers["x-business-use-case-usage"]).values():
+                for e in entries:
+                    peak = max(peak, e.get("call_count", 0), e.get("total_cputime", 0), e.get("total_time", 0))
+                    regain_min = max(regain_min, e.get("estimated_time_to_regain_access", 0))
+        except (ValueError, TypeError, AttributeError):
+            pass
+    if regain_min:
+        return regain_min * 60.0
+    return USAGE_PAUSE_SECONDS if peak >= USAGE_THROTTLE_PCT else 0.0
+
+
+def _is_rate_limited(resp: httpx.Response) -> bool:
+    if resp.status_code == 429:
+        return True
+    if resp.status_code in (400, 403):
+        try:
+            return resp.json().get("error", {}).get("code") in RATE_LIMIT_CODES
+        except ValueError:
+            return False
+    return False
+
+
+def _endpoint_key(url: str) -> str:
+    """'/v22.0/1784.../media' → '{id}/media' para agrupar métricas."""
+    path = httpx.URL(url).path if url.startswith("http") else url
+    path = re.sub(r"^/?v\d+\.\d+/", "", path.lstrip("/"))
+    return re.sub(r"\d{5,}(_\d+)?", "{id}", path) or "/"
+
+
+# -------------------------------------------------
+# 2 · Petición con reintentos
+# -------------------------------------------------
+def request(method: str, url: str, params: dict | None = None,
+            data: dict | None = None) -> httpx.Response:
+    """
+    Ejecuta la petición reutilizando el pool. `url` es relativa a la versión
+    de la API o absoluta (`paging.next`). Reintenta 5xx y límites de
+    cuota con backoff exponencial + jitter; lanza httpx.HTTPError al agotar
+    los reintentos y GraphRateLimited si la cuota obliga a esperar más de
+    USAGE_MAX_WAIT_SECONDS.
+    """
+    global _pause_until
+    key = _endpoint_key(url)
+    if url.startswith("http"):
+        # URL absoluta (`paging.next`): su query ya trae cursor y token, y un
+        # `params` (aunque sea {}) la reemplazaría entera en httpx ≥ 0.28
+        url = httpx.URL(url).copy_merge_params(params) if params else httpx.URL(url)
+        params = None
+    for attempt in range(MAX_RETRIES + 1):
+        wait = _pause_until - time.monotonic()
+        if wait > USAGE_MAX_WAIT_SECONDS:
+            with _lock:
+                _metrics[key]["errors"] += 1
+            logging.warning(f"Graph API: cuota agotada, '{key}' no se envía (reintento en {wait:.0f}s)")
+            raise GraphRateLimited(f"cuota de la Graph API agotada, reintento en {wait:.0f}s", wait)
+        if wait > 0:
+            logging.info(f"Graph API: cuota alta, pausa de {wait:.1f}s antes de '{key}'")
+            time.sleep(wait)
+
+        t0 = time.perf_counter()
+        try:
+            resp = _client.request(method, url, params=params, data=data)
+        except httpx.TransportError as e:
+            resp, error = None, e
+        else:
+            error = None
+        elapsed = time.perf_counter() - t0
+
+        with _lock:
+            m = _metrics[key]
+            m["requests"] += 1
+            m["latency_total"] += elapsed
+            m["latency_max"] = max(m["latency_max"], elapsed)
+            if resp is not None:
+                m["bytes"] += resp.num_bytes_downloaded
+
+        retryable = error is not None
+        if resp is not None:
+            usage_wait = _usage_wait(resp.headers)
+            if usage_wait:
+                with _lock:
+                    _pause_until = max(_pause_until, time.monotonic() + usage_wait)
+            retryable = resp.status_code in RETRY_STATUS or _is_rate_limited(resp)
+            if not retryable:
+                if resp.is_error:
+                    with _lock:
+                        _metrics[key]["errors"] += 1
+                resp.raise_for_status()
+                return resp
+
+        if attempt == MAX_RETRIES:
+            with _lock:
+                _metrics[key]["errors"] += 1
+            if error is not None:
+                raise error
+            resp.raise_for_status()
+            return resp
+
+        if _pause_until - time.monotonic() > USAGE_MAX_WAIT_SECONDS:
+            continue  # la cuota no vuelve a tiempo: el siguiente intento lanza GraphRateLimited
+        with _lock:
+            _metrics[key]["retries"] += 1
+        backoff = min(BACKOFF_BASE_SECONDS * 2 ** attempt + random.uniform(0, BACKOFF_BASE_SECONDS),
+                      USAGE_MAX_WAIT_SECONDS)
+        logging.info(f"Graph API: reintento {attempt + 1}/{MAX_RETRIES} de '{key}' en {backoff:.1f}s")
+        time.sleep(backoff)
+
+
+def get_json(url: str, params: dict | None = None) -> dict:
+    return request("GET", url, params=params).json()
+
+
+def post_json(url: str, data: dict | None = None) -> dict | list:
+    return request("POST", url, data=data).json()
+
+
+# -------------------------------------------------
+# 3 · Métricas
+# -------------------------------------------------
+def get_metrics() -> dict:
+    """Peticiones, errores, reintentos, bytes y latencia por endpoint."""
+    with _lock:
+        out = {}
+        for key, m in _metrics.items():
+            out[key] = {**m, "latency_avg": m["latency_total"] / m["requests"] if m["requests"] else 0.0}
+        return out
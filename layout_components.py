@@ -2,8 +2,9 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html, dash_table
 import plotly.graph_objects as go
 import numpy as np
-import io, base64, logging
-from wordcloud import WordCloud
+import logging
+
+from chat_stream import POLL_INTERVAL_MS as CHAT_POLL_INTERVAL_MS
 
 # ---------- Utilidades de UI ----------
 def create_ai_chat_interface(tab_id_prefix):
@@ -11,10 +12,15 @@ def create_ai_chat_interface(tab_id_prefix):
         dbc.CardHeader(f"Chatea con SkyIntel AI 🤖 ({tab_id_prefix})",
                        className="text-white bg-primary"),
         dbc.CardBody([
-            html.Div(id=f'{tab_id_prefix}-chat-history',
-                     style={'height': '150px', 'overflowY': 'scroll',
-                            'border': '1px solid #ccc', 'padding': '10px',
-                            'marginBottom': '10px', 'background': '#f8f9fa'}),
+            # historial (se le añaden mensajes con Patch) + respuesta en streaming
+            html.Div([
+                html.Div(id=f'{tab_id_prefix}-chat-history', children=[]),
+                html.Div(id=f'{tab_id_prefix}-chat-live'),
+            ], style={'height': '150px', 'overflowY': 'scroll',
+                      'border': '1px solid #ccc', 'padding': '10px',
+                      'marginBottom': '10px', 'background': '#f8f9fa'}),
+            dcc.Store(id=f'{tab_id_prefix}-chat-stream'),
+            dcc.Interval(id=f'{tab_id_prefix}-chat-poll', interval=CHAT_POLL_INTERVAL_MS, disabled=True),
             dbc.InputGroup([
                 dbc.Input(id=f'{tab_id_prefix}-chat-input',
                           placeholder="Pregúntale algo a la IA..."),
@@ -53,20 +59,6 @@ def add_trendline(fig, df, x_col, y_col):
     return fig
 
 
-def generate_wordcloud(text):
-    if not text or not isinstance(text, str) or not text.strip():
-        return ""
-    try:
-        wc = WordCloud(width=800, height=400, background_color='white',
-                       max_words=100).generate(text)
-        img = io.BytesIO()
-        wc.to_image().save(img, format='PNG')
-        img.seek(0)
-        return f"data:image/png;base64,{base64.b64encode(img.getvalue()).decode()}"
-    except Exception as e:
-        logging.error(f"Error generando wordcloud: {e}")
-        return ""
-
 # ---------- Layout Operaciones y Ventas ----------
 def create_ops_sales_layout():
     ai_style = {"marginTop": "20px", "marginBottom": "20px"}
@@ -85,6 +77,8 @@ def create_ops_sales_layout():
             },
             multiple=True
         ),
+        # Clave del dataset procesado en el servidor (ver ops_datasets)
+        dcc.Store(id='ops-dataset-key'),
         dbc.Container(id='output-kpis', fluid=True, className="mb-4"),
 
         # ---------- Filtros ----------
@@ -109,9 +103,19 @@ def create_ops_sales_layout():
         ], style={'margin-bottom': '30px'}),
 
         # ---------- Pestañas ----------
-        dcc.Tabs([
+        # Firma del último render de cada pestaña (evita recalcular / reenviar)
+        *[dcc.Store(id=f'ops-sig-{tab}') for tab in ('ops_comparativo', 'ops_destinos', 'ops_operadores',
+                                                     'ops_avanzado', 'ops_tabla')],
+        # Firma de los insights IA por pestaña ya abierta (ver update_ops_insights)
+        dcc.Store(id='ops-sig-insights'),
+        # Petición / texto del insight IA de cada pestaña (ver ai_insights)
+        *[dcc.Store(id=f'{card}-data') for card in ('ai-insight-comparativo-general',
+                                                    'ai-insight-vuelos-destinos',
+                                                    'ai-insight-operadores-aeronaves',
+                                                    'ai-insight-analisis-avanzado')],
+        dcc.Tabs(id='ops-tabs', value='ops_comparativo', children=[
             # ---- 1. Comparativo General ----
-            dcc.Tab(label='Comparativo General', children=[
+            dcc.Tab(label='Comparativo General', value='ops_comparativo', children=[
                 html.H3("Comparativo por Mes"),
                 dcc.Graph(id='vuelos-mes'),
                 dcc.Graph(id='ingresos-mes'),
@@ -131,7 +135,7 @@ def create_ops_sales_layout():
             ]),
 
             # ---- 2. Vuelos y Destinos ----
-            dcc.Tab(label='Vuelos y Destinos', children=[
+            dcc.Tab(label='Vuelos y Destinos', value='ops_destinos', children=[
                 html.H3("Top Destinos por Número de Vuelos (descendente)"),
                 dcc.Graph(id='top-destinos-vuelos'),
                 html.H3("Top Destinos por Ganancia (descendente)"),
@@ -143,7 +147,7 @@ def create_ops_sales_layout():
             ]),
 
             # ---- 3. Operadores y Aeronaves ----
-            dcc.Tab(label='Operadores y Aeronaves', children=[
+            dcc.Tab(label='Operadores y Aeronaves', value='ops_operadores', children=[
                 html.H3("Vuelos por Operador (ordenado de mayor a menor)"),
                 dcc.Graph(id='vuelos-operador'),
                 html.H3("Ganancia por Aeronave (ordenado de mayor a menor)"),
@@ -164,7 +168,7 @@ def create_ops_sales_layout():
             ]),
 
             # ---- 4. Análisis Avanzado ----
-            dcc.Tab(label='Análisis Avanzado', children=[
+            dcc.Tab(label='Análisis Avanzado', value='ops_avanzado', children=[
                 html.Div([
                     html.Label("Selecciona Destino para Heatmap:"),
                     dcc.Dropdown(id='destino-heatmap',
@@ -184,9 +188,9 @@ def create_ops_sales_layout():
             ]),
 
             # ---- 5. Tabla Detallada ----
-            dcc.Tab(label='Tabla Detallada', children=[
-                dash_table.DataTable(id='tabla-detallada', page_size=15,
-                                     style_table={'overflowX': 'auto'})
+            dcc.Tab(label='Tabla Detallada', value='ops_tabla', children=[
+                # server_table: paginación / orden / filtro en el servidor
+                html.Div(id='tabla-detallada')
             ])
         ]),
 
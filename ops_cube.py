@@ -0,0 +1,143 @@
+# ops_cube.py
+# -------------------------------------------------
+# Cubo de agregación de Operaciones y Ventas.
+# Por dataset se agrupa UNA vez al grano
+#   (Año, Mes, mes, semana, Destino, Operador, Aeronave, Tipo de aeronave)
+# con conteo de vuelos y sumas de ingresos, ganancia y pasajeros. Los
+# filtros son cortes del cubo y cada gráfico un roll-up sobre ese corte,
+# en lugar de un `groupby` completo sobre las filas originales.
+#
+# Día de la semana y hora no forman parte del grano: junto con la semana
+# fijan la celda a una franja horaria concreta y el cubo deja de comprimir
+# (≈ una celda por vuelo). Los heatmaps día × hora, cuando existan,
+# deberían ir en un segundo cubo sin la semana.
+# -------------------------------------------------
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import ops_datasets
+from ops_ingest import DATE_COLUMN
+
+DIMENSIONS = ["Año", "Mes", "month", "week", "Destino", "Operador", "Aeronave",
+              "Tipo de aeronave"]
+CATEGORY_DIMENSIONS = ["Año", "Mes", "Destino", "Operador", "Aeronave", "Tipo de aeronave"]
+SUM_MEASURES = ["Monto total a cobrar", "Ganancia", "Número de pasajeros"]
+COUNT_MEASURE = "Vuelos"
+MEASURES = [COUNT_MEASURE] + SUM_MEASURES
+
+CUBE_SLOTS = 4     # cubos en memoria (uno por dataset reciente)
+SLICE_SLOTS = 16   # cortes filtrados recientes
+
+_cubes: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_slices: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _put(cache: OrderedDict, key, value, slots: int) -> None:
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > slots:
+            cache.popitem(last=False)
+
+
+def _get(cache: OrderedDict, key):
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+# -------------------------------------------------
+# 1 · Construcción
+# -------------------------------------------------
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrupa las filas limpias de operaciones al grano de DIMENSIONS."""
+    ts = df[DATE_COLUMN]
+    day = ts.dt.normalize()
+    base = pd.DataFrame({
+        **{c: df[c].astype("category") for c in CATEGORY_DIMENSIONS},
+        "month": day - pd.to_timedelta(ts.dt.day - 1, unit="D"),
+        # misma etiqueta que resample('W'): el domingo que cierra la semana
+        "week": day + pd.to_timedelta(6 - ts.dt.dayofweek, unit="D"),
+        **{m: df[m] for m in SUM_MEASURES},
+    })
+    # dropna=False: las filas sin fecha o sin destino siguen contando en los totales
+    grouped = base.groupby(DIMENSIONS, observed=True, dropna=False, sort=False)
+    cube = grouped[SUM_MEASURES].sum()
+    cube.insert(0, COUNT_MEASURE, grouped.size())
+    cube = cube.reset_index()
+    for c in CATEGORY_DIMENSIONS:
+        cube[c] = cube[c].astype("category")
+    return cube
+
+
+def get_cube(key: str | None) -> pd.DataFrame | None:
+    """Cubo del dataset `key` (se construye la primera vez que se pide)."""
+    cube = _get(_cubes, key)
+    if cube is not None:
+        return cube
+    df = ops_datasets.get_dataset(key)
+    if df is None:
+        return None
+    t0 = time.perf_counter()
+    cube = build_cube(df)
+    logging.info(f"Cubo de operaciones {key[:8]}: {len(df):,} filas → {len(cube):,} celdas "
+                 f"en {time.perf_counter() - t0:.2f}s")
+    _put(_cubes, key, cube, CUBE_SLOTS)
+    return cube
+
+
+# -------------------------------------------------
+# 2 · Cortes por filtro
+# -------------------------------------------------
+def _isin(col: pd.Series, values: list[str]) -> np.ndarray:
+    """`col.astype(str).isin(values)` evaluado sobre las categorías, no sobre cada celda."""
+    allowed = np.append(col.cat.categories.astype(str).isin(values), "nan" in values)
+    return allowed[col.cat.codes.to_numpy()]  # código -1 (NaN) → última posición
+
+
+def get_slice(key: str | None, destinos=None, operadores=None, meses=None) -> pd.DataFrame | None:
+    """
+    Celdas del cubo que cumplen los filtros de Destino / Operador / Mes,
+    cacheadas por la misma firma que `ops_datasets.get_filtered`.
+    """
+    sig = ops_datasets.filter_signature(key, destinos, operadores, meses)
+    cache_key = (sig[0], *map(tuple, sig[1:]))
+    hit = _get(_slices, cache_key)
+    if hit is not None:
+        return hit
+
+    cube = get_cube(key)
+    if cube is None:
+        return None
+    mask = np.ones(len(cube), dtype=bool)
+    for col, values in (("Destino", sig[1]), ("Operador", sig[2]), ("Mes", sig[3])):
+        if values:
+            mask &= _isin(cube[col], values)
+    if mask.all():
+        out = cube
+    else:
+        # sin categorías vacías: los roll-ups con observed=False no muestran lo filtrado
+        out = cube[mask].reset_index(drop=True)
+        for c in CATEGORY_DIMENSIONS:
+            out[c] = out[c].cat.remove_unused_categories()
+    _put(_slices, cache_key, out, SLICE_SLOTS)
+    return out
+
+
+# -------------------------------------------------
+# 3 · Roll-ups
+# -------------------------------------------------
+def rollup(cube: pd.DataFrame, by: list[str] | str, measures: list[str] | None = None,
+           observed: bool = True) -> pd.DataFrame:
+    """Suma de `measures` (por defecto todas) agrupando el corte por `by`."""
+    by = [by] if isinstance(by, str) else by
+    measures = measures or MEASURES
+    return cube.groupby(by, observed=observed)[measures].sum().reset_index()
@@ -0,0 +1,149 @@
+# ops_datasets.py
+# -------------------------------------------------
+# Datasets de Operaciones y Ventas subidos por el usuario.
+# Cada carga se decodifica, valida y limpia UNA sola vez; el resultado se
+# guarda en el servidor (memoria + Parquet en disco) bajo una clave que es
+# el hash de los archivos. El navegador sólo conserva esa clave, así que
+# cambiar un filtro ya no reenvía ni vuelve a parsear los CSV.
+# -------------------------------------------------
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import OPS_DATASET_DIR
+from ops_ingest import ingest_uploads
+
+MEMORY_SLOTS = 4  # datasets recientes que se mantienen en memoria
+
+_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def dataset_key(contents: list[str], filenames: list[str]) -> str:
+    """Hash estable del conjunto de archivos (nombre + contenido)."""
+    h = hashlib.sha256()
+    for content, fname in sorted(zip(contents, filenames), key=lambda cf: cf[1]):
+        h.update(fname.encode("utf-8"))
+        h.update(b"\0")
+        h.update(content.encode("ascii", "ignore"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+def _path_for(key: str) -> str:
+    return os.path.join(OPS_DATASET_DIR, f"{key}.parquet")
+
+
+def _remember(key: str, df: pd.DataFrame) -> None:
+    with _lock:
+        _cache[key] = df
+        _cache.move_to_end(key)
+        while len(_cache) > MEMORY_SLOTS:
+            _cache.popitem(last=False)
+
+
+def _persist(key: str, df: pd.DataFrame) -> None:
+    try:
+        os.makedirs(OPS_DATASET_DIR, exist_ok=True)
+        tmp = f"{_path_for(key)}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp, engine="pyarrow", index=False)
+        os.replace(tmp, _path_for(key))
+    except Exception as e:  # columnas con tipos mezclados, disco lleno...
+        logging.warning(f"Dataset {key[:8]} sólo en memoria (no se pudo guardar Parquet): {e}")
+
+
+def register_upload(contents: list[str], filenames: list[str]) -> tuple[str | None, str | None]:
+    """
+    Procesa una carga y devuelve `(clave, error)`. Si esos mismos archivos ya
+    se procesaron (en memoria o en disco) no se vuelven a parsear.
+    """
+    if not contents or not filenames:
+        return None, "No files uploaded or empty content."
+    key = dataset_key(contents, filenames)
+    if get_dataset(key) is not None:
+        return key, None
+
+    df, err, reports = ingest_uploads(contents, filenames)
+    if err:
+        return None, err
+    if df.empty:
+        return None, "No data to display after processing files."
+    df.attrs["dataset_key"] = key  # se propaga a los filtrados (server_table lo usa como clave)
+    _remember(key, df)
+    _persist(key, df)
+    parse_s = sum(r.seconds for r in reports)
+    logging.info(f"Dataset de operaciones {key[:8]} registrado ({len(df):,} filas, "
+                 f"{len(filenames)} archivos, parseo {parse_s:.2f}s)")
+    return key, None
+
+
+def get_dataset(key: str | None) -> pd.DataFrame | None:
+    """DataFrame limpio de `key` (compartido: no mutarlo in-place) o None si no existe."""
+    if not key or not _KEY_RE.match(key):
+        return None
+    with _lock:
+        df = _cache.get(key)
+        if df is not None:
+            _cache.move_to_end(key)
+            return df
+    path = _path_for(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path, engine="pyarrow")
+    except Exception as e:
+        logging.error(f"No se pudo leer el dataset {key[:8]}: {e}")
+        return None
+    df.attrs["dataset_key"] = key
+    _remember(key, df)
+    return df
+
+
+# -------------------------------------------------
+# Vista filtrada compartida por los callbacks de cada pestaña
+# -------------------------------------------------
+FILTER_SLOTS = 16
+
+_filtered: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+
+def filter_signature(key: str | None, destinos=None, operadores=None, meses=None) -> list:
+    """Firma JSON-serializable de (dataset, filtros); el orden de selección no importa."""
+    return [key, sorted(map(str, destinos or [])), sorted(map(str, operadores or [])),
+            sorted(map(str, meses or []))]
+
+
+def get_filtered(key: str | None, destinos=None, operadores=None, meses=None) -> pd.DataFrame | None:
+    """
+    Dataset `key` con los filtros de Destino / Operador / Mes aplicados.
+    Se cachea por firma: las pestañas que comparten filtros no repiten el filtrado.
+    """
+    sig = filter_signature(key, destinos, operadores, meses)
+    cache_key = (sig[0], *map(tuple, sig[1:]))
+    with _lock:
+        hit = _filtered.get(cache_key)
+        if hit is not None:
+            _filtered.move_to_end(cache_key)
+            return hit
+
+    df = get_dataset(key)
+    if df is None:
+        return None
+    mask = pd.Series(True, index=df.index)
+    for col, values in (("Destino", sig[1]), ("Operador", sig[2]), ("Mes", sig[3])):
+        if values:
+            mask &= df[col].astype(str).isin(values)
+    out = df if mask.all() else df[mask]
+
+    with _lock:
+        _filtered[cache_key] = out
+        while len(_filtered) > FILTER_SLOTS:
+            _filtered.popitem(last=False)
+    return out
@@ -0,0 +1,240 @@
+# server_table.py
+# -------------------------------------------------
+# DataTable paginada, ordenada y filtrada en el servidor.
+# El DataFrame completo se queda en memoria del servidor (LRU por token)
+# y al navegador sólo viaja la página visible. La tabla se identifica con
+# un id de patrón {'type': 'server-table', 'index': <token>}, así un solo
+# callback (MATCH) atiende todas las tablas de la app.
+# Para cada columna ordenada se guarda su rango y su permutación
+# (argsort) la primera vez; los cambios de página siguientes sólo la recorren.
+# -------------------------------------------------
+import hashlib
+import logging
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from dash import MATCH, Input, Output, State, ctx, dash_table, no_update
+from dash.exceptions import PreventUpdate
+
+TABLE_TYPE = "server-table"
+TABLE_SLOTS = 32          # tablas recientes en memoria
+DEFAULT_PAGE_SIZE = 15
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+_tables: "OrderedDict[str, _TableState]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class _TableState:
+    """DataFrame de una tabla y las permutaciones de orden ya calculadas."""
+
+    def __init__(self, df: pd.DataFrame, date_format: str):
+        self.df = df.reset_index(drop=True)
+        self.date_format = date_format
+        self._orders: dict[tuple[str, bool], np.ndarray] = {}
+        self._ranks: dict[tuple[str, bool], np.ndarray] = {}
+        self._order_lock = threading.Lock()
+
+    def order(self, column: str, descending: bool = False) -> np.ndarray:
+        """Índices de filas ordenadas por `column` (NaN siempre al final), cacheados."""
+        with self._order_lock:
+            idx = self._orders.get((column, descending))
+            if idx is None:
+                idx = np.argsort(self._rank(column, descending), kind="stable")
+                self._orders[(column, descending)] = idx
+            return idx
+
+    def rank(self, column: str, descending: bool = False) -> np.ndarray:
+        """Rango denso de cada fila (empates con el mismo valor) para ordenar por varias columnas."""
+        with self._order_lock:
+            return self._rank(column, descending)
+
+    def _rank(self, column: str, descending: bool) -> np.ndarray:
+        ranks = self._ranks.get((column, descending))
+        if ranks is None:
+            col = self.df[column]
+            try:
+                codes, uniques = pd.factorize(col, sort=True)  # código = rango denso; NaN → -1
+            except TypeError:  # columna object con tipos mezclados
+                codes, uniques = pd.factorize(col.astype(str).where(col.notna()), sort=True)
+            top = len(uniques)
+            ranks = (top - 1 - codes) if descending else codes.copy()
+            ranks[codes < 0] = top  # NaN siempre al final
+            self._ranks[(column, descending)] = ranks
+        return ranks
+
+
+def _token(df: pd.DataFrame, key: str | None) -> str:
+    h = hashlib.sha1()
+    if key is not None:
+        h.update(str(key).encode("utf-8"))
+    else:
+        try:
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        except TypeError:  # celdas no hasheables (listas, dicts): token de un solo uso
+            h.update(uuid.uuid4().bytes)
+    h.update("\0".join(map(str, df.columns)).encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+def _remember(token: str, state: _TableState) -> None:
+    with _lock:
+        _tables[token] = state
+        _tables.move_to_end(token)
+        while len(_tables) > TABLE_SLOTS:
+            _tables.popitem(last=False)
+
+
+def _lookup(token: str) -> _TableState | None:
+    with _lock:
+        state = _tables.get(token)
+        if state is not None:
+            _tables.move_to_end(token)
+        return state
+
+
+# -------------------------------------------------
+# 1 · Filtros (sintaxis de filter_query de DataTable)
+# -------------------------------------------------
+# valor: entre comillas (con escapes) o una sola palabra; así una parte con
+# `||`, paréntesis u otra cláusula no encaja y se ignora en vez de tomarse como valor
+_FILTER_PART_RE = re.compile(
+    r"^\{(?P<col>[^}]+)\}\s+(?P<op>[is]?(?:contains|datestartswith|eq|ne|lt|le|gt|ge)|[<>!]?=|[<>])\s+"
+    r"(?P<value>\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|`(?:[^`\\]|\\.)*`|[^\s\"'`]+)$"
+)
+_SYMBOLS = {"=": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+
+
+def _parse_value(raw: str):
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'`":
+        return re.sub(r"\\(.)", r"\1", raw[1:-1])
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def _filter_mask(df: pd.DataFrame, filter_query: str) -> np.ndarray:
+    """Máscara de filas que cumplen `filter_query` ('{col} op valor && …'); partes inválidas se ignoran."""
+    mask = np.ones(len(df), dtype=bool)
+    for part in filter_query.split(" && "):
+        m = _FILTER_PART_RE.match(part.strip())
+        if not m or m["col"] not in df.columns:
+            logging.info(f"server_table: parte de filtro no soportada, se ignora: {part.strip()!r}")
+            continue
+        col, op, value = df[m["col"]], _SYMBOLS.get(m["op"], m["op"]), _parse_value(m["value"])
+        case_insensitive = op[0] == "i"
+        if op[0] in "is":  # icontains / scontains …: sensibilidad a mayúsculas explícita
+            op = op[1:]
+        if op in ("contains", "datestartswith"):
+            text = col.astype(str)
+            if op == "datestartswith":
+                hit = text.str.startswith(str(value))
+            else:
+                hit = text.str.contains(str(value), case=not case_insensitive, regex=False)
+        else:
+            target = col
+            if isinstance(value, float) and not pd.api.types.is_numeric_dtype(col):
+                target = pd.to_numeric(col, errors="coerce")
+            elif isinstance(value, str) and pd.api.types.is_numeric_dtype(col):
+                value = pd.to_numeric(value, errors="coerce")
+            if case_insensitive and isinstance(value, str):
+                target, value = target.astype(str).str.lower(), value.lower()
+            hit = {"eq": target.__eq__, "ne": target.__ne__, "lt": target.__lt__,
+                   "le": target.__le__, "gt": target.__gt__, "ge": target.__ge__}[op](value)
+        mask &= hit.fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+# -------------------------------------------------
+# 2 · Página
+# -------------------------------------------------
+def _page(state: _TableState, page_current: int, page_size: int,
+          sort_by: list[dict] | None, filter_query: str | None) -> tuple[list[dict], int]:
+    df = state.df
+    rows = np.arange(len(df))
+    keys = [spec for spec in (sort_by or []) if spec.get("column_id") in df.columns]
+    if len(keys) == 1:
+        rows = state.order(keys[0]["column_id"], keys[0].get("direction") == "desc")
+    elif keys:
+        # np.lexsort toma la última clave como principal
+        rows = np.lexsort([state.rank(spec["column_id"], spec.get("direction") == "desc")
+                           for spec in reversed(keys)])
+    if filter_query:
+        rows = rows[_filter_mask(df, filter_query)[rows]]
+
+    page_count = max(1, -(-len(rows) // page_size))
+    start = min(page_current, page_count - 1) * page_size
+    page = df.iloc[rows[start:start + page_size]].copy()
+    for col in page.columns:
+        if pd.api.types.is_datetime64_any_dtype(page[col]):
+            page[col] = page[col].dt.strftime(state.date_format)
+    return page.to_dict("records"), page_count
+
+
+# -------------------------------------------------
+# 3 · Componente y callback
+# -------------------------------------------------
+def server_table(df: pd.DataFrame, columns: list[dict] | None = None, *, key: str | None = None,
+                 page_size: int = DEFAULT_PAGE_SIZE, filterable: bool = True,
+                 date_format: str = DATE_FORMAT, **table_kwargs) -> dash_table.DataTable:
+    """
+    DataTable de `df` con paginación, orden y filtro en el servidor.
+    `key` identifica el contenido (p.ej. la firma de filtros); sin `key` se
+    usa un hash del DataFrame. El resto de argumentos van a la DataTable.
+    """
+    token = _token(df, key)
+    state = _lookup(token)
+    if state is None:
+        state = _TableState(df, date_format)
+        _remember(token, state)
+    data, page_count = _page(state, 0, page_size, None, None)
+    return dash_table.DataTable(
+        id={"type": TABLE_TYPE, "index": token},
+        data=data,
+        columns=columns or [{"name": c, "id": c} for c in df.columns],
+        page_current=0,
+        page_size=page_size,
+        page_count=page_count,
+        page_action="custom",
+        sort_action="custom",
+        sort_mode="multi",
+        sort_by=[],
+        filter_action="custom" if filterable else "none",
+        filter_query="",
+        **table_kwargs,
+    )
+
+
+def register_server_table_callbacks(app) -> None:
+    """Un callback por patrón para todas las tablas creadas con `server_table`."""
+
+    @app.callback(
+        Output({"type": TABLE_TYPE, "index": MATCH}, "data"),
+        Output({"type": TABLE_TYPE, "index": MATCH}, "page_count"),
+        Output({"type": TABLE_TYPE, "index": MATCH}, "page_current"),
+        Input({"type": TABLE_TYPE, "index": MATCH}, "page_current"),
+        Input({"type": TABLE_TYPE, "index": MATCH}, "page_size"),
+        Input({"type": TABLE_TYPE, "index": MATCH}, "sort_by"),
+        Input({"type": TABLE_TYPE, "index": MATCH}, "filter_query"),
+        State({"type": TABLE_TYPE, "index": MATCH}, "id"),
+        prevent_initial_call=True,
+    )
+    def update_server_table(page_current, page_size, sort_by, filter_query, table_id):
+        state = _lookup(table_id["index"])
+        if state is None:
+            # expulsada de la LRU o servidor reiniciado: la vista que la creó la vuelve a registrar
+            logging.warning(f"Tabla {table_id['index'][:8]} ya no está en memoria; recarga la vista.")
+            raise PreventUpdate
+        # ordenar o filtrar vuelve a la primera página
+        reset = ctx.triggered_prop_ids and any(
+            p.endswith((".sort_by", ".filter_query")) for p in ctx.triggered_prop_ids)
+        page_current = 0 if reset else (page_current or 0)
+        data, page_count = _page(state, page_current, page_size or DEFAULT_PAGE_SIZE,
+                                 sort_by, filter_query)
+        return data, page_count, 0 if reset else no_update
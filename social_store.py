@@ -0,0 +1,309 @@
+# social_store.py
+# -------------------------------------------------
+# Almacén local (SQLite) de publicaciones de Facebook / Instagram y de sus
+# últimos insights. Se sincroniza de forma incremental con la Graph API:
+#   · posts nuevos  → `since` a partir del más reciente guardado
+#   · rangos viejos → backfill sólo de lo que aún no está cubierto
+#   · insights      → sólo se refrescan los posts más jóvenes que la
+#                     ventana de madurez (los viejos ya no cambian); si la
+#                     descarga falla quedan pendientes y se reintentan
+# Las descargas se hacen fuera de las transacciones: la escritura en
+# SQLite sólo bloquea mientras se guardan los resultados.
+# Las pestañas sociales leen de aquí en milisegundos.
+# -------------------------------------------------
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import (
+    SOCIAL_STORE_PATH,
+    SOCIAL_INSIGHTS_MATURITY_DAYS,
+    SOCIAL_SYNC_INTERVAL_SECONDS,
+)
+from data_processing import (
+    GraphAPIError,
+    _parse_graph_time,
+    get_facebook_posts,
+    get_instagram_posts,
+    fetch_facebook_insights,
+    fetch_instagram_insights,
+)
+
+_PLATFORMS = {
+    # plataforma: (descarga de posts, descarga de insights, campo de fecha)
+    "facebook": (get_facebook_posts, fetch_facebook_insights, "created_time"),
+    "instagram": (get_instagram_posts, fetch_instagram_insights, "timestamp"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    platform     TEXT NOT NULL,
+    account_id   TEXT NOT NULL,
+    id           TEXT NOT NULL,
+    created_at   TEXT NOT NULL,      -- UTC 'YYYY-MM-DD HH:MM:SS'
+    payload      TEXT NOT NULL,      -- JSON tal cual lo devuelve la Graph API
+    insights     TEXT,               -- JSON {"data": [...]}; NULL = pendiente
+    insights_at  REAL,               -- epoch de la última descarga de insights
+    PRIMARY KEY (platform, id)
+);
+CREATE INDEX IF NOT EXISTS idx_posts_account_created
+    ON posts (platform, account_id, created_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    platform    TEXT NOT NULL,
+    account_id  TEXT NOT NULL,
+    covered_from TEXT,               -- fecha desde la que el historial está completo ('' = todo)
+    newest      TEXT,
+    synced_at   REAL,
+    PRIMARY KEY (platform, account_id)
+);
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    platform    TEXT NOT NULL,
+    account_id  TEXT NOT NULL,
+    metric      TEXT NOT NULL,
+    date        TEXT NOT NULL,       -- 'YYYY-MM-DD'
+    value       REAL,                -- NULL = la API no devolvió dato ese día
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (platform, account_id, metric, date)
+);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+_sync_locks: dict[tuple[str, str], threading.Lock] = {}
+
+
+# -------------------------------------------------
+# 1 · Conexión
+# -------------------------------------------------
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = sqlite3.connect(SOCIAL_STORE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+    return conn
+
+
+def _fmt(ts) -> str:
+    return pd.Timestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sync_lock(platform: str, account_id: str) -> threading.Lock:
+    with _init_lock:
+        return _sync_locks.setdefault((platform, account_id), threading.Lock())
+
+
+# -------------------------------------------------
+# 2 · Escritura
+# -------------------------------------------------
+def _upsert_posts(conn, platform: str, account_id: str, posts: list[dict], time_field: str) -> None:
+    rows = [
+        (platform, account_id, str(p["id"]), _fmt(_parse_graph_time(p[time_field])),
+         json.dumps({k: v for k, v in p.items() if k != "insights"}))
+        for p in posts if p.get("id") and p.get(time_field)
+    ]
+    # el payload se reemplaza (likes/comentarios al día); los insights se conservan
+    conn.executemany(
+        """INSERT INTO posts (platform, account_id, id, created_at, payload)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (platform, id) DO UPDATE SET payload = excluded.payload,
+                                                    created_at = excluded.created_at""",
+        rows,
+    )
+
+
+def _fetch_insights(conn, platform: str, account_id: str) -> list[dict]:
+    """
+    Descarga (fuera de transacción) los insights de los posts sin insights
+    o aún 'jóvenes'. Devuelve sólo los posts cuya descarga salió bien.
+    """
+    _, fetch_insights, _ = _PLATFORMS[platform]
+    maturity_cutoff = _fmt(datetime.utcnow() - timedelta(days=SOCIAL_INSIGHTS_MATURITY_DAYS))
+    rows = conn.execute(
+        """SELECT id, payload FROM posts
+           WHERE platform = ? AND account_id = ?
+             AND (insights IS NULL OR (created_at >= ? AND insights_at < ?))""",
+        (platform, account_id, maturity_cutoff, time.time() - SOCIAL_SYNC_INTERVAL_SECONDS),
+    ).fetchall()
+    if not rows:
+        return []
+    posts = fetch_insights([json.loads(r["payload"]) for r in rows])
+    ok = [p for p in posts if p.get("insights") is not None]
+    if len(ok) < len(posts):
+        # los fallidos conservan lo que tenían (o NULL) y se reintentan en la próxima sincronización
+        logging.warning(f"social_store: insights de {len(posts) - len(ok)}/{len(posts)} "
+                        f"posts de {platform} pendientes")
+    return ok
+
+
+def _save_insights(conn, platform: str, posts: list[dict]) -> None:
+    now = time.time()
+    conn.executemany(
+        "UPDATE posts SET insights = ?, insights_at = ? WHERE platform = ? AND id = ?",
+        [(json.dumps(p["insights"]), now, platform, str(p["id"])) for p in posts],
+    )
+
+
+# -------------------------------------------------
+# 3 · Sincronización incremental
+# -------------------------------------------------
+def sync(platform: str, account_id: str, since: datetime | None = None, force: bool = False) -> None:
+    """
+    Trae de la Graph API lo que falte para cubrir [since, ahora]:
+    posts nuevos (y los aún jóvenes, para refrescar likes/comentarios),
+    backfill si `since` es anterior a lo cubierto, e insights pendientes.
+    """
+    fetch_posts, _, time_field = _PLATFORMS[platform]
+    since_s = _fmt(since) if since is not None else ""
+
+    with _sync_lock(platform, account_id):
+        conn = _connect()
+        try:
+            state = conn.execute(
+                "SELECT covered_from, newest, synced_at FROM sync_state WHERE platform = ? AND account_id = ?",
+                (platform, account_id),
+            ).fetchone()
+            covered = state is not None and state["covered_from"] is not None and state["covered_from"] <= since_s
+            fresh = state is not None and time.time() - (state["synced_at"] or 0) < SOCIAL_SYNC_INTERVAL_SECONDS
+            if covered and fresh and not force:
+                return
+
+            t0 = time.perf_counter()
+            fetched = []
+            if state is None or state["covered_from"] is None:
+                # primera sincronización: todo el rango pedido
+                fetched = fetch_posts(account_id, since=since, with_insights=False, strict=True)
+                covered_from = since_s
+            else:
+                covered_from = state["covered_from"]
+                if not fresh or force:
+                    young = datetime.utcnow() - timedelta(days=SOCIAL_INSIGHTS_MATURITY_DAYS)
+                    newest = pd.Timestamp(state["newest"]).to_pydatetime() if state["newest"] else young
+                    incr_since = max(min(newest, young), pd.Timestamp(covered_from).to_pydatetime()) \
+                        if covered_from else min(newest, young)
+                    fetched += fetch_posts(account_id, since=incr_since, with_insights=False, strict=True)
+                if not covered:
+                    # backfill del tramo [since, covered_from)
+                    fetched += fetch_posts(account_id, since=since,
+                                           until=pd.Timestamp(covered_from).to_pydatetime() if covered_from else None,
+                                           with_insights=False, strict=True)
+                    covered_from = since_s
+
+            with conn:
+                _upsert_posts(conn, platform, account_id, fetched, time_field)
+            insights = _fetch_insights(conn, platform, account_id)
+            with conn:
+                _save_insights(conn, platform, insights)
+                newest = conn.execute(
+                    "SELECT MAX(created_at) FROM posts WHERE platform = ? AND account_id = ?",
+                    (platform, account_id),
+                ).fetchone()[0]
+                conn.execute(
+                    """INSERT INTO sync_state (platform, account_id, covered_from, newest, synced_at)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (platform, account_id) DO UPDATE SET
+                           covered_from = excluded.covered_from, newest = excluded.newest,
+                           synced_at = excluded.synced_at""",
+                    (platform, account_id, covered_from, newest, time.time()),
+                )
+            logging.info(f"social_store: {platform} sincronizado ({len(fetched)} posts, "
+                         f"{len(insights)} insights) en {time.perf_counter() - t0:.1f}s")
+        except GraphAPIError as e:
+            # no se marca como cubierto: el próximo acceso reintenta
+            logging.error(f"social_store: sincronización de {platform} fallida, se usan datos locales: {e}")
+        finally:
+            conn.close()
+
+
+# -------------------------------------------------
+# 4 · Lectura
+# -------------------------------------------------
+def load_posts(platform: str, account_id: str, since: datetime | None = None,
+               until: datetime | None = None) -> list[dict]:
+    """Posts guardados en el rango (más nuevos primero), con la forma de la Graph API."""
+    query = "SELECT payload, insights FROM posts WHERE platform = ? AND account_id = ?"
+    args: list = [platform, account_id]
+    if since is not None:
+        query += " AND created_at >= ?"
+        args.append(_fmt(since))
+    if until is not None:
+        query += " AND created_at < ?"
+        args.append(_fmt(pd.Timestamp(until) + timedelta(days=1)))
+    query += " ORDER BY created_at DESC"
+
+    conn = _connect()
+    try:
+        rows = conn.execute(query, args).fetchall()
+    finally:
+        conn.close()
+    posts = []
+    for r in rows:
+        post = json.loads(r["payload"])
+        post["insights"] = json.loads(r["insights"]) if r["insights"] else {"data": []}
+        posts.append(post)
+    return posts
+
+
+def find_post(platform: str, post_id: str) -> dict | None:
+    """Payload guardado de un post concreto (sin insights) o None."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT payload FROM posts WHERE platform = ? AND id = ?",
+                           (platform, str(post_id))).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row["payload"]) if row else None
+
+
+def get_posts(platform: str, account_id: str, since: datetime | None = None,
+              until: datetime | None = None) -> list[dict]:
+    """Sincroniza lo necesario y devuelve los posts del rango desde el almacén local."""
+    if not account_id:
+        return []
+    sync(platform, account_id, since)
+    return load_posts(platform, account_id, since, until)
+
+
+# -------------------------------------------------
+# 5 · Series diarias (seguidores, etc.)
+# -------------------------------------------------
+def load_daily_metric(platform: str, account_id: str, metric: str,
+                      since: str, until: str) -> dict[str, tuple[float | None, float]]:
+    """{fecha: (valor, fetched_at)} guardados para la métrica en [since, until]."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            """SELECT date, value, fetched_at FROM daily_metrics
+               WHERE platform = ? AND account_id = ? AND metric = ? AND date BETWEEN ? AND ?""",
+            (platform, account_id, metric, since, until),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {r["date"]: (r["value"], r["fetched_at"]) for r in rows}
+
+
+def save_daily_metric(platform: str, account_id: str, metric: str,
+                      values: dict[str, float | None]) -> None:
+    """Inserta o reemplaza {fecha: valor} de la métrica."""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                """INSERT INTO daily_metrics (platform, account_id, metric, date, value, fetched_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (platform, account_id, metric, date) DO UPDATE SET
+                       value = excluded.value, fetched_at = excluded.fetched_at""",
+                [(platform, account_id, metric, d, v, now) for d, v in values.items()],
+            )
+    finally:
+        conn.close()
@@ -0,0 +1,66 @@
+# source_fetch.py
+# -------------------------------------------------
+# Descarga concurrente de fuentes independientes (GA4, Facebook,
+# Instagram...) para una misma vista. Cada fuente corre en su propio
+# hilo bajo un bucle asyncio con su propio timeout: si una tarda o falla,
+# sólo esa fuente queda degradada y el resto de la vista se pinta igual.
+# -------------------------------------------------
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from config import SOURCE_TIMEOUT_SECONDS
+
+MAX_WORKERS = 8
+
+# Pool propio (no el executor por defecto de asyncio): al vencer un timeout
+# no hay que esperar al hilo rezagado para cerrar el bucle. La descarga
+# sigue en segundo plano y deja calientes los cachés para la próxima vez.
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="source-fetch")
+
+
+@dataclass
+class SourceResult:
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _run_source(name: str, fn: Callable[[], Any], timeout: float) -> SourceResult:
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(loop.run_in_executor(_pool, fn), timeout)
+        return SourceResult(value=value, elapsed=time.perf_counter() - t0)
+    except asyncio.TimeoutError:
+        logging.error(f"Fuente '{name}' sin respuesta tras {timeout:g}s; se muestra degradada.")
+        return SourceResult(error=f"sin respuesta tras {timeout:g}s", elapsed=time.perf_counter() - t0)
+    except Exception as e:
+        logging.error(f"Fuente '{name}' falló: {e}")
+        return SourceResult(error=str(e) or type(e).__name__, elapsed=time.perf_counter() - t0)
+
+
+async def _gather(sources: dict[str, Callable[[], Any]], timeouts: dict[str, float]) -> dict[str, SourceResult]:
+    names = list(sources)
+    results = await asyncio.gather(*(
+        _run_source(n, sources[n], timeouts.get(n, SOURCE_TIMEOUT_SECONDS)) for n in names
+    ))
+    return dict(zip(names, results))
+
+
+def gather_sources(sources: dict[str, Callable[[], Any]],
+                   timeouts: dict[str, float] | None = None) -> dict[str, SourceResult]:
+    """
+    Ejecuta en paralelo `{nombre: función sin argumentos}` y devuelve
+    `{nombre: SourceResult}`. Nunca lanza: los errores y timeouts quedan
+    en `SourceResult.error`. Pensado para llamarse desde un callback de
+    Dash (hilo sin bucle asyncio en marcha).
+    """
+    return asyncio.run(_gather(sources, timeouts or {}))
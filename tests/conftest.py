@@ -0,0 +1,8 @@
+# tests/conftest.py
+# -------------------------------------------------
+# Los módulos de la app son planos en la raíz del repo.
+# -------------------------------------------------
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
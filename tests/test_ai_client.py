@@ -0,0 +1,142 @@
+# tests/test_ai_client.py
+# -------------------------------------------------
+# Breaker, huecos de concurrencia y métricas de ai_client compartidos
+# entre procesos (los trabajos de fondo de Dash corren en procesos aparte).
+# OpenAI se sustituye por un cliente falso: no hay red.
+# -------------------------------------------------
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import ai_client
+
+
+def _server_error():
+    request = httpx.Request("POST", "https://api.openai.test/v1/chat/completions")
+    return openai.InternalServerError("boom", response=httpx.Response(500, request=request), body=None)
+
+
+class FakeClient:
+    """chat.completions.create que responde con la lista `script` (excepciones o textos)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        if kwargs.get("stream"):
+            return iter([SimpleNamespace(usage=None, choices=[]) for _ in item])
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=item))])
+
+
+@pytest.fixture(autouse=True)
+def shared_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_CACHE_PATH", str(tmp_path / "ai.sqlite3"))
+    monkeypatch.setattr(ai_client, "_initialized", False)
+    monkeypatch.setattr(ai_client, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(ai_client, "AI_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(ai_client, "BACKOFF_BASE_SECONDS", 0.01)
+
+
+def _in_child(fn):
+    process = multiprocessing.get_context("fork").Process(target=fn)
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+
+def _fail_twice():
+    ai_client._record(False)
+    ai_client._record(False)
+
+
+def _hold_slot():
+    assert ai_client._acquire_slot(time.monotonic() + 0.1) is not None  # el proceso muere sin liberarlo
+
+
+def test_breaker_opened_in_another_process_short_circuits_here(monkeypatch):
+    _in_child(_fail_twice)
+    assert ai_client.get_metrics()["state"] == ai_client.OPEN
+
+    fake = FakeClient(["hola"])
+    monkeypatch.setattr(ai_client, "_client", fake)
+    with pytest.raises(ai_client.AIUnavailable):
+        ai_client.complete([], "gpt-test")
+    assert fake.calls == 0
+    assert ai_client.get_metrics()["short_circuited"] == 1
+
+
+def test_concurrency_slot_is_shared_and_expires(monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_client, "AI_TIMEOUT_SECONDS", 0.2)
+    _in_child(_hold_slot)
+    assert ai_client.get_metrics()["in_flight"] == 1
+    assert ai_client._acquire_slot(time.monotonic() + 0.05) is None
+
+    time.sleep(0.4)  # plazo del hueco vencido: el proceso que lo tenía ya no existe
+    assert ai_client._acquire_slot(time.monotonic() + 0.05) is not None
+
+
+def test_retry_then_success_is_counted(monkeypatch):
+    fake = FakeClient([_server_error(), "hola"])
+    monkeypatch.setattr(ai_client, "_client", fake)
+    response = ai_client.complete([], "gpt-test", deadline=5)
+    assert response.choices[0].message.content == "hola"
+
+    metrics = ai_client.get_metrics()
+    assert (metrics["requests"], metrics["retries"], metrics["errors"]) == (2, 1, 0)
+    assert (metrics["prompt_tokens"], metrics["completion_tokens"]) == (10, 5)
+    assert metrics["state"] == ai_client.CLOSED and metrics["in_flight"] == 0
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_BREAKER_COOLDOWN_SECONDS", 0.1)
+    fake = FakeClient([_server_error(), "hola"])
+    monkeypatch.setattr(ai_client, "_client", fake)
+    monkeypatch.setattr(ai_client, "AI_MAX_RETRIES", 0)
+    _fail_twice()
+
+    time.sleep(0.15)
+    with pytest.raises(openai.InternalServerError):
+        ai_client.complete([], "gpt-test")  # prueba fallida: vuelve a abrir
+    assert ai_client.get_metrics()["state"] == ai_client.OPEN
+
+    time.sleep(0.15)
+    ai_client.complete([], "gpt-test")
+    assert ai_client.get_metrics()["state"] == ai_client.CLOSED
+
+
+def test_stream_holds_its_slot_until_the_last_chunk(monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_client, "_client", FakeClient(["abc"]))
+    chunks = ai_client.stream([], "gpt-test")
+    next(chunks)
+    assert ai_client.get_metrics()["in_flight"] == 1
+    assert ai_client._acquire_slot(time.monotonic() + 0.05) is None
+
+    assert len(list(chunks)) == 2
+    assert ai_client.get_metrics()["in_flight"] == 0
+
+
+def test_local_saturation_does_not_open_the_breaker(monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_client, "_client", FakeClient(["hola"]))
+    held = ai_client._acquire_slot(time.monotonic() + 5)
+    for _ in range(ai_client.AI_BREAKER_FAILURES + 1):
+        with pytest.raises(ai_client.AIUnavailable, match="saturado"):
+            ai_client.complete([], "gpt-test", deadline=0.05)
+    metrics = ai_client.get_metrics()
+    assert (metrics["state"], metrics["consecutive_failures"], metrics["rejected"]) == (ai_client.CLOSED, 0, 3)
+
+    ai_client._release_slot(held)
+    assert ai_client.complete([], "gpt-test").choices[0].message.content == "hola"
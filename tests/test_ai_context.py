@@ -0,0 +1,18 @@
+# tests/test_ai_context.py
+# -------------------------------------------------
+# Serialización compacta de tablas para los prompts.
+# -------------------------------------------------
+import numpy as np
+import pandas as pd
+
+from ai_context import compact_table
+
+
+def test_integer_like_floats_lose_the_decimal():
+    df = pd.DataFrame({"Destino": ["CUN", "MTY"], "Vuelos": [3.0, 12.0], "Margen": [0.256, 0.5]})
+    assert compact_table(df) == "Destino,Vuelos,Margen\nCUN,3,0.26\nMTY,12,0.5"
+
+
+def test_infinite_ratios_do_not_break_the_table():
+    df = pd.DataFrame({"Operador": ["A", "B", "C"], "Ratio": [2.0, np.inf, -np.inf]})
+    assert compact_table(df).splitlines()[1:] == ["A,2.0", "B,inf", "C,-inf"]
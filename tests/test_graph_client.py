@@ -0,0 +1,107 @@
+# tests/test_graph_client.py
+# -------------------------------------------------
+# Paginación de la Graph API contra un transporte simulado (sin red).
+# -------------------------------------------------
+import json
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+
+import data_processing
+import graph_client
+
+PAGE_2 = graph_client.GRAPH_BASE_URL + "123/posts?limit=100&after=CURSOR2&access_token=TOKEN"
+
+
+def _posts(ids, day):
+    return [{"id": str(i), "created_time": f"2024-05-{day:02d}T12:00:00+0000"} for i in ids]
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    """Sustituye el cliente compartido; devuelve la lista de peticiones recibidas."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url)
+        if request.url.params.get("after") == "CURSOR2":
+            assert request.url.params.get("access_token") == "TOKEN"
+            return httpx.Response(200, json={"data": _posts(range(100, 150), 1)})
+        if request.url.path.endswith("/123/posts") and "fields" in request.url.params:
+            return httpx.Response(200, json={"data": _posts(range(100), 2), "paging": {"next": PAGE_2}})
+        return httpx.Response(400, json={"error": {"message": "unexpected", "code": 100}})
+
+    yield from _mock(monkeypatch, handler, seen)
+
+
+def _mock(monkeypatch, handler, seen):
+    client = httpx.Client(base_url=graph_client.GRAPH_BASE_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(graph_client, "_client", client)
+    monkeypatch.setattr(graph_client, "_pause_until", 0.0)
+    yield seen
+    client.close()
+
+
+def test_paginate_follows_absolute_next_url(graph):
+    posts = data_processing._fb_paginate("123/posts", {"fields": "id,created_time"},
+                                         "created_time", strict=True)
+    assert len(posts) == 150
+    assert len(graph) == 2
+    assert graph[1].params["after"] == "CURSOR2"
+
+
+def test_paginate_stops_at_since_without_fetching_next_page(graph):
+    posts = data_processing._fb_paginate("123/posts", {"fields": "id,created_time"}, "created_time",
+                                         since=datetime(2024, 5, 2, 13), strict=True)
+    assert len(posts) == 100
+    assert len(graph) == 1
+
+
+def test_paginate_with_since_tolerates_pages_without_time_field(graph):
+    posts = data_processing._fb_paginate("123/posts", {"fields": "id"}, "timestamp",
+                                         since=datetime(2024, 5, 2, 13), strict=True)
+    assert len(posts) == 150
+    assert len(graph) == 2
+
+
+def test_request_merges_params_into_absolute_url(graph):
+    body = graph_client.get_json(PAGE_2, {"fields": "id"})
+    assert len(body["data"]) == 50
+    assert graph[0].params["after"] == "CURSOR2"
+    assert graph[0].params["fields"] == "id"
+
+
+@pytest.fixture
+def throttled(monkeypatch):
+    """Meta responde pidiendo 10 minutos de espera (estimated_time_to_regain_access)."""
+    seen = []
+    usage = {"123": [{"type": "pages", "call_count": 100, "estimated_time_to_regain_access": 10}]}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url)
+        return httpx.Response(429, headers={"x-business-use-case-usage": json.dumps(usage)},
+                              json={"error": {"message": "limit", "code": 80001}})
+
+    yield from _mock(monkeypatch, handler, seen)
+
+
+def test_long_quota_wait_raises_instead_of_sleeping(throttled):
+    t0 = time.monotonic()
+    with pytest.raises(graph_client.GraphRateLimited) as info:
+        graph_client.get_json("123/posts", {"fields": "id"})
+    assert time.monotonic() - t0 < graph_client.USAGE_MAX_WAIT_SECONDS
+    assert info.value.retry_in > 500
+    assert len(throttled) == 1
+
+    # mientras dure la pausa, las demás peticiones fallan sin tocar la red
+    with pytest.raises(graph_client.GraphRateLimited):
+        graph_client.get_json("123/media")
+    assert len(throttled) == 1
+
+
+def test_rate_limited_request_is_a_graph_error(throttled):
+    with pytest.raises(data_processing.GraphAPIError):
+        data_processing._fb_request("123/posts", strict=True)
+    assert data_processing._fb_request("123/posts") == {}
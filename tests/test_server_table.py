@@ -0,0 +1,30 @@
+# tests/test_server_table.py
+# -------------------------------------------------
+# Filtros de server_table con la sintaxis de filter_query de DataTable.
+# -------------------------------------------------
+import pandas as pd
+import pytest
+
+from server_table import _filter_mask
+
+DF = pd.DataFrame({"Destino": ["New York", "Boston", "Cancún"], "Vuelos": [1, 2, 3]})
+
+
+@pytest.mark.parametrize("query, expected", [
+    ('{Destino} contains "New York"', [True, False, False]),
+    ("{Destino} = Boston", [False, True, False]),
+    ("{Vuelos} >= 2 && {Destino} icontains 'can'", [False, False, True]),
+])
+def test_supported_clauses(query, expected):
+    assert _filter_mask(DF, query).tolist() == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("{Destino} = Boston || {Vuelos} = 3", [True, True, True]),
+    ("{Vuelos} > 1 && {Destino} = Boston || {Vuelos} = 3", [False, True, True]),
+    ("({Destino} = Boston)", [True, True, True]),
+    ("{Destino} is blank", [True, True, True]),
+    ("{Origen} = Boston", [True, True, True]),
+])
+def test_unsupported_clauses_are_ignored(query, expected):
+    assert _filter_mask(DF, query).tolist() == expected
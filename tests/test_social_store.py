@@ -0,0 +1,47 @@
+# tests/test_social_store.py
+# -------------------------------------------------
+# Sincronización del almacén social con descargas simuladas (sin red).
+# -------------------------------------------------
+from datetime import datetime, timedelta
+
+import pytest
+
+import social_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Almacén temporal con una plataforma falsa; `state["fail"]` hace fallar los insights."""
+    monkeypatch.setattr(social_store, "SOCIAL_STORE_PATH", str(tmp_path / "social.sqlite3"))
+    monkeypatch.setattr(social_store, "_initialized", False)
+    created = (datetime.utcnow() - timedelta(days=60)).strftime("%Y-%m-%dT%H:%M:%S+0000")
+    state = {"fail": True, "insight_calls": 0}
+
+    def fetch_posts(account_id, since=None, until=None, with_insights=False, strict=False):
+        return [{"id": "1", "created_time": created}]
+
+    def fetch_insights(posts):
+        state["insight_calls"] += 1
+        for post in posts:
+            post["insights"] = None if state["fail"] else {"data": [
+                {"name": "post_impressions", "values": [{"value": 42}]}]}
+        return posts
+
+    monkeypatch.setitem(social_store._PLATFORMS, "facebook", (fetch_posts, fetch_insights, "created_time"))
+    return state
+
+
+def test_failed_insights_stay_pending_and_are_retried(store):
+    social_store.sync("facebook", "page", force=True)
+    posts = social_store.load_posts("facebook", "page")
+    assert posts[0]["insights"] == {"data": []}
+
+    # post ya "maduro": sólo se vuelve a pedir porque quedó pendiente
+    store["fail"] = False
+    social_store.sync("facebook", "page", force=True)
+    posts = social_store.load_posts("facebook", "page")
+    assert posts[0]["insights"]["data"][0]["values"][0]["value"] == 42
+    assert store["insight_calls"] == 2
+
+    social_store.sync("facebook", "page", force=True)
+    assert store["insight_calls"] == 2
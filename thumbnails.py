@@ -0,0 +1,150 @@
+# thumbnails.py
+# -------------------------------------------------
+# Proxy de miniaturas para media de Instagram. Cada media se descarga una
+# sola vez del CDN de Meta, se reduce a WebP y se guarda en disco por ID;
+# el navegador la pide a /thumbs/<id>.webp con caché larga en lugar de
+# bajar la imagen completa de una URL firmada que caduca.
+# -------------------------------------------------
+import io
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable
+
+import httpx
+from PIL import Image
+
+import social_store
+from config import THUMBNAIL_CACHE_DIR
+from data_processing import _fb_request
+
+THUMB_SIZE = (320, 320)
+WEBP_QUALITY = 80
+PREFETCH_WORKERS = 4
+DOWNLOAD_TIMEOUT_SECONDS = 15
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+
+_MEDIA_ID_RE = re.compile(r"^\d{5,30}$")
+
+_cdn = httpx.Client(timeout=DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True,
+                    limits=httpx.Limits(max_connections=PREFETCH_WORKERS * 2))
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="thumbs")
+_pending: dict[str, Future] = {}
+_lock = threading.RLock()  # reentrante: add_done_callback puede ejecutarse dentro del lock
+_url_prefix = "/"
+
+
+def _path_for(media_id: str) -> str:
+    return os.path.join(THUMBNAIL_CACHE_DIR, f"{media_id}.webp")
+
+
+def thumbnail_url(media_id: str) -> str:
+    return f"{_url_prefix}thumbs/{media_id}.webp"
+
+
+# -------------------------------------------------
+# 1 · Descarga y reducción
+# -------------------------------------------------
+def _source_url(media: dict) -> str | None:
+    """Imagen a usar: portada para vídeos/reels, media_url para fotos y carruseles."""
+    if media.get("media_type") == "VIDEO":
+        return media.get("thumbnail_url") or None
+    return media.get("media_url") or media.get("thumbnail_url") or None
+
+
+def _download(url: str) -> bytes:
+    with _cdn.stream("GET", url) as resp:
+        resp.raise_for_status()
+        chunks, size = [], 0
+        for chunk in resp.iter_bytes():
+            size += len(chunk)
+            if size > MAX_SOURCE_BYTES:
+                raise ValueError("imagen de origen demasiado grande")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _build(media_id: str) -> str:
+    """Descarga la media, guarda el WebP y devuelve su ruta (no se llama si ya existe)."""
+    media = social_store.find_post("instagram", media_id)
+    if media is None:
+        raise LookupError(f"media {media_id} no está en el almacén local")
+    url = _source_url(media)
+    try:
+        if not url:
+            raise ValueError("sin URL de imagen")
+        raw = _download(url)
+    except (httpx.HTTPError, ValueError):
+        # las URLs del CDN caducan: se pide una nueva a la Graph API y se reintenta una vez
+        fresh = _fb_request(media_id, {"fields": "media_type,media_url,thumbnail_url"}, strict=True)
+        url = _source_url(fresh)
+        if not url:
+            raise LookupError(f"media {media_id} sin imagen disponible")
+        raw = _download(url)
+
+    with Image.open(io.BytesIO(raw)) as img:
+        img = img.convert("RGB")
+        img.thumbnail(THUMB_SIZE)
+        path = _path_for(media_id)
+        os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        img.save(tmp, format="WEBP", quality=WEBP_QUALITY)
+    os.replace(tmp, path)
+    return path
+
+
+def _forget(media_id: str, fut: Future) -> None:
+    with _lock:
+        _pending.pop(media_id, None)
+    if fut.exception() is not None:
+        logging.error(f"Miniatura {media_id} no disponible: {fut.exception()}")
+
+
+def _ensure(media_id: str) -> Future | None:
+    """Future del WebP de `media_id` (None si ya está en disco)."""
+    if os.path.exists(_path_for(media_id)):
+        return None
+    with _lock:
+        fut = _pending.get(media_id)
+        if fut is None:
+            if os.path.exists(_path_for(media_id)):  # terminó entre ambas comprobaciones
+                return None
+            fut = _pool.submit(_build, media_id)
+            _pending[media_id] = fut
+            fut.add_done_callback(lambda f, m=media_id: _forget(m, f))
+        return fut
+
+
+def prefetch(media_ids: Iterable[str]) -> None:
+    """Encola en segundo plano las miniaturas que aún no estén en disco."""
+    for media_id in media_ids:
+        media_id = str(media_id)
+        if _MEDIA_ID_RE.match(media_id):
+            _ensure(media_id)
+
+
+# -------------------------------------------------
+# 2 · Ruta Flask
+# -------------------------------------------------
+def register_thumbnail_route(app) -> None:
+    """Sirve /thumbs/<media_id>.webp (sólo media presentes en el almacén local)."""
+    from flask import abort, send_file
+
+    global _url_prefix
+    _url_prefix = app.config.requests_pathname_prefix or "/"
+
+    @app.server.route(f"{app.config.routes_pathname_prefix or '/'}thumbs/<media_id>.webp")
+    def serve_thumbnail(media_id):
+        if not _MEDIA_ID_RE.match(media_id):
+            abort(404)
+        fut = _ensure(media_id)
+        if fut is not None:
+            try:
+                fut.result(timeout=DOWNLOAD_TIMEOUT_SECONDS * 2)
+            except Exception:
+                abort(404)
+        response = send_file(_path_for(media_id), mimetype="image/webp", max_age=31_536_000)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
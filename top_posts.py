@@ -0,0 +1,94 @@
+# top_posts.py
+# -------------------------------------------------
+# Ranking de publicaciones (FB + IG) para la pestaña Top Posts.
+# Puntuación ponderada precalculada, selección parcial con `nlargest`
+# (sin ordenar todo el historial), top-N por plataforma, paginación y
+# formateo vectorizado de las filas de la tabla.
+# -------------------------------------------------
+from typing import Callable
+
+import pandas as pd
+
+DEFAULT_WEIGHTS = {"likes": 1.0, "comments": 1.0, "impressions": 1.0}
+CONTENT_MAX_CHARS = 75
+
+COLUMNS = ["id", "content", "time", "likes", "comments", "impressions", "permalink", "media_type", "platform"]
+
+
+def standardize(df_fb: pd.DataFrame, df_ig: pd.DataFrame) -> pd.DataFrame:
+    """Une los posts de FB (process_facebook_posts) e IG (process_instagram_posts) en un solo esquema."""
+    fb = df_fb.rename(columns={"message": "content", "created_time": "time",
+                               "likes_count": "likes", "comments_count": "comments"})
+    ig = df_ig.rename(columns={"caption": "content", "timestamp": "time",
+                               "like_count": "likes", "comments_count": "comments"})
+    frames = [
+        f.assign(platform=name).reindex(columns=COLUMNS)
+        for f, name in ((fb, "Facebook"), (ig, "Instagram"))
+        if not f.empty
+    ]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    for col in ("likes", "comments", "impressions"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+
+def score_posts(df: pd.DataFrame, weights: dict[str, float] | None = None) -> pd.DataFrame:
+    """Añade `total_impact` = Σ peso · métrica (por defecto likes + comentarios + impresiones)."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    impact = pd.Series(0.0, index=df.index)
+    for col, w in weights.items():
+        if w and col in df:
+            impact += w * df[col]
+    return df.assign(total_impact=impact)
+
+
+def rank_posts(df: pd.DataFrame, n: int = 10, page: int = 0,
+               per_platform: bool = False) -> pd.DataFrame:
+    """
+    Página `page` (base 0) del ranking por `total_impact`, de `n` posts.
+    Con `per_platform=True` devuelve esa página para cada plataforma.
+    Sólo se seleccionan los (page + 1) · n mayores, no se ordena todo.
+    """
+    if df.empty:
+        return df
+    k = (page + 1) * n
+    if per_platform:
+        idx = df.groupby("platform", sort=True)["total_impact"].nlargest(k).index.get_level_values(-1)
+        top = df.loc[idx]  # ya ordenado por plataforma e impacto descendente
+        return top[top.groupby("platform").cumcount() >= page * n]
+    return df.nlargest(k, "total_impact").iloc[page * n:]
+
+
+def format_rows(top: pd.DataFrame, thumb_url: Callable[[str], str] | None = None) -> list[dict]:
+    """
+    Filas para la DataTable (Contenido en markdown con enlace para IG).
+    Con `thumb_url` se añade la columna Miniatura (markdown) para los posts de IG.
+    """
+    if top.empty:
+        return []
+    content = top["content"].fillna("").astype(str)
+    short = content.where(content.str.len() <= CONTENT_MAX_CHARS,
+                          content.str.slice(0, CONTENT_MAX_CHARS) + "...")
+    permalink = top["permalink"]
+    linked = (top["platform"] == "Instagram") & permalink.notna()
+    escaped = short.str.replace("[", r"\[", regex=False).str.replace("]", r"\]", regex=False)
+    short = short.where(~linked, "[" + escaped + "](" + permalink.fillna("").astype(str) + ")")
+
+    fmt = "{:,}".format
+    columns = {}
+    if thumb_url is not None:
+        is_ig = top["platform"] == "Instagram"
+        columns["Miniatura"] = ("![](" + top["id"].astype(str).map(thumb_url) + ")").where(is_ig, "")
+    out = pd.DataFrame({
+        **columns,
+        "Plataforma": top["platform"],
+        "Contenido": short,
+        "Fecha": pd.to_datetime(top["time"]).dt.strftime("%Y-%m-%d").fillna("N/A"),
+        "Likes": top["likes"].astype(int).map(fmt),
+        "Comentarios": top["comments"].astype(int).map(fmt),
+        "Impresiones": top["impressions"].astype(int).map(fmt),
+        "Impacto": top["total_impact"].astype(int).map(fmt),
+    })
+    return out.to_dict("records")
@@ -7,8 +7,8 @@ from config import GA_PROPERTY_ID, GA_KEY_PATH
 
 logging.basicConfig(level=logging.INFO)
 
-def query_ga(metrics, dimensions, start_date='30daysAgo', end_date='today', property_id=GA_PROPERTY_ID, key_path=GA_KEY_PATH):
-    """Función genérica para consultar datos de GA4."""
+def query_ga(metrics, dimensions, start_date='30daysAgo', end_date='today', property_id=GA_PROPERTY_ID, key_path=GA_KEY_PATH, strict=False):
+    """Función genérica para consultar datos de GA4. Con `strict=True` relanza los errores."""
     try:
         credentials = service_account.Credentials.from_service_account_file(
             key_path, scopes=['https://www.googleapis.com/auth/analytics.readonly']
@@ -56,4 +56,6 @@ def query_ga(metrics, dimensions, start_date='30daysAgo', end_date='today', prop
         return df.dropna(subset=[col for col in ['date', 'firstSessionDate'] if col in df.columns])
     except Exception as e:
         logging.error(f"Error consultando GA4 ({metrics}/{dimensions}): {e}")
+        if strict:
+            raise
         return pd.DataFrame(columns=dimensions + metrics)
\ No newline at end of file
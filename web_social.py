@@ -4,9 +4,11 @@ import pandas as pd
 
 # Dependencias de tu proyecto
 from utils import query_ga
-from ai import get_openai_response
+from ai_insights import insight_request, register_insight_card
 from config import FACEBOOK_ID, INSTAGRAM_ID
-from data_processing import get_facebook_posts, get_instagram_posts, process_facebook_posts, process_instagram_posts
+from data_processing import process_facebook_posts, process_instagram_posts
+import social_store
+from source_fetch import gather_sources
 from layout_components import create_ai_insight_card, create_ai_chat_interface
 from google_ads_tab import get_google_ads_tab
 # Importar los registradores de callbacks específicos
@@ -14,6 +16,11 @@ from callbacks_ga import register_callbacks as register_ga_callbacks
 from callbacks_social import register_callbacks as register_social_callbacks
 
 
+def _source_unavailable(label, result):
+    """Aviso dentro de la tarjeta cuando una fuente no respondió."""
+    return dbc.Alert(f"⚠️ {label} no disponible ({result.error}).", color="warning", className="py-2 small mb-2")
+
+
 def register_web_social_callbacks(app):
     """Registra los callbacks para la sección Web y Redes Sociales."""
 
@@ -36,8 +43,16 @@ def register_web_social_callbacks(app):
         default_no_data_ai_text = "No hay suficientes datos para un análisis detallado."
 
         if tab_ws == 'overview_ws':
-            df_acq = query_ga(metrics=['sessions', 'activeUsers', 'conversions'], dimensions=['date'], start_date=sd_str, end_date=ed_str)
-            df_acq_src = query_ga(metrics=['conversions'], dimensions=['sessionSourceMedium'], start_date=sd_str, end_date=ed_str)
+            # GA (2 consultas), Facebook e Instagram en paralelo, cada uno con su timeout
+            results = gather_sources({
+                'ga_acq': lambda: query_ga(metrics=['sessions', 'activeUsers', 'conversions'], dimensions=['date'], start_date=sd_str, end_date=ed_str, strict=True),
+                'ga_src': lambda: query_ga(metrics=['conversions'], dimensions=['sessionSourceMedium'], start_date=sd_str, end_date=ed_str, strict=True),
+                'facebook': lambda: process_facebook_posts(social_store.get_posts('facebook', FACEBOOK_ID, since=start_date_dt, until=end_date_dt)),
+                'instagram': lambda: process_instagram_posts(social_store.get_posts('instagram', INSTAGRAM_ID, since=start_date_dt, until=end_date_dt)),
+            })
+            ga_ok = results['ga_acq'].ok
+            df_acq = results['ga_acq'].value if ga_ok else pd.DataFrame()
+            df_acq_src = results['ga_src'].value if results['ga_src'].ok else pd.DataFrame()
 
             summary_data = {"sessions": 0, "users": 0, "conversions": 0, "top_channel": "N/A", "variation": "N/A"}
             if not df_acq.empty:
@@ -52,37 +67,58 @@ def register_web_social_callbacks(app):
                     if pd.notna(max_diff) and pd.notna(min_diff):
                         summary_data["variation"] = f"Aumento máx. de {max_diff:.0f}" if abs(max_diff) > abs(min_diff) else f"Disminución máx. de {abs(min_diff):.0f}"
 
-            fb_posts = get_facebook_posts(FACEBOOK_ID); ig_posts = get_instagram_posts(INSTAGRAM_ID)
-            df_fb = process_facebook_posts(fb_posts); df_ig = process_instagram_posts(ig_posts)
+            fb_ok, ig_ok = results['facebook'].ok, results['instagram'].ok
+            df_fb = results['facebook'].value if fb_ok else pd.DataFrame()
+            df_ig = results['instagram'].value if ig_ok else pd.DataFrame()
             if not df_fb.empty: df_fb = df_fb[(df_fb['created_time'] >= start_date_dt) & (df_fb['created_time'] <= end_date_dt)]
             if not df_ig.empty: df_ig = df_ig[(df_ig['timestamp'] >= start_date_dt) & (df_ig['timestamp'] <= end_date_dt)]
 
-            summary_data["total_fb_likes"] = df_fb['likes_count'].sum() if not df_fb.empty else 0
+            summary_data["total_fb_likes"] = df_fb['likes'].sum() if not df_fb.empty else 0
             summary_data["total_ig_likes"] = df_ig['like_count'].sum() if not df_ig.empty else 0
             summary_data["total_fb_impressions"] = df_fb['impressions'].sum() if not df_fb.empty else 0
             summary_data["total_ig_impressions"] = df_ig['impressions'].sum() if not df_ig.empty else 0
 
-            context_overview = f"Resumen Negocio: GA(Sesiones={summary_data['sessions']:,}, Conv={summary_data['conversions']:,}, Canal Top={summary_data['top_channel']}). Redes(Likes FB={summary_data['total_fb_likes']:,}, Likes IG={summary_data['total_ig_likes']:,}, Impr. FB={summary_data['total_fb_impressions']:,}, Impr. IG={summary_data['total_ig_impressions']:,})."
+            # sólo se describe al modelo lo que realmente respondió
+            context_parts = []
+            if ga_ok:
+                context_parts.append(f"GA(Sesiones={summary_data['sessions']:,}, Conv={summary_data['conversions']:,}, Canal Top={summary_data['top_channel']})")
+            social_parts = []
+            if fb_ok:
+                social_parts.append(f"Likes FB={summary_data['total_fb_likes']:,}, Impr. FB={summary_data['total_fb_impressions']:,}")
+            if ig_ok:
+                social_parts.append(f"Likes IG={summary_data['total_ig_likes']:,}, Impr. IG={summary_data['total_ig_impressions']:,}")
+            if social_parts:
+                context_parts.append(f"Redes({', '.join(social_parts)})")
+            context_overview = f"Resumen Negocio: {'. '.join(context_parts)}."
             prompt_overview = "Basado en este resumen, ¿cuál es el diagnóstico principal y qué acción poderosa recomiendas para mejorar el panorama general?"
-            ai_overview_insight_text = get_openai_response(prompt_overview, context_overview) if summary_data['sessions'] > 0 or summary_data['total_fb_impressions'] > 0 else default_no_data_ai_text
+            has_data = summary_data['sessions'] > 0 or summary_data['total_fb_impressions'] > 0 or summary_data['total_ig_impressions'] > 0
+            ai_overview_insight_text = insight_request(prompt_overview, context_overview) if has_data else default_no_data_ai_text
+
+            ga_body = [
+                html.P(f"Sesiones: {summary_data['sessions']:,.0f}"), html.P(f"Usuarios: {summary_data['users']:,.0f}"),
+                html.P(f"Conversiones: {summary_data['conversions']:,.0f}"), html.P(f"Canal Top: {summary_data['top_channel']}"),
+                html.P(f"Variación Sesiones: {summary_data['variation']}")
+            ] if ga_ok else [_source_unavailable("Google Analytics", results['ga_acq'])]
+            social_body = []
+            if fb_ok:
+                social_body += [html.P(f"Likes en Facebook: {summary_data['total_fb_likes']:,.0f}"), html.P(f"Impresiones en Facebook: {summary_data['total_fb_impressions']:,.0f}")]
+            else:
+                social_body.append(_source_unavailable("Facebook", results['facebook']))
+            if ig_ok:
+                social_body += [html.P(f"Likes en Instagram: {summary_data['total_ig_likes']:,.0f}"), html.P(f"Impresiones en Instagram: {summary_data['total_ig_impressions']:,.0f}")]
+            else:
+                social_body.append(_source_unavailable("Instagram", results['instagram']))
 
             return html.Div([
                 html.H4("Visión General del Negocio 🌐", className="text-center mt-4 mb-4"),
                 dbc.Row([
-                    dbc.Col(dbc.Card(dbc.CardBody([
-                        html.H5("Google Analytics", className="card-title"),
-                        html.P(f"Sesiones: {summary_data['sessions']:,.0f}"), html.P(f"Usuarios: {summary_data['users']:,.0f}"),
-                        html.P(f"Conversiones: {summary_data['conversions']:,.0f}"), html.P(f"Canal Top: {summary_data['top_channel']}"),
-                        html.P(f"Variación Sesiones: {summary_data['variation']}")
-                    ]), className="shadow-sm h-100"), md=6, className="mb-3"),
-                    dbc.Col(dbc.Card(dbc.CardBody([
-                        html.H5("Redes Sociales", className="card-title"),
-                        html.P(f"Likes en Facebook: {summary_data['total_fb_likes']:,.0f}"), html.P(f"Likes en Instagram: {summary_data['total_ig_likes']:,.0f}"),
-                        html.P(f"Impresiones en Facebook: {summary_data['total_fb_impressions']:,.0f}"), html.P(f"Impresiones en Instagram: {summary_data['total_ig_impressions']:,.0f}"),
-                    ]), className="shadow-sm h-100"), md=6, className="mb-3"),
+                    dbc.Col(dbc.Card(dbc.CardBody([html.H5("Google Analytics", className="card-title"), *ga_body]),
+                                     className="shadow-sm h-100"), md=6, className="mb-3"),
+                    dbc.Col(dbc.Card(dbc.CardBody([html.H5("Redes Sociales", className="card-title"), *social_body]),
+                                     className="shadow-sm h-100"), md=6, className="mb-3"),
                 ]),
                 create_ai_insight_card('overview-ws-ai-insight-visible', title="💡 Diagnóstico y Acción Clave (General)"),
-                html.Div(ai_overview_insight_text, id='overview-ws-ai-insight-data', style={'display': 'none'})
+                dcc.Store(id='overview-ws-ai-insight-data', data=ai_overview_insight_text)
             ])
 
         elif tab_ws == 'google_ws':
@@ -109,14 +145,15 @@ def register_web_social_callbacks(app):
             ])
         return html.P("Selecciona una pestaña.")
 
-    @app.callback(
-        Output('overview-ws-ai-insight-visible', 'children'),
-        Input('overview-ws-ai-insight-data', 'children')
-    )
-    def update_overview_ws_ai_card_content(ai_text):
+    def render_overview_ws_ai_card(ai_text):
         default_no_data_ai_text = "No hay suficientes datos para un análisis detallado."
         return html.P(ai_text if ai_text and ai_text.strip() != default_no_data_ai_text else "Análisis IA no disponible o datos insuficientes.")
 
+    # Se rellena en segundo plano; un nuevo rango de fechas cancela el insight en curso
+    register_insight_card(app, 'overview-ws-ai-insight-visible', 'overview-ws-ai-insight-data',
+                          cancel=[Input('date-picker', 'start_date'), Input('date-picker', 'end_date')],
+                          render=render_overview_ws_ai_card)
+
     # Registrar los callbacks de los módulos especializados
     register_ga_callbacks(app)
     register_social_callbacks(app)
@@ -0,0 +1,219 @@
+# wordmap.py
+# -------------------------------------------------
+# Wordmap de publicaciones (FB + IG):
+#   · tokenizador con stopwords en español/inglés, sin URLs ni menciones
+#     y con los hashtags como términos propios
+#   · conteo de términos por post cacheado (cada texto se tokeniza una vez)
+#   · render PNG en un pool de procesos, cacheado en disco por el hash de
+#     la tabla de frecuencias y servido como URL estática (/wordcloud/...);
+#     la carpeta conserva sólo los CACHE_MAX_FILES PNG usados más recientemente
+# -------------------------------------------------
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable
+
+from config import WORDCLOUD_CACHE_DIR
+
+MAX_WORDS = 100
+WIDTH, HEIGHT = 800, 400
+RENDER_WORKERS = 2
+RENDER_TIMEOUT_SECONDS = 60
+POST_CACHE_SIZE = 20_000
+CACHE_MAX_FILES = 500  # PNG que se conservan en WORDCLOUD_CACHE_DIR
+
+STOPWORDS_ES = {
+    "a", "al", "algo", "algunas", "algunos", "ante", "antes", "aquí", "así", "aun", "aunque", "bien",
+    "cada", "casi", "como", "cómo", "con", "contra", "cual", "cuál", "cuando", "cuándo", "de", "del",
+    "desde", "donde", "dónde", "durante", "e", "el", "él", "ella", "ellas", "ellos", "en", "entre",
+    "era", "eres", "es", "esa", "esas", "ese", "eso", "esos", "esta", "está", "estaba", "estamos",
+    "están", "estar", "estas", "este", "esto", "estos", "estoy", "fue", "fueron", "ha", "hace", "hacer",
+    "han", "has", "hasta", "hay", "la", "las", "le", "les", "lo", "los", "más", "me", "mi", "mis",
+    "mismo", "mucho", "muy", "nada", "ni", "no", "nos", "nosotros", "nuestra", "nuestras", "nuestro",
+    "nuestros", "o", "otra", "otras", "otro", "otros", "para", "pero", "poco", "por", "porque", "qué",
+    "que", "quien", "quién", "se", "sea", "ser", "si", "sí", "sido", "sin", "sobre", "solo", "sólo",
+    "son", "su", "sus", "también", "tan", "te", "tener", "tiene", "tienen", "todo", "todos", "tu", "tus",
+    "un", "una", "unas", "uno", "unos", "usted", "ustedes", "va", "van", "vez", "y", "ya", "yo",
+}
+STOPWORDS_EN = {
+    "and", "are", "but", "for", "from", "has", "have", "our", "that", "the", "this", "was", "were",
+    "will", "with", "you", "your",
+}
+STOPWORDS = STOPWORDS_ES | STOPWORDS_EN
+
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_MENTION_RE = re.compile(r"@[\w.]+")
+_TOKEN_RE = re.compile(r"#\w+|[^\W\d_]{3,}")  # hashtags o palabras de 3+ letras
+_DIGEST_RE = re.compile(r"^[0-9a-f]{40}$")
+
+_post_terms: "OrderedDict[tuple[str, str], Counter]" = OrderedDict()
+_pending: dict[str, Future] = {}
+_lock = threading.RLock()  # reentrante: add_done_callback puede ejecutarse dentro del lock
+_pool: ProcessPoolExecutor | None = None
+_url_prefix = "/"
+
+
+# -------------------------------------------------
+# 1 · Tokenización y frecuencias
+# -------------------------------------------------
+def tokenize(text: str) -> list[str]:
+    """Términos en minúscula sin URLs, menciones, números ni stopwords."""
+    if not text or not isinstance(text, str):
+        return []
+    text = _MENTION_RE.sub(" ", _URL_RE.sub(" ", text.lower()))
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS and len(t) > 2]
+
+
+def _terms_for(post_id: str, text: str) -> Counter:
+    key = (str(post_id), text)
+    with _lock:
+        hit = _post_terms.get(key)
+        if hit is not None:
+            _post_terms.move_to_end(key)
+            return hit
+    counts = Counter(tokenize(text))
+    with _lock:
+        _post_terms[key] = counts
+        while len(_post_terms) > POST_CACHE_SIZE:
+            _post_terms.popitem(last=False)
+    return counts
+
+
+def term_frequencies(items: Iterable[tuple[str, str]]) -> Counter:
+    """Suma los conteos de `(post_id, texto)`; sólo se tokenizan los textos nuevos."""
+    total: Counter = Counter()
+    for post_id, text in items:
+        if isinstance(text, str) and text:
+            total.update(_terms_for(post_id, text))
+    return total
+
+
+def _digest(freqs: dict[str, int]) -> str:
+    payload = json.dumps([sorted(freqs.items()), WIDTH, HEIGHT], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _path_for(digest: str) -> str:
+    return os.path.join(WORDCLOUD_CACHE_DIR, f"{digest}.png")
+
+
+# -------------------------------------------------
+# 2 · Render (en un proceso aparte)
+# -------------------------------------------------
+def _render_png(freqs: dict[str, int], path: str) -> str:
+    """Se ejecuta en el pool de procesos: genera el PNG y lo escribe de forma atómica."""
+    from wordcloud import WordCloud
+
+    wc = WordCloud(width=WIDTH, height=HEIGHT, background_color="white", max_words=MAX_WORDS)
+    image = wc.generate_from_frequencies(freqs).to_image()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, path)
+    return path
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 'spawn': no se hace fork de un servidor con hilos activos. Cada
+        # worker importa una vez el módulo principal (app.py protege app.run
+        # tras `if __name__ == '__main__'`) y luego se reutiliza.
+        _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _prune_cache() -> None:
+    """Borra los PNG menos usados (por mtime) por encima de `CACHE_MAX_FILES`."""
+    try:
+        entries = [e for e in os.scandir(WORDCLOUD_CACHE_DIR)
+                   if e.name.endswith(".png") and e.is_file()]
+    except OSError:
+        return
+    if len(entries) <= CACHE_MAX_FILES:
+        return
+    stamped = []
+    for entry in entries:
+        try:
+            stamped.append((entry.stat().st_mtime, entry.path))
+        except OSError:  # borrado por otro worker entre el listado y el stat
+            continue
+    stamped.sort()
+    for _, path in stamped[:len(stamped) - CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _forget(digest: str, fut: Future) -> None:
+    with _lock:
+        _pending.pop(digest, None)
+    if fut.exception() is not None:
+        logging.error(f"Error generando wordcloud {digest[:8]}: {fut.exception()}")
+        return
+    _prune_cache()
+
+
+def wordcloud_url(freqs: Counter) -> str:
+    """
+    URL del PNG para las `MAX_WORDS` palabras más frecuentes ('' si no hay
+    términos). Si la imagen aún no existe, se encola su render y la ruta
+    Flask la entrega en cuanto esté lista: el layout no espera al render.
+    """
+    top = dict(freqs.most_common(MAX_WORDS))
+    if not top:
+        return ""
+    digest = _digest(top)
+    path = _path_for(digest)
+    try:
+        os.utime(path)  # marca el PNG como usado para la poda por mtime
+    except OSError:
+        with _lock:
+            if digest not in _pending:
+                fut = _get_pool().submit(_render_png, top, path)
+                _pending[digest] = fut
+                fut.add_done_callback(lambda f, d=digest: _forget(d, f))
+    return f"{_url_prefix}wordcloud/{digest}.png"
+
+
+# -------------------------------------------------
+# 3 · Ruta estática
+# -------------------------------------------------
+def register_wordcloud_route(app) -> None:
+    """Sirve /wordcloud/<hash>.png desde la caché en disco (inmutable por hash)."""
+    from flask import abort, send_file
+
+    global _url_prefix
+    _url_prefix = app.config.requests_pathname_prefix or "/"
+
+    @app.server.route(f"{app.config.routes_pathname_prefix or '/'}wordcloud/<digest>.png")
+    def serve_wordcloud(digest):
+        if not _DIGEST_RE.match(digest):
+            abort(404)
+        path = _path_for(digest)
+        if not os.path.exists(path):
+            with _lock:
+                fut = _pending.get(digest)
+            if fut is None:
+                if os.path.exists(path):  # terminó entre ambas comprobaciones
+                    return _send(path)
+                abort(404)
+            try:
+                fut.result(timeout=RENDER_TIMEOUT_SECONDS)
+            except Exception as e:
+                logging.error(f"Wordcloud {digest[:8]} no disponible: {e}")
+                abort(503)
+        return _send(path)
+
+    def _send(path):
+        response = send_file(path, mimetype="image/png", max_age=31_536_000)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response